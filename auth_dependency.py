@@ -1,32 +1,88 @@
-from fastapi import Depends, HTTPException
+import hmac
+import os
+import time
+
+from fastapi import Depends, Header, HTTPException, Request, Response
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from sqlalchemy.orm import Session
 
-from database import get_db
-from crud.user_crud import get_user_by_github_id
+from database import READ_YOUR_WRITES_SECONDS, mark_write, read_router
+from crud.user_crud import get_user_with_plan
 
 SECRET_KEY = "super-secret-key-change-this"
 ALGORITHM = "HS256"
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        github_user_id = payload.get("github_user_id")
-
-        if github_user_id is None:
-            raise HTTPException(401, "Invalid token (missing github_user_id)")
+# Shared secret for internal/admin endpoints (admin API disabled when unset)
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")
 
-        user = get_user_by_github_id(db, github_user_id)
-        if not user:
-            raise HTTPException(401, "User not found")
+# Read-your-writes travels with the client, so every worker process honours it:
+# the login JWT carries WROTE_AT_CLAIM, later writes set WROTE_AT_COOKIE
+WROTE_AT_CLAIM = "wrote_at"
+WROTE_AT_COOKIE = "wrote_at"
 
-        return user  # <-- RETURN ORM MODEL
 
+def get_token_payload(token: str = Depends(oauth2_scheme)) -> dict:
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         raise HTTPException(401, "Could not validate credentials")
+
+
+def get_current_github_user_id(payload: dict = Depends(get_token_payload)) -> int:
+    """Validate the JWT without touching the DB (for cheap conditional requests)."""
+    github_user_id = payload.get("github_user_id")
+    if github_user_id is None:
+        raise HTTPException(401, "Invalid token (missing github_user_id)")
+    return github_user_id
+
+
+def remember_write(response: Response, github_user_id) -> None:
+    """After a user's write: their next reads, on any worker, go to the primary."""
+    mark_write(github_user_id)
+    response.set_cookie(
+        WROTE_AT_COOKIE,
+        f"{time.time():.3f}",
+        max_age=max(1, int(READ_YOUR_WRITES_SECONDS + 0.999)),
+        httponly=True,
+        samesite="lax",
+    )
+
+
+def _client_wrote_at(request: Request, payload: dict) -> float | None:
+    stamps = [payload.get(WROTE_AT_CLAIM), request.cookies.get(WROTE_AT_COOKIE)]
+    values = []
+    for stamp in stamps:
+        try:
+            values.append(float(stamp))
+        except (TypeError, ValueError):
+            continue
+    return max(values, default=None)
+
+
+def get_user_read_db(
+    request: Request,
+    payload: dict = Depends(get_token_payload),
+    github_user_id: int = Depends(get_current_github_user_id),
+):
+    """Read session for the current user: replica, unless they wrote a moment ago."""
+    yield from read_router.dependency(sticky_key=github_user_id, wrote_at=_client_wrote_at(request, payload))
+
+
+def get_current_user(
+    github_user_id: int = Depends(get_current_github_user_id),
+    db: Session = Depends(get_user_read_db),
+):
+    user = get_user_with_plan(db, github_user_id)
+    if not user:
+        raise HTTPException(401, "User not found")
+
+    return user  # <-- RETURN ORM MODEL (plan already loaded)
+
+
+def require_admin(x_admin_token: str = Header(None)):
+    """Guard for /admin/* endpoints: `X-Admin-Token` must match ADMIN_API_TOKEN."""
+    if not ADMIN_API_TOKEN or not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_API_TOKEN):
+        raise HTTPException(403, "Admin access required")
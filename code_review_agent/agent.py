@@ -9,7 +9,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 model = LiteLlm(
-    model="openrouter/kwaipilot/kat-coder-pro-v1:free",
+    model=os.getenv("OPENROUTER_MODEL", "openrouter/kwaipilot/kat-coder-pro-v1:free"),
     api_key=os.getenv("OPENROUTER_API_KEY"),
 )
 
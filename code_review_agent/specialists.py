@@ -0,0 +1,72 @@
+# code_review_agent/specialists.py
+# Focused single-dimension reviewers, run concurrently by a ParallelAgent.
+
+from google.adk.agents import LlmAgent, ParallelAgent
+
+from .agent import model
+
+REVIEW_DIMENSIONS = (
+    "correctness",
+    "architecture",
+    "security",
+    "performance",
+    "style",
+    "testing",
+    "docs",
+)
+
+# Used when parallel mode is on but a plan has no explicit list
+DEFAULT_PARALLEL_DIMENSIONS = ("correctness", "security", "performance")
+
+SPECIALIST_FOCUS = {
+    "correctness": "logic errors, unhandled edge cases, missing validation, wrong error handling, race conditions",
+    "architecture": "separation of concerns, layering (controller/service/repository), coupling, SOLID violations",
+    "security": "injection, missing auth/authorization checks, secrets in code, unsafe deserialization or file handling",
+    "performance": "N+1 queries, unbounded loops or queries, blocking I/O in async code, missing pagination or caching",
+    "style": "naming, dead code, unused imports, duplicated logic, unclear control flow",
+    "testing": "missing or weak tests for the changed behaviour, untested error paths",
+    "docs": "missing or misleading docstrings/comments, undocumented public behaviour or config",
+}
+
+SPECIALIST_INSTRUCTION = """
+You are a senior code reviewer focusing ONLY on **{dimension}**: {focus}.
+Ignore every other kind of issue – other reviewers cover them.
+Review only the changed lines of the diff and their immediate context.
+Report at most 8 high-signal findings; an empty "issues" list is fine.
+
+Respond with JSON only, no prose, in exactly this format:
+{{
+  "summary": "one or two sentences about {dimension}",
+  "strengths": ["..."],
+  "issues": [
+    {{"file": "path/to/file", "code": "offending snippet", "severity": "high|medium|low", "issue": "what is wrong and why"}}
+  ],
+  "recommendations": ["..."]
+}}
+"""
+
+_parallel_agents = {}
+
+
+def build_specialist(dimension: str) -> LlmAgent:
+    return LlmAgent(
+        name=f"{dimension}_reviewer",
+        model=model,
+        description=f"Reviews code diffs for {dimension} issues",
+        instruction=SPECIALIST_INSTRUCTION.format(
+            dimension=dimension, focus=SPECIALIST_FOCUS[dimension]
+        ),
+        output_key=f"review_{dimension}",
+    )
+
+
+def get_parallel_review_agent(dimensions) -> ParallelAgent:
+    """One ParallelAgent per distinct dimension set (ADK agents can have only one parent)."""
+    dims = tuple(d for d in REVIEW_DIMENSIONS if d in set(dimensions))
+    if dims not in _parallel_agents:
+        _parallel_agents[dims] = ParallelAgent(
+            name="parallel_code_review",
+            description="Runs focused reviewers concurrently over the same diff",
+            sub_agents=[build_specialist(d) for d in dims],
+        )
+    return _parallel_agents[dims]
@@ -0,0 +1,80 @@
+# crud/backfill_crud.py
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database import upsert_insert
+from models import BackfillCheckpoint
+
+
+def get_backfill(db: Session, installation_id: int) -> BackfillCheckpoint | None:
+    return db.execute(
+        select(BackfillCheckpoint).where(BackfillCheckpoint.installation_id == installation_id)
+    ).scalar_one_or_none()
+
+
+def claim_backfill(
+    db: Session,
+    installation_id: int,
+    repos: list,
+    restart: bool = False,
+    stale_seconds: int = 300,
+    now: datetime | None = None,
+) -> BackfillCheckpoint | None:
+    """
+    Mark the installation's backfill as running and return its checkpoint:
+    an interrupted (failed / stale) pass resumes where it stopped, a finished
+    one – or any, with `restart` – starts a new pass over `repos`. Page ETags
+    (with the PRs each page listed, re-checked on a 304) are kept across
+    passes. Returns None while another run is still
+    checkpointing (updated within `stale_seconds`).
+    """
+    now = now or datetime.utcnow()
+    db.execute(
+        upsert_insert(db, BackfillCheckpoint)
+        .values(installation_id=installation_id, status="done", repos=[], page_etags={})
+        .on_conflict_do_nothing(index_elements=[BackfillCheckpoint.installation_id])
+    )
+    query = select(BackfillCheckpoint).where(BackfillCheckpoint.installation_id == installation_id)
+    if db.get_bind().dialect.name == "postgresql":
+        query = query.with_for_update()
+    cp = db.execute(query).scalar_one()
+
+    updated_at = cp.updated_at.replace(tzinfo=None) if cp.updated_at else None
+    if cp.status == "running" and updated_at and updated_at > now - timedelta(seconds=stale_seconds):
+        db.rollback()
+        return None
+
+    if restart or cp.status == "done":
+        cp.repos = list(repos)
+        cp.repo_index = 0
+        cp.page_url = None
+        cp.listed = cp.skipped = cp.enqueued = 0
+        cp.next_run_at = None
+        cp.started_at = now
+        cp.finished_at = None
+    cp.status = "running"
+    cp.last_error = None
+    cp.updated_at = now
+    db.commit()
+    return cp
+
+
+def serialize_backfill(cp: BackfillCheckpoint) -> dict:
+    return {
+        "installation_id": cp.installation_id,
+        "status": cp.status,
+        "repos": len(cp.repos or []),
+        "repo_index": cp.repo_index,
+        "current_repo": cp.repos[cp.repo_index] if cp.repo_index < len(cp.repos or []) else None,
+        "listed": cp.listed,
+        "skipped": cp.skipped,
+        "enqueued": cp.enqueued,
+        # When the last queued review becomes due (the throttled finish time)
+        "reviews_scheduled_until": cp.next_run_at.isoformat() if cp.next_run_at else None,
+        "last_error": cp.last_error,
+        "started_at": cp.started_at.isoformat() if cp.started_at else None,
+        "finished_at": cp.finished_at.isoformat() if cp.finished_at else None,
+    }
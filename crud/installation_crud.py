@@ -1,7 +1,13 @@
 # crud/installation_crud.py
 
+from datetime import datetime
+
+from sqlalchemy import delete, func, select, update
 from sqlalchemy.orm import Session
-from models import Installation
+
+from database import upsert_insert
+from crud.review_log_partition_crud import review_log_tables
+from models import Installation, Repository
 
 
 def create_installation(
@@ -37,33 +43,98 @@ def get_installations_by_user(db: Session, user_id: int):
         Installation.user_id == user_id
     ).all()
 
+def upsert_installation(
+    db: Session,
+    installation_id: int,
+    account_login: str,
+    account_type: str,
+    user_id=None,
+) -> int:
+    """
+    INSERT ... ON CONFLICT upsert of one installation; returns its primary key.
+    `user_id` may be an int or a scalar subquery; NULL never unlinks an owner.
+    Does not commit – caller owns the transaction.
+    """
+    stmt = upsert_insert(db, Installation).values(
+        installation_id=installation_id,
+        account_login=account_login,
+        account_type=account_type,
+        user_id=user_id,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Installation.installation_id],
+        set_={
+            "account_login": stmt.excluded.account_login,
+            "account_type": stmt.excluded.account_type,
+            "user_id": func.coalesce(stmt.excluded.user_id, Installation.user_id),
+            "updated_at": datetime.utcnow(),  # onupdate isn't applied to ON CONFLICT
+        },
+    ).returning(Installation.id)
+    return db.execute(stmt).scalar_one()
+
+
 def create_or_update_installation(db: Session, installation_id: int, login: str, account_type: str):
-    inst = get_installation_by_installation_id(db, installation_id)
+    """Single-statement upsert of an installation (keeps any linked user)."""
+    pk = upsert_installation(db, installation_id, login, account_type)
+    db.commit()
+    return db.get(Installation, pk)
 
-    if inst:
-        inst.account_login = login
-        inst.account_type = account_type
-        db.commit()
-        db.refresh(inst)
-        return inst
 
-    inst = Installation(
+def link_installation_to_user(
+    db: Session,
+    installation_id: int,
+    user_id: int,
+    account_login: str,
+    account_type: str,
+):
+    """
+    Link an installation to a user (install callback).
+    Inserts the row if the webhook hasn't arrived yet, otherwise only sets user_id.
+    """
+    stmt = upsert_insert(db, Installation).values(
         installation_id=installation_id,
-        account_login=login,
+        account_login=account_login,
         account_type=account_type,
-        user_id=None
+        user_id=user_id,
     )
-    db.add(inst)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Installation.installation_id],
+        set_={"user_id": stmt.excluded.user_id, "updated_at": datetime.utcnow()},
+    ).returning(Installation.id)
+    pk = db.execute(stmt).scalar_one()
     db.commit()
-    db.refresh(inst)
-    return inst
+    return db.get(Installation, pk)
+
 
 def link_installations_to_user(db: Session, user_id: int):
-    """Assign all unassigned installations to this user."""
-    unlinked = db.query(Installation).filter(Installation.user_id.is_(None)).all()
+    """Assign all unassigned installations to this user (one UPDATE)."""
+    result = db.execute(
+        update(Installation)
+        .where(Installation.user_id.is_(None))
+        .values(user_id=user_id)
+    )
+    db.commit()
+    return result.rowcount
 
-    for inst in unlinked:
-        inst.user_id = user_id
 
-    db.commit()
-    return len(unlinked)
\ No newline at end of file
+def delete_installation(db: Session, installation_id: int) -> bool:
+    """
+    Remove an installation and its repositories (installation.deleted).
+    Review logs are kept for analytics, only detached from the installation.
+    Does not commit – caller owns the transaction.
+    """
+    pk = db.execute(
+        select(Installation.id).where(Installation.installation_id == installation_id)
+    ).scalar_one_or_none()
+    if pk is None:
+        return False
+
+    for table in review_log_tables(db):
+        db.execute(
+            update(table)
+            .where(table.c.installation_id == pk)
+            .values(installation_id=None)
+        )
+    db.execute(delete(Repository).where(Repository.installation_id == pk))
+    db.execute(delete(Installation).where(Installation.id == pk))
+    return True
@@ -0,0 +1,250 @@
+# crud/job_crud.py
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, case, func, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from database import upsert_insert
+from models import ReviewJob, ReviewJobStatus
+
+# pg_advisory_xact_lock key serialising capped claims (any constant unique to this app)
+CLAIM_LOCK_KEY = 0x7265766A  # "revj"
+
+
+def enqueue_job(
+    db: Session,
+    payload: dict,
+    kind: str = "pull_request",
+    dedupe_key: str | None = None,
+    run_after: datetime | None = None,
+    installation_id: int | None = None,
+    priority: int = 1,
+    sched_key: datetime | None = None,
+) -> int | None:
+    """
+    Queue a job. Returns its id, or None if a queued or running job with
+    `dedupe_key` exists (e.g. GitHub redelivered the same webhook). Finished
+    jobs give their key up, so a reopened PR is reviewed again.
+    `sched_key` is the job's virtual deadline (see claim_jobs).
+    """
+    values = {
+        "kind": kind,
+        "payload": payload,
+        "dedupe_key": dedupe_key,
+        "installation_id": installation_id,
+        "priority": priority,
+    }
+    if run_after is not None:
+        values["run_after"] = run_after
+    if sched_key is not None:
+        values["sched_key"] = sched_key
+
+    stmt = (
+        upsert_insert(db, ReviewJob)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=[ReviewJob.dedupe_key])
+        .returning(ReviewJob.id)
+    )
+    job_id = db.execute(stmt).scalar_one_or_none()
+    db.commit()
+    return job_id
+
+
+def _claimable(now: datetime):
+    """Due queued jobs, plus leased jobs whose worker stopped heartbeating."""
+    return or_(
+        and_(ReviewJob.status == ReviewJobStatus.QUEUED, ReviewJob.run_after <= now),
+        and_(ReviewJob.status == ReviewJobStatus.LEASED, ReviewJob.lease_expires_at <= now),
+    )
+
+
+def claim_jobs(
+    db: Session,
+    worker_id: str,
+    limit: int = 1,
+    visibility_timeout: int = 300,
+    now: datetime | None = None,
+    per_tenant_cap: int | None = None,
+):
+    """
+    Lease up to `limit` jobs for `worker_id` in one UPDATE ... RETURNING.
+
+    Jobs are picked fair-share first: each installation's due jobs are ranked
+    by virtual deadline (`sched_key`), and candidates are ordered by
+    (jobs already leased for that installation + rank, sched_key). So every
+    tenant's next job comes before any tenant's second one, smallest first,
+    and no installation holds more than `per_tenant_cap` leases.
+
+    Postgres can't combine FOR UPDATE with window functions, so the ranking
+    stays in a subquery and an outer SELECT ... FOR UPDATE SKIP LOCKED picks
+    the rows to lease: racing workers skip each other's rows instead of
+    blocking on them. With a cap, claimers also take a transaction-scoped
+    advisory lock, so each one counts the leases committed before it and
+    the cap holds under load. SQLite serialises writers anyway.
+    Returns rows of (id, kind, payload, attempts, max_attempts, priority, created_at).
+    """
+    now = now or datetime.utcnow()
+
+    ranked = (
+        select(
+            ReviewJob.id,
+            ReviewJob.installation_id,
+            ReviewJob.sched_key,
+            func.row_number()
+            .over(partition_by=ReviewJob.installation_id, order_by=(ReviewJob.sched_key, ReviewJob.id))
+            .label("rank"),
+        )
+        .where(_claimable(now))
+        .subquery()
+    )
+    busy = (
+        select(ReviewJob.installation_id, func.count().label("leased"))
+        .where(ReviewJob.status == ReviewJobStatus.LEASED, ReviewJob.lease_expires_at > now)
+        .group_by(ReviewJob.installation_id)
+        .subquery()
+    )
+    load = ranked.c.rank + func.coalesce(busy.c.leased, 0)
+
+    candidates = (
+        select(ranked.c.id)
+        .outerjoin(busy, busy.c.installation_id == ranked.c.installation_id)
+        .order_by(load, ranked.c.sched_key, ranked.c.id)
+        .limit(limit)
+    )
+    if per_tenant_cap:
+        # Jobs without an installation (NULL tenant) are never capped
+        candidates = candidates.where(or_(ranked.c.installation_id.is_(None), load <= per_tenant_cap))
+
+    if db.get_bind().dialect.name == "postgresql":
+        if per_tenant_cap:
+            # Held until commit: the next claimer's snapshot sees these leases
+            db.execute(select(func.pg_advisory_xact_lock(CLAIM_LOCK_KEY)))
+        candidates = (
+            select(ReviewJob.id)
+            .where(ReviewJob.id.in_(candidates), _claimable(now))
+            .with_for_update(skip_locked=True)
+        )
+
+    stmt = (
+        update(ReviewJob)
+        .where(ReviewJob.id.in_(candidates), _claimable(now))
+        .values(
+            status=ReviewJobStatus.LEASED,
+            lease_owner=worker_id,
+            lease_expires_at=now + timedelta(seconds=visibility_timeout),
+            attempts=ReviewJob.attempts + 1,
+            updated_at=now,
+        )
+        .returning(
+            ReviewJob.id,
+            ReviewJob.kind,
+            ReviewJob.payload,
+            ReviewJob.attempts,
+            ReviewJob.max_attempts,
+            ReviewJob.priority,
+            ReviewJob.created_at,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    rows = db.execute(stmt).all()
+    db.commit()
+    return rows
+
+
+def _owned(job_id: int, worker_id: str):
+    return and_(
+        ReviewJob.id == job_id,
+        ReviewJob.lease_owner == worker_id,
+        ReviewJob.status == ReviewJobStatus.LEASED,
+    )
+
+
+def heartbeat_job(db: Session, job_id: int, worker_id: str, visibility_timeout: int = 300) -> bool:
+    """Extend the lease. False means the lease was lost (expired and reclaimed)."""
+    result = db.execute(
+        update(ReviewJob)
+        .where(_owned(job_id, worker_id))
+        .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=visibility_timeout))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def complete_job(db: Session, job_id: int, worker_id: str) -> bool:
+    result = db.execute(
+        update(ReviewJob)
+        .where(_owned(job_id, worker_id))
+        .values(status=ReviewJobStatus.DONE, lease_owner=None, lease_expires_at=None, dedupe_key=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def fail_job(db: Session, job_id: int, worker_id: str, error: str, retry_delay: int = 60) -> bool:
+    """
+    Release a failed job: re-queued after `retry_delay` seconds, or parked
+    as FAILED once it has used up `max_attempts`.
+    """
+    status_type = ReviewJob.status.type
+    out_of_attempts = ReviewJob.attempts >= ReviewJob.max_attempts
+    result = db.execute(
+        update(ReviewJob)
+        .where(_owned(job_id, worker_id))
+        .values(
+            status=case(
+                (out_of_attempts, literal(ReviewJobStatus.FAILED, status_type)),
+                else_=literal(ReviewJobStatus.QUEUED, status_type),
+            ),
+            # Parked jobs free their dedupe key like finished ones
+            dedupe_key=case((out_of_attempts, None), else_=ReviewJob.dedupe_key),
+            last_error=(error or "")[:2000],
+            lease_owner=None,
+            lease_expires_at=None,
+            run_after=datetime.utcnow() + timedelta(seconds=retry_delay),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def postpone_job(db: Session, job_id: int, worker_id: str, reason: str, delay: int) -> bool:
+    """
+    Put a job back without spending an attempt (a dependency is failing fast,
+    the job itself is fine): re-queued after `delay` seconds.
+    """
+    result = db.execute(
+        update(ReviewJob)
+        .where(_owned(job_id, worker_id))
+        .values(
+            status=ReviewJobStatus.QUEUED,
+            attempts=ReviewJob.attempts - 1,
+            last_error=(reason or "")[:2000],
+            lease_owner=None,
+            lease_expires_at=None,
+            run_after=datetime.utcnow() + timedelta(seconds=delay),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def get_queue_stats(db: Session, window_seconds: int = 300, now: datetime | None = None) -> tuple:
+    """(backlog = queued + leased jobs, jobs finished in the last `window_seconds`)."""
+    now = now or datetime.utcnow()
+    since = now - timedelta(seconds=window_seconds)
+
+    backlog, finished = db.execute(
+        select(
+            func.count().filter(ReviewJob.status.in_((ReviewJobStatus.QUEUED, ReviewJobStatus.LEASED))),
+            func.count().filter(
+                ReviewJob.status.in_((ReviewJobStatus.DONE, ReviewJobStatus.FAILED)),
+                ReviewJob.updated_at >= since,
+            ),
+        )
+    ).one()
+    return backlog or 0, finished or 0
@@ -1,8 +1,42 @@
 # crud/plan_crud.py
 
 from sqlalchemy.orm import Session
-from models import Plan
+from database import upsert_insert
+from models import Installation, Plan, User
+
+DEFAULT_PLAN_SLUG = "free"
+
+# Plans are effectively static, so the sign-up plan id is resolved once per process
+_default_plan_id = None
 
 
 def get_plan_by_slug(db: Session, slug: str):
     return db.query(Plan).filter(Plan.slug == slug).first()
+
+
+def get_default_plan_id(db: Session) -> int:
+    """Id of the plan new users get ('free'), created if missing; cached in process."""
+    global _default_plan_id
+    if _default_plan_id is None:
+        plan_id = db.query(Plan.id).filter(Plan.slug == DEFAULT_PLAN_SLUG).scalar()
+        if plan_id is None:
+            stmt = upsert_insert(db, Plan).values(
+                name="Free", slug=DEFAULT_PLAN_SLUG, monthly_pr_limit=20, is_active=True, review_priority=0
+            )
+            db.execute(stmt.on_conflict_do_nothing(index_elements=[Plan.slug]))
+            db.commit()
+            plan_id = db.query(Plan.id).filter(Plan.slug == DEFAULT_PLAN_SLUG).scalar()
+        _default_plan_id = plan_id
+    return _default_plan_id
+
+
+def get_review_priority_for_installation(db: Session, installation_id: int) -> int:
+    """Plan scheduling boost for a GitHub installation id (0 if unlinked)."""
+    row = (
+        db.query(Plan.review_priority)
+        .join(User, User.plan_id == Plan.id)
+        .join(Installation, Installation.user_id == User.id)
+        .filter(Installation.installation_id == installation_id)
+        .first()
+    )
+    return (row[0] or 0) if row else 0
@@ -1,8 +1,14 @@
 # crud/repo_crud.py
 
+from sqlalchemy import update
 from sqlalchemy.orm import Session
+
+from database import upsert_insert
 from models import Repository
 
+# Rows per INSERT / UPDATE statement – stays well below driver bind-param limits
+REPO_BATCH_SIZE = 1000
+
 
 def add_repository(db: Session, installation_id: int, repo_full_name: str, is_active: bool = True):
     repo = Repository(
@@ -56,4 +62,58 @@ def upsert_repository(db: Session, installation_id: int, repo_full_name: str, is
     db.add(repo)
     db.commit()
     db.refresh(repo)
-    return repo
\ No newline at end of file
+    return repo
+
+
+def _batches(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def bulk_upsert_repositories(
+    db: Session,
+    installation_id: int,
+    repo_full_names,
+    is_active: bool = True,
+    batch_size: int = REPO_BATCH_SIZE,
+) -> int:
+    """
+    Batched INSERT ... ON CONFLICT upsert of repositories for one installation
+    (`installation_id` is the installations.id PK). Does not commit.
+    """
+    names = sorted(set(repo_full_names))
+    for chunk in _batches(names, batch_size):
+        stmt = upsert_insert(db, Repository).values([
+            {"installation_id": installation_id, "repo_full_name": name, "is_active": is_active}
+            for name in chunk
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Repository.installation_id, Repository.repo_full_name],
+            set_={"is_active": stmt.excluded.is_active},
+        )
+        db.execute(stmt)
+    return len(names)
+
+
+def deactivate_repositories(
+    db: Session,
+    installation_id: int,
+    repo_full_names=None,
+    batch_size: int = REPO_BATCH_SIZE,
+) -> int:
+    """
+    Set-based deactivate of repositories for one installation.
+    `repo_full_names=None` deactivates all of them. Does not commit.
+    """
+    base = update(Repository).where(Repository.installation_id == installation_id)
+
+    if repo_full_names is None:
+        return db.execute(base.values(is_active=False)).rowcount
+
+    updated = 0
+    for chunk in _batches(sorted(set(repo_full_names)), batch_size):
+        result = db.execute(
+            base.where(Repository.repo_full_name.in_(chunk)).values(is_active=False)
+        )
+        updated += result.rowcount
+    return updated
@@ -0,0 +1,160 @@
+# crud/review_log_crud.py
+
+import base64
+from datetime import datetime
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from crud.review_log_partition_crud import review_log_source
+from models import PRReviewLog, PRReviewStatus
+
+# Columns returned by history endpoints (no ORM objects, no relationships)
+REVIEW_HISTORY_COLUMNS = (
+    "id",
+    "repo_full_name",
+    "pr_number",
+    "head_sha",
+    "status",
+    "tokens_used",
+    "created_at",
+)
+
+MAX_PAGE_SIZE = 100
+
+
+def create_review_log(
+    db: Session,
+    user_id: int,
+    installation_id: int | None,
+    repo_full_name: str,
+    pr_number: int,
+    status: PRReviewStatus,
+    head_sha: str | None = None,
+    tokens_used: int | None = None,
+    error_message: str | None = None,
+    duration_ms: int | None = None,
+) -> PRReviewLog:
+    log_row = PRReviewLog(
+        user_id=user_id,
+        installation_id=installation_id,
+        repo_full_name=repo_full_name,
+        pr_number=pr_number,
+        head_sha=head_sha,
+        status=status,
+        tokens_used=tokens_used,
+        duration_ms=duration_ms,
+        error_message=error_message[:2000] if error_message else None,
+    )
+    db.add(log_row)
+    db.commit()
+    db.refresh(log_row)
+    return log_row
+
+
+def reviewed_head_shas(db: Session, repo_full_name: str, head_shas) -> set:
+    """The subset of `head_shas` already reviewed (or deliberately skipped) in this repo."""
+    head_shas = [sha for sha in head_shas if sha]
+    if not head_shas:
+        return set()
+    logs = review_log_source(db)
+    return set(db.execute(
+        select(logs.c.head_sha).where(
+            logs.c.repo_full_name == repo_full_name,
+            logs.c.head_sha.in_(head_shas),
+            logs.c.status.in_((PRReviewStatus.SUCCESS, PRReviewStatus.SKIPPED)),
+        )
+    ).scalars())
+
+
+# ------------------------------------------------------
+# Keyset (cursor) pagination
+# ------------------------------------------------------
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Raises ValueError for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _history_query(db: Session):
+    """SELECT of the history columns over every review log period, plus its column collection."""
+    source = review_log_source(db)
+    return select(*(source.c[name] for name in REVIEW_HISTORY_COLUMNS)), source.c
+
+
+def _page(db: Session, query, columns, limit: int, cursor: str | None):
+    """Newest-first page after `cursor`; returns (rows, next_cursor)."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.where(or_(
+            columns.created_at < created_at,
+            and_(columns.created_at == created_at, columns.id < row_id),
+        ))
+
+    query = query.order_by(columns.created_at.desc(), columns.id.desc()).limit(limit + 1)
+    rows = db.execute(query).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
+
+
+def list_reviews_for_user(
+    db: Session,
+    user_id: int,
+    limit: int = 20,
+    cursor: str | None = None,
+    status: PRReviewStatus | None = None,
+    repo_full_name: str | None = None,
+):
+    """Uses ix_pr_review_logs_user_created – cost is independent of history size."""
+    query, c = _history_query(db)
+    query = query.where(c.user_id == user_id)
+    if status is not None:
+        query = query.where(c.status == status)
+    if repo_full_name:
+        query = query.where(c.repo_full_name == repo_full_name)
+    return _page(db, query, c, limit, cursor)
+
+
+def list_reviews_for_repo(
+    db: Session,
+    repo_full_name: str,
+    limit: int = 20,
+    cursor: str | None = None,
+    status: PRReviewStatus | None = None,
+    pr_number: int | None = None,
+):
+    """Uses ix_pr_review_logs_repo_created / ix_pr_review_logs_repo_pr_created."""
+    query, c = _history_query(db)
+    query = query.where(c.repo_full_name == repo_full_name)
+    if status is not None:
+        query = query.where(c.status == status)
+    if pr_number is not None:
+        query = query.where(c.pr_number == pr_number)
+    return _page(db, query, c, limit, cursor)
+
+
+def serialize_review_row(row) -> dict:
+    return {
+        "id": row.id,
+        "repo_full_name": row.repo_full_name,
+        "pr_number": row.pr_number,
+        "head_sha": row.head_sha,
+        "status": row.status.value if row.status else None,
+        "tokens_used": row.tokens_used,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+    }
@@ -0,0 +1,206 @@
+# crud/review_log_partition_crud.py
+# Monthly partitions of pr_review_logs, so retention drops whole months
+# instead of deleting row by row.
+#   Postgres – native RANGE (created_at) partitions pr_review_logs_pYYYYMM,
+#              created ahead of time, plus pr_review_logs_default as a catch-all.
+#   SQLite   – pr_review_logs holds the open period (ORM writes stay as they
+#              are); past months are sealed into pr_review_logs_pYYYYMM tables
+#              and reads go through review_log_source(), a UNION ALL of all of them.
+
+import re
+from datetime import datetime
+
+from sqlalchemy import Column, MetaData, Table, delete, func, insert, select, text, union_all
+from sqlalchemy.orm import Session
+
+from models import PRReviewLog, RollupWatermark
+
+REVIEW_LOG_TABLE = PRReviewLog.__table__
+PARTITION_PREFIX = f"{REVIEW_LOG_TABLE.name}_p"
+DEFAULT_PARTITION = f"{REVIEW_LOG_TABLE.name}_default"
+_PARTITION_NAME = re.compile(rf"^{PARTITION_PREFIX}(\d{{4}})(\d{{2}})$")
+
+
+def _is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+# ------------------------------------------------------
+# Periods
+# ------------------------------------------------------
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(start: datetime, months: int) -> datetime:
+    index = start.year * 12 + start.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(start: datetime) -> str:
+    return f"{PARTITION_PREFIX}{start:%Y%m}"
+
+
+def partition_period(name: str) -> datetime | None:
+    """Month a partition table covers (None for the hot / default tables)."""
+    match = _PARTITION_NAME.match(name)
+    return datetime(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def list_partitions(db: Session) -> list[str]:
+    """Monthly partition / sealed period tables, oldest first."""
+    if _is_postgres(db):
+        names = db.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :parent"
+        ), {"parent": REVIEW_LOG_TABLE.name}).scalars()
+    else:
+        names = db.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE :prefix"
+        ), {"prefix": f"{PARTITION_PREFIX}%"}).scalars()
+    return sorted(n for n in names if partition_period(n) is not None)
+
+
+# ------------------------------------------------------
+# Read routing
+# ------------------------------------------------------
+def _period_table(name: str) -> Table:
+    # Column names and types only: enough to select, filter and update through
+    return Table(name, MetaData(), *(Column(c.name, c.type) for c in REVIEW_LOG_TABLE.columns))
+
+
+def review_log_tables(db: Session) -> list[Table]:
+    """Tables to write through for bulk updates (the parent alone on Postgres)."""
+    if _is_postgres(db):
+        return [REVIEW_LOG_TABLE]
+    return [REVIEW_LOG_TABLE, *(_period_table(n) for n in list_partitions(db))]
+
+
+def review_log_source(db: Session):
+    """
+    Selectable with every pr_review_logs column across all periods. Postgres
+    prunes partitions itself; on SQLite the sealed tables are UNION ALL'd
+    (the plain table while nothing has been sealed yet).
+    """
+    tables = review_log_tables(db)
+    if len(tables) == 1:
+        return REVIEW_LOG_TABLE
+    return union_all(*(select(*t.c) for t in tables)).subquery(REVIEW_LOG_TABLE.name)
+
+
+# ------------------------------------------------------
+# Maintenance
+# ------------------------------------------------------
+def is_partitioned(db: Session) -> bool:
+    """False for a Postgres pr_review_logs created before partitioning (needs migrating)."""
+    if not _is_postgres(db):
+        return True
+    kind = db.execute(
+        text("SELECT relkind FROM pg_class WHERE relname = :name"), {"name": REVIEW_LOG_TABLE.name}
+    ).scalar()
+    return kind == "p"
+
+
+def ensure_partitions(db: Session, now: datetime | None = None, months_ahead: int = 2) -> list[str]:
+    """
+    Postgres: create this month's and the next `months_ahead` partitions (and
+    the default one). They must exist before rows arrive – a range can't be
+    carved out of the default partition once it holds rows for it.
+    Returns the partitions created.
+    """
+    if not _is_postgres(db) or not is_partitioned(db):
+        return []
+
+    existing = set(list_partitions(db))
+    created = []
+    start = month_start(now or datetime.utcnow())
+    for offset in range(months_ahead + 1):
+        lo = add_months(start, offset)
+        name = partition_name(lo)
+        if name in existing:
+            continue
+        db.execute(text(
+            f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{REVIEW_LOG_TABLE.name}" '
+            f"FOR VALUES FROM ('{lo:%Y-%m-%d}') TO ('{add_months(lo, 1):%Y-%m-%d}')"
+        ))
+        created.append(name)
+    db.execute(text(
+        f'CREATE TABLE IF NOT EXISTS "{DEFAULT_PARTITION}" PARTITION OF "{REVIEW_LOG_TABLE.name}" DEFAULT'
+    ))
+    db.commit()
+    return created
+
+
+def seal_closed_period(db: Session, now: datetime | None = None) -> str | None:
+    """
+    SQLite: once the hot table holds rows from before this month, rename it to
+    pr_review_logs_pYYYYMM (named after the last closed month, so every row in
+    it is older than that month's end), start a fresh hot table and move back
+    any rows from the current month. One transaction; ids keep counting.
+    Returns the sealed table's name.
+    """
+    if _is_postgres(db):
+        return None
+
+    boundary = month_start(now or datetime.utcnow())
+    oldest = db.execute(select(PRReviewLog.created_at).order_by(PRReviewLog.id).limit(1)).scalar()
+    if oldest is None or oldest >= boundary:
+        return None
+
+    hot = REVIEW_LOG_TABLE.name
+    name = partition_name(add_months(boundary, -1))
+    if name in list_partitions(db):
+        # A month's table already exists (clock moved back?) – leave it for a later run
+        return None
+
+    last_id = db.execute(select(func.max(PRReviewLog.id))).scalar()
+
+    db.execute(text(f'ALTER TABLE "{hot}" RENAME TO "{name}"'))
+    # Index names are global in SQLite: re-create the moved ones under the period's name
+    for index in REVIEW_LOG_TABLE.indexes:
+        db.execute(text(f'DROP INDEX IF EXISTS "{index.name}"'))
+        if [c.name for c in index.columns] == ["id"]:
+            continue
+        cols = ", ".join(c.name for c in index.columns)
+        db.execute(text(f'CREATE INDEX "{index.name}_{name[len(hot) + 1:]}" ON "{name}" ({cols})'))
+
+    REVIEW_LOG_TABLE.create(bind=db.connection())
+    db.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {"name": hot})
+    db.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"), {"name": hot, "seq": last_id})
+
+    sealed = _period_table(name)
+    stragglers = select(*sealed.c).where(sealed.c.created_at >= boundary)
+    db.execute(insert(REVIEW_LOG_TABLE).from_select([c.name for c in sealed.c], stragglers))
+    db.execute(delete(sealed).where(sealed.c.created_at >= boundary))
+    db.commit()
+    return name
+
+
+def drop_expired_partitions(db: Session, cutoff: datetime) -> list[str]:
+    """
+    Drop every monthly partition that ends on or before `cutoff`. A partition
+    whose rows aren't folded into the usage rollups yet is kept for a later run
+    (only once rollups have ever run). Returns the partitions dropped.
+    """
+    from crud.rollup_crud import DAILY_WATERMARK
+
+    rolled_up_to = db.execute(
+        select(RollupWatermark.last_log_id).where(RollupWatermark.name == DAILY_WATERMARK)
+    ).scalar()
+
+    dropped = []
+    for name in list_partitions(db):
+        if add_months(partition_period(name), 1) > cutoff:
+            break
+        if rolled_up_to is not None:
+            newest = db.execute(select(func.max(_period_table(name).c.id))).scalar()
+            if newest is not None and newest > rolled_up_to:
+                continue
+        if _is_postgres(db):
+            db.execute(text(f'ALTER TABLE "{REVIEW_LOG_TABLE.name}" DETACH PARTITION "{name}"'))
+        db.execute(text(f'DROP TABLE "{name}"'))
+        db.commit()
+        dropped.append(name)
+    return dropped
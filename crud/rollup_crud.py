@@ -0,0 +1,205 @@
+# crud/rollup_crud.py
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from database import upsert_insert
+from crud.review_log_partition_crud import review_log_source
+from models import Plan, PRReviewStatus, RollupWatermark, UsageRollupDaily, User
+
+ROLLUP_SCOPES = ("user", "installation", "repo", "plan")
+DAILY_WATERMARK = "usage_daily"
+
+# Additive columns – a re-run batch adds to them, so each log row must be folded exactly once
+COUNTER_COLUMNS = (
+    "review_count",
+    "success_count",
+    "skipped_count",
+    "error_count",
+    "limit_reached_count",
+    "timeout_count",
+    "tokens_used",
+    "duration_ms_total",
+    "duration_samples",
+)
+
+
+def _status_count(logs, status: PRReviewStatus):
+    return func.sum(case((logs.c.status == status, 1), else_=0))
+
+
+def _aggregate_query(logs, scope: str, lo: int, hi: int):
+    """GROUP BY (scope key, day) over review log rows (`logs`) with lo < id <= hi."""
+    key_column = {
+        "user": logs.c.user_id,
+        "installation": logs.c.installation_id,
+        "repo": logs.c.repo_full_name,
+        "plan": Plan.slug,
+    }[scope]
+    day = func.date(logs.c.created_at)
+
+    query = select(
+        key_column.label("scope_key"),
+        day.label("day"),
+        func.count().label("review_count"),
+        _status_count(logs, PRReviewStatus.SUCCESS).label("success_count"),
+        _status_count(logs, PRReviewStatus.SKIPPED).label("skipped_count"),
+        _status_count(logs, PRReviewStatus.ERROR).label("error_count"),
+        _status_count(logs, PRReviewStatus.LIMIT_REACHED).label("limit_reached_count"),
+        _status_count(logs, PRReviewStatus.TIMEOUT).label("timeout_count"),
+        func.coalesce(func.sum(logs.c.tokens_used), 0).label("tokens_used"),
+        func.coalesce(func.sum(logs.c.duration_ms), 0).label("duration_ms_total"),
+        func.count(logs.c.duration_ms).label("duration_samples"),
+    ).select_from(logs)
+
+    if scope == "plan":
+        # Attributed to the user's current plan
+        query = query.join(User, User.id == logs.c.user_id).join(Plan, Plan.id == User.plan_id)
+
+    return query.where(
+        logs.c.id > lo,
+        logs.c.id <= hi,
+        key_column.isnot(None),
+    ).group_by(key_column, day)
+
+
+def _as_date(value) -> date:
+    # SQLite's date() returns 'YYYY-MM-DD' text, Postgres returns a date
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def _upsert_rollups(db: Session, scope: str, rows) -> None:
+    if not rows:
+        return
+    now = datetime.utcnow()
+    stmt = upsert_insert(db, UsageRollupDaily).values([
+        {
+            "scope": scope,
+            "scope_key": str(row.scope_key),
+            "day": _as_date(row.day),
+            "updated_at": now,
+            **{col: int(getattr(row, col) or 0) for col in COUNTER_COLUMNS},
+        }
+        for row in rows
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UsageRollupDaily.scope, UsageRollupDaily.scope_key, UsageRollupDaily.day],
+        set_={
+            **{col: getattr(UsageRollupDaily, col) + getattr(stmt.excluded, col) for col in COUNTER_COLUMNS},
+            "updated_at": now,
+        },
+    )
+    db.execute(stmt)
+
+
+def apply_rollup_batch(
+    db: Session,
+    batch_size: int = 5000,
+    settle_seconds: int = 60,
+    now: datetime | None = None,
+) -> int:
+    """
+    Fold the next batch of PRReviewLog rows (id > watermark) into the daily
+    rollups and advance the watermark – all in one transaction.
+    Rows younger than `settle_seconds` are left for the next run so a late
+    commit of a lower id can't be skipped. Returns the number of rows folded
+    (0 = caught up, or another worker holds the watermark).
+    """
+    now = now or datetime.utcnow()
+
+    db.execute(
+        upsert_insert(db, RollupWatermark)
+        .values(name=DAILY_WATERMARK, last_log_id=0)
+        .on_conflict_do_nothing(index_elements=[RollupWatermark.name])
+    )
+    watermark = select(RollupWatermark.last_log_id).where(RollupWatermark.name == DAILY_WATERMARK)
+    if db.get_bind().dialect.name == "postgresql":
+        # One roller at a time; others skip instead of queueing up
+        watermark = watermark.with_for_update(skip_locked=True)
+
+    lo = db.execute(watermark).scalar_one_or_none()
+    if lo is None:
+        db.rollback()
+        return 0
+
+    logs = review_log_source(db)
+    next_ids = (
+        select(logs.c.id)
+        .where(logs.c.id > lo)
+        .order_by(logs.c.id)
+        .limit(batch_size)
+        .subquery()
+    )
+    hi = db.execute(select(func.max(next_ids.c.id))).scalar()
+
+    if hi is not None:
+        too_new = db.execute(
+            select(func.min(logs.c.id)).where(
+                logs.c.id > lo,
+                logs.c.id <= hi,
+                logs.c.created_at > now - timedelta(seconds=settle_seconds),
+            )
+        ).scalar()
+        if too_new is not None:
+            hi = too_new - 1
+
+    if hi is None or hi <= lo:
+        db.commit()
+        return 0
+
+    folded = db.execute(
+        select(func.count()).select_from(logs).where(logs.c.id > lo, logs.c.id <= hi)
+    ).scalar()
+
+    for scope in ROLLUP_SCOPES:
+        _upsert_rollups(db, scope, db.execute(_aggregate_query(logs, scope, lo, hi)).all())
+
+    db.query(RollupWatermark).filter(RollupWatermark.name == DAILY_WATERMARK).update(
+        {"last_log_id": hi, "updated_at": now}, synchronize_session=False
+    )
+    db.commit()
+    return folded
+
+
+# ------------------------------------------------------
+# Read side
+# ------------------------------------------------------
+def get_daily_usage(
+    db: Session,
+    scope: str,
+    scope_key: str | None = None,
+    start: date | None = None,
+    end: date | None = None,
+    limit: int = 1000,
+):
+    """Rollup rows for a scope (optionally one key) between start and end, inclusive."""
+    query = select(UsageRollupDaily).where(UsageRollupDaily.scope == scope)
+    if scope_key is not None:
+        query = query.where(UsageRollupDaily.scope_key == str(scope_key))
+    if start is not None:
+        query = query.where(UsageRollupDaily.day >= start)
+    if end is not None:
+        query = query.where(UsageRollupDaily.day <= end)
+
+    query = query.order_by(UsageRollupDaily.day, UsageRollupDaily.scope_key).limit(limit)
+    return db.execute(query).scalars().all()
+
+
+def serialize_rollup(row: UsageRollupDaily) -> dict:
+    return {
+        "scope": row.scope,
+        "key": row.scope_key,
+        "day": row.day.isoformat(),
+        "reviews": row.review_count,
+        "success": row.success_count,
+        "skipped": row.skipped_count,
+        "error": row.error_count,
+        "limit_reached": row.limit_reached_count,
+        "timeout": row.timeout_count,
+        "tokens_used": row.tokens_used,
+        "avg_duration_ms": (
+            round(row.duration_ms_total / row.duration_samples) if row.duration_samples else None
+        ),
+    }
@@ -1,14 +1,57 @@
 # crud/user_crud.py
 
-from sqlalchemy.orm import Session
-from models import User, Plan
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, Integer, case, cast, func, literal, literal_column, or_, select, update
+from sqlalchemy.orm import Session, joinedload
+from models import User, Plan, Installation
 from crud.plan_crud import get_plan_by_slug
+from database import upsert_insert
+
+BILLING_PERIOD_DAYS = int(os.getenv("BILLING_PERIOD_DAYS", "30"))
 
 
 def get_user_by_github_id(db: Session, github_user_id: int):
     return db.query(User).filter(User.github_user_id == github_user_id).first()
 
 
+def get_user_with_plan(db: Session, github_user_id: int):
+    """User + plan in one query (plan is used by almost every response)."""
+    return db.query(User).options(joinedload(User.plan)).filter(
+        User.github_user_id == github_user_id
+    ).first()
+
+
+def get_user_with_installations(db: Session, github_user_id: int):
+    """User + plan + installations in a single joined query."""
+    return db.query(User).options(
+        joinedload(User.plan),
+        joinedload(User.installations),
+    ).filter(User.github_user_id == github_user_id).first()
+
+
+def get_installations_version(db: Session, github_user_id: int):
+    """
+    Cheap version stamp for /me/installations: one aggregate row of
+    (user id, user updated_at, plan id, installation count, latest change).
+    None if the user doesn't exist.
+    """
+    return db.execute(
+        select(
+            User.id,
+            User.updated_at,
+            User.plan_id,
+            func.count(Installation.id),
+            func.max(Installation.updated_at),
+            func.max(Installation.created_at),
+        )
+        .outerjoin(Installation, Installation.user_id == User.id)
+        .where(User.github_user_id == github_user_id)
+        .group_by(User.id, User.updated_at, User.plan_id)
+    ).first()
+
+
 
 def create_user(db, github_user_id, username, email, avatar_url, plan_id=None):
     
@@ -31,6 +74,39 @@ def create_user(db, github_user_id, username, email, avatar_url, plan_id=None):
     return user
 
 
+def upsert_github_user(db: Session, github_user_id: int, username: str, email, avatar_url, plan_id: int):
+    """
+    Login upsert in one INSERT ... ON CONFLICT ... RETURNING: new users get
+    `plan_id`, existing ones keep their plan and get a refreshed profile.
+    Returns (id, github_user_id, github_username, plan slug).
+    """
+    stmt = upsert_insert(db, User).values(
+        github_user_id=github_user_id,
+        github_username=username,
+        email=email,
+        avatar_url=avatar_url,
+        plan_id=plan_id,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[User.github_user_id],
+        set_={
+            "github_username": stmt.excluded.github_username,
+            "email": func.coalesce(stmt.excluded.email, User.email),
+            "avatar_url": stmt.excluded.avatar_url,
+            "updated_at": datetime.utcnow(),  # onupdate isn't applied to ON CONFLICT
+        },
+    ).returning(
+        User.id,
+        User.github_user_id,
+        User.github_username,
+        # RETURNING renders columns unqualified, so name the inserted row's column explicitly
+        select(Plan.slug).where(Plan.id == literal_column("users.plan_id")).scalar_subquery(),
+    )
+    row = db.execute(stmt).one()
+    db.commit()
+    return row
+
+
 def get_user_by_installation(db: Session, installation_id: int):
     from models import Installation
     inst = db.query(Installation).filter(Installation.installation_id == installation_id).first()
@@ -74,4 +150,80 @@ def increment_user_pr_usage(db: Session, user_id: int) -> User | None:
     user.pr_used_this_period = current + 1
     db.commit()
     db.refresh(user)
-    return user
\ No newline at end of file
+    return user
+
+
+def _period_expired(now: datetime):
+    """Users whose period has ended (or was never started)."""
+    return or_(User.period_end.is_(None), User.period_end <= now)
+
+
+def _new_period_values(db: Session, now: datetime) -> dict:
+    """
+    The period containing `now`, counted from the old period_end in whole
+    BILLING_PERIOD_DAYS steps (so the billing anchor day never drifts, even
+    after months without a review). Users without a period start one now.
+    """
+    days = BILLING_PERIOD_DAYS
+    now_value = literal(now, DateTime)
+    if db.get_bind().dialect.name == "postgresql":
+        elapsed = func.extract("epoch", now_value - User.period_end) / 86400
+        steps = cast(func.floor(elapsed / days) + 1, Integer)
+        end = User.period_end + func.make_interval(0, 0, 0, steps * days)
+        start = end - timedelta(days=days)
+    else:
+        steps = cast((func.julianday(now_value) - func.julianday(User.period_end)) / days, Integer) + 1
+        end = func.datetime(User.period_end, func.printf("+%d days", steps * days))
+        start = func.datetime(User.period_end, func.printf("+%d days", (steps - 1) * days))
+
+    never_started = User.period_end.is_(None)
+    return {
+        "pr_used_this_period": 0,
+        "period_start": case((never_started, now), else_=start),
+        "period_end": case((never_started, now + timedelta(days=days)), else_=end),
+        "updated_at": now,
+    }
+
+
+def rollover_expired_periods(db: Session, now: datetime | None = None, batch_size: int = 1000) -> int:
+    """
+    Reset usage for up to `batch_size` users whose period has expired.
+    One indexed UPDATE per call (no ORM objects loaded); returns rows updated.
+    Rolled-over rows stop matching the predicate, so repeated calls resume on their own.
+    """
+    now = now or datetime.utcnow()
+
+    batch = (
+        select(User.id)
+        .where(_period_expired(now))
+        .order_by(User.id)
+        .limit(batch_size)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        # Concurrent workers take disjoint batches instead of blocking each other
+        batch = batch.with_for_update(skip_locked=True)
+
+    result = db.execute(
+        update(User)
+        .where(User.id.in_(batch), _period_expired(now))
+        .values(**_new_period_values(db, now))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+
+def rollover_user_period_if_expired(db: Session, user: User, now: datetime | None = None) -> bool:
+    """Lazily start a new period for one user; safe under concurrent webhooks."""
+    now = now or datetime.utcnow()
+    result = db.execute(
+        update(User)
+        .where(User.id == user.id, _period_expired(now))
+        .values(**_new_period_values(db, now))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    if result.rowcount:
+        db.refresh(user)
+        return True
+    return False
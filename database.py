@@ -1,10 +1,19 @@
-from sqlalchemy import create_engine
+import threading
+import time
+
+from sqlalchemy import PrimaryKeyConstraint, create_engine, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
 
+from utils import metrics
+from utils.logger import log
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -26,6 +35,23 @@ engine = create_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional read replica for read-only endpoints (unset = everything on the primary).
+# Locally: DATABASE_READ_URL=sqlite:///./code_reviewer_replica.db
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+# A user's reads stay on the primary this long after their own write
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+# Replica health is re-checked at most this often...
+REPLICA_HEALTH_CHECK_SECONDS = float(os.getenv("REPLICA_HEALTH_CHECK_SECONDS", "10"))
+# ...and a failed replica is left alone for this long
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+# Postgres: treat the replica as unhealthy beyond this replay lag (0 = don't check)
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "0"))
+
+read_engine = create_engine(DATABASE_READ_URL) if DATABASE_READ_URL else None
+ReadSessionLocal = (
+    sessionmaker(autocommit=False, autoflush=False, bind=read_engine) if read_engine is not None else None
+)
+
 Base = declarative_base()
 
 def get_db():
@@ -34,3 +60,174 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# ---------------------------------------------------------------------
+# Read routing
+# ---------------------------------------------------------------------
+class ReadRouter:
+    """
+    Hands out sessions for read-only work: on the replica when it is
+    configured and healthy, on the primary otherwise or for a user who wrote
+    within `sticky_seconds` – so a user always sees their own writes.
+    The client carries its last write time (`wrote_at`: JWT claim or cookie,
+    see auth_dependency) so any worker process routes it; writes the client
+    didn't make (webhooks) are remembered per key in this process only.
+    """
+
+    def __init__(
+        self,
+        primary_factory,
+        replica_factory=None,
+        sticky_seconds: float = READ_YOUR_WRITES_SECONDS,
+        check_seconds: float = REPLICA_HEALTH_CHECK_SECONDS,
+        retry_seconds: float = REPLICA_RETRY_SECONDS,
+        max_lag_seconds: float = REPLICA_MAX_LAG_SECONDS,
+    ):
+        self.primary_factory = primary_factory
+        self.replica_factory = replica_factory
+        self.sticky_seconds = sticky_seconds
+        self.check_seconds = check_seconds
+        self.retry_seconds = retry_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self._recent_writes = {}
+        self._healthy = True
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    # --- read-your-writes ---------------------------------------------
+    def mark_write(self, key) -> None:
+        if key is None or self.replica_factory is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._recent_writes[key] = now + self.sticky_seconds
+            if len(self._recent_writes) > 10000:
+                self._recent_writes = {k: t for k, t in self._recent_writes.items() if t > now}
+
+    def is_sticky(self, key, wrote_at: float | None = None) -> bool:
+        """`wrote_at` is the client's last write (wall-clock epoch seconds)."""
+        if wrote_at and time.time() - wrote_at < self.sticky_seconds:
+            return True
+        until = self._recent_writes.get(key) if key is not None else None
+        return until is not None and until > time.monotonic()
+
+    # --- replica health -----------------------------------------------
+    def mark_unhealthy(self, reason) -> None:
+        with self._lock:
+            was_healthy = self._healthy
+            self._healthy = False
+            self._checked_at = time.monotonic() + self.retry_seconds - self.check_seconds
+        if was_healthy:
+            log(f"⚠️ Read replica unhealthy, reads fall back to the primary: {reason}")
+            metrics.inc("db_replica_unhealthy_total")
+
+    def _probe(self) -> None:
+        db = self.replica_factory()
+        try:
+            if self.max_lag_seconds and db.get_bind().dialect.name == "postgresql":
+                lag = db.execute(text(
+                    "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+                )).scalar()
+                if lag > self.max_lag_seconds:
+                    raise RuntimeError(f"replication lag {lag:.0f}s")
+            else:
+                db.execute(text("SELECT 1"))
+        finally:
+            db.close()
+
+    def replica_healthy(self) -> bool:
+        if self.replica_factory is None:
+            return False
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_seconds:
+            return self._healthy
+        with self._lock:
+            self._checked_at = now  # one prober at a time; others use the last result
+        try:
+            self._probe()
+        except Exception as e:
+            self.mark_unhealthy(e)
+            return False
+        if not self._healthy:
+            log("✅ Read replica healthy again")
+        self._healthy = True
+        return True
+
+    # --- sessions -----------------------------------------------------
+    def session(self, sticky_key=None, wrote_at: float | None = None) -> tuple[Session, bool]:
+        """(session, on_replica)."""
+        if not self.is_sticky(sticky_key, wrote_at) and self.replica_healthy():
+            metrics.inc("db_reads_total", target="replica")
+            return self.replica_factory(), True
+        metrics.inc("db_reads_total", target="primary")
+        return self.primary_factory(), False
+
+    def dependency(self, sticky_key=None, wrote_at: float | None = None):
+        """Generator for FastAPI dependencies; a failing replica is marked down for later requests."""
+        db, on_replica = self.session(sticky_key, wrote_at)
+        try:
+            yield db
+        except OperationalError as e:
+            if on_replica:
+                self.mark_unhealthy(e)
+            raise
+        finally:
+            db.close()
+
+
+read_router = ReadRouter(SessionLocal, ReadSessionLocal)
+
+
+def get_read_db():
+    """Session for read-only endpoints (replica when available)."""
+    yield from read_router.dependency()
+
+
+def mark_write(key) -> None:
+    """Pin `key`'s reads (e.g. a GitHub user id) to the primary for READ_YOUR_WRITES_SECONDS (this process)."""
+    read_router.mark_write(key)
+
+
+def sync_sqlite_replica() -> bool:
+    """
+    Local two-file setup (SQLite primary and replica): copy the primary into
+    the replica file. Nothing replicates between them, so the replica is a
+    snapshot from the last sync (startup, or run this again). Returns whether
+    it copied.
+    """
+    if read_engine is None or read_engine.dialect.name != "sqlite" or engine.dialect.name != "sqlite":
+        return False
+    source, target = engine.raw_connection(), read_engine.raw_connection()
+    try:
+        source.driver_connection.backup(target.driver_connection)
+    finally:
+        target.close()
+        source.close()
+    log("🪞 Copied the SQLite primary into the read replica file")
+    return True
+
+
+@compiles(PrimaryKeyConstraint, "postgresql")
+def _partitioned_primary_key(constraint, compiler, **kw):
+    """
+    Postgres requires the partition key in every unique constraint of a
+    partitioned table: tables declaring info["partition_key"] get it appended
+    to their primary key (other dialects keep the plain key).
+    """
+    table = constraint.table
+    extra = [c for c in (table.info.get("partition_key") or ()) if c not in constraint.columns.keys()]
+    if not extra:
+        return compiler.visit_primary_key_constraint(constraint, **kw)
+    columns = ", ".join(compiler.preparer.quote(c) for c in [*constraint.columns.keys(), *extra])
+    return f"PRIMARY KEY ({columns})"
+
+
+def upsert_insert(db: Session, entity):
+    """
+    Dialect-specific INSERT for `entity` that supports ON CONFLICT upserts.
+    Postgres and SQLite share the same `on_conflict_do_*` API.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(entity)
+    return sqlite.insert(entity)
@@ -1,23 +1,42 @@
 # main.py
 
 import os
+import asyncio
+import time
 import traceback
-import requests
+from datetime import date, datetime, timedelta
+import httpx
 
-from fastapi import FastAPI, Request, Header,HTTPException ,Query
+from fastapi import FastAPI, Request, Response, Header,HTTPException ,Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, RedirectResponse
 from dotenv import load_dotenv
 
-from services.ai_review_service import run_ai_code_review
-from services.github_service import (
-    create_installation_token,
-    get_diff_via_api,
-    post_github_comment,
+from services import admission
+from services.ai_review_service import AI_WARMUP_ON_STARTUP, warm_up as warm_up_ai_runner
+from services.github_service import GITHUB_WEBHOOK_SECRET
+from services.installation_service import handle_installation_event
+from services.oauth_service import close_oauth_client, exchange_code, fetch_github_identity
+from services.review_scheduler import lookup_review_priority, schedule_pull_request_review
+from services.review_worker import REVIEW_QUEUE_MODE, enqueue_pull_request_review
+from services.webhook_capture import WEBHOOK_CAPTURE_DIR, capture_delivery
+from services.webhook_intake import (
+    ALLOW_UNSIGNED_WEBHOOKS,
+    PR_REVIEW_ACTIONS,
+    PullRequestEvent,
+    WebhookDelivery,
+    verify_signature,
 )
+from services.backfill_service import BackfillBusy, backfill_status, begin_backfill, continue_backfill
+from services.billing_service import ROLLOVER_INTERVAL_SECONDS, period_rollover_loop
+from services.retention_service import RETENTION_INTERVAL_SECONDS, prepare_partitions, retention_loop
+from services.rollup_service import ROLLUP_INTERVAL_SECONDS, rollup_loop
+from crud.rollup_crud import get_daily_usage, serialize_rollup
+from utils import metrics, profiler
 from utils.logger import log
+from utils.resilience import CircuitOpenError, breaker_states
 
-from database import Base, engine
+from database import Base, engine, read_engine, sync_sqlite_replica
 import models 
 from fastapi import Depends,status
 from sqlalchemy.orm import Session
@@ -25,22 +44,35 @@ from jose import JWTError
 from auth import create_jwt_token
 
 
-from crud.user_crud import get_user_by_github_id, create_user, increment_user_pr_usage
-from crud.installation_crud import create_installation, get_installation_by_installation_id
-from crud.repo_crud import upsert_repository
-from crud.plan_crud import get_plan_by_slug
-from database import SessionLocal ,get_db
-from models import User ,Installation  # optional, mainly for typing
 from crud.user_crud import (
-    get_user_by_github_id,
-    create_user,
+    get_installations_version,
+    get_user_with_installations,
+    upsert_github_user,
+)
+from crud.installation_crud import create_installation, link_installation_to_user
+from crud.repo_crud import upsert_repository
+from crud.plan_crud import get_default_plan_id
+from database import SessionLocal, get_db, get_read_db, mark_write
+from models import User ,Installation, Repository, PRReviewStatus  # optional, mainly for typing
+from crud.review_log_crud import (
+    MAX_PAGE_SIZE,
+    list_reviews_for_repo,
+    list_reviews_for_user,
+    serialize_review_row,
 )
-from crud.plan_crud import get_plan_by_slug
 
 from utils.jwt_utils import create_access_token, decode_access_token
 from fastapi.security import OAuth2PasswordBearer
 
-from auth_dependency import get_current_user
+from auth_dependency import (
+    WROTE_AT_CLAIM,
+    get_current_github_user_id,
+    get_current_user,
+    get_user_read_db,
+    remember_write,
+    require_admin,
+)
+from utils.http_cache import cache_headers, is_not_modified, make_etag, not_modified
 
 load_dotenv()
 
@@ -55,44 +87,104 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in request profiling (not installed at all unless configured)
+if profiler.PROFILING_ENABLED:
+    app.add_middleware(profiler.ProfilingMiddleware)
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/github/login") 
 
 # Create tables on startup (dev only; prod me Alembic best practice)
 @app.on_event("startup")
 def on_startup():
     Base.metadata.create_all(bind=engine)
+    if read_engine is not None and read_engine.dialect.name == "sqlite" and not sync_sqlite_replica():
+        # Real replicas get the schema through replication
+        Base.metadata.create_all(bind=read_engine)
+    # Postgres: review logs need this month's partition before the first insert
+    prepare_partitions()
+    if not GITHUB_WEBHOOK_SECRET:
+        if ALLOW_UNSIGNED_WEBHOOKS:
+            log("⚠️ GITHUB_WEBHOOK_SECRET unset: accepting unsigned webhooks (ALLOW_UNSIGNED_WEBHOOKS=1)")
+        else:
+            log("⚠️ GITHUB_WEBHOOK_SECRET unset: every webhook will be rejected")
+
+
+@app.on_event("startup")
+async def start_background_jobs():
+    if ROLLOVER_INTERVAL_SECONDS > 0:
+        asyncio.create_task(period_rollover_loop(ROLLOVER_INTERVAL_SECONDS))
+    if ROLLUP_INTERVAL_SECONDS > 0:
+        asyncio.create_task(rollup_loop(ROLLUP_INTERVAL_SECONDS))
+    if RETENTION_INTERVAL_SECONDS > 0:
+        asyncio.create_task(retention_loop(RETENTION_INTERVAL_SECONDS))
+
+    # Optional: build the agent runner in a thread once the worker is up
+    if AI_WARMUP_ON_STARTUP:
+        asyncio.get_running_loop().run_in_executor(None, warm_up_ai_runner)
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    await close_oauth_client()
+
 
 @app.api_route("/ping", methods=["GET", "HEAD"])
 def ping():
     return {"status": "ok"}
 
 
+@app.get("/health")
+def health():
+    """Review pressure (normal / soft / hard) and dependency circuit states."""
+    return {"status": "ok", "pressure": admission.current_pressure(), "dependencies": breaker_states()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus-format counters/gauges for this worker process."""
+    return metrics.render_prometheus()
+
+
 @app.get("/me")
-def get_me(current_user: User = Depends(get_current_user)):
-    return {
-        "id": current_user.id,
-        "github_username": current_user.github_username,
-        "plan": current_user.plan.slug if current_user.plan else None
-    }
+def get_me(request: Request, current_user: User = Depends(get_current_user)):
+    etag = make_etag("me", current_user.id, current_user.updated_at, current_user.plan_id)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    return JSONResponse(
+        content={
+            "id": current_user.id,
+            "github_username": current_user.github_username,
+            "plan": current_user.plan.slug if current_user.plan else None
+        },
+        headers=cache_headers(etag),
+    )
 
 
 # Add this to your main.py
 
 @app.get("/me/installations")
 def get_my_installations(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    github_user_id: int = Depends(get_current_github_user_id),
+    db: Session = Depends(get_user_read_db)
 ):
     """
     Check if current user has any GitHub app installations linked.
     Returns installation details if found.
+    Polling clients send If-None-Match and get a 304 from a single aggregate query.
     """
-    
-    # Query installations for this user
-    installations = db.query(Installation).filter(
-        Installation.user_id == current_user.id
-    ).all()
-    
+    version = get_installations_version(db, github_user_id)
+    if not version:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    etag = make_etag("installations", *version)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    # User + plan + installations in one query
+    current_user = get_user_with_installations(db, github_user_id)
+    installations = current_user.installations
+
     # Prepare response
     has_installations = len(installations) > 0
     
@@ -105,16 +197,159 @@ def get_my_installations(
             "created_at": inst.created_at.isoformat() if inst.created_at else None,
         })
     
-    return {
-        "has_installations": has_installations,
-        "count": len(installations),
-        "installations": installation_list,
-        "user": {
-            "id": current_user.id,
-            "github_username": current_user.github_username,
-            "plan": current_user.plan.slug if current_user.plan else None,
-        }
-    }
+    return JSONResponse(
+        content={
+            "has_installations": has_installations,
+            "count": len(installations),
+            "installations": installation_list,
+            "user": {
+                "id": current_user.id,
+                "github_username": current_user.github_username,
+                "plan": current_user.plan.slug if current_user.plan else None,
+            }
+        },
+        headers=cache_headers(etag),
+    )
+
+
+# ------------------------------------------------------------
+# Review history (keyset pagination over PRReviewLog)
+# ------------------------------------------------------------
+@app.get("/me/reviews")
+def get_my_reviews(
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str = Query(None),
+    status_filter: PRReviewStatus = Query(None, alias="status"),
+    repo: str = Query(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_user_read_db),
+):
+    """Current user's reviews, newest first. Pass `next_cursor` back as `cursor`."""
+    try:
+        rows, next_cursor = list_reviews_for_user(
+            db, current_user.id, limit=limit, cursor=cursor, status=status_filter, repo_full_name=repo
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return {"items": [serialize_review_row(r) for r in rows], "next_cursor": next_cursor}
+
+
+@app.get("/repos/{owner}/{repo}/reviews")
+def get_repo_reviews(
+    owner: str,
+    repo: str,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str = Query(None),
+    status_filter: PRReviewStatus = Query(None, alias="status"),
+    pr_number: int = Query(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_user_read_db),
+):
+    """Review history of one repository the current user has installed the app on."""
+    repo_full_name = f"{owner}/{repo}"
+
+    owns_repo = db.query(Repository.id).join(Installation).filter(
+        Repository.repo_full_name == repo_full_name,
+        Installation.user_id == current_user.id,
+    ).first()
+    if not owns_repo:
+        raise HTTPException(status_code=404, detail="Repository not found")
+
+    try:
+        rows, next_cursor = list_reviews_for_repo(
+            db, repo_full_name, limit=limit, cursor=cursor, status=status_filter, pr_number=pr_number
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return {"items": [serialize_review_row(r) for r in rows], "next_cursor": next_cursor}
+
+
+# ------------------------------------------------------------
+# Usage analytics (daily rollups)
+# ------------------------------------------------------------
+@app.get("/me/usage/daily")
+def get_my_daily_usage(
+    start: date = Query(None),
+    end: date = Query(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_user_read_db),
+):
+    """Current user's reviews/tokens/latency per day (from precomputed rollups)."""
+    rows = get_daily_usage(db, "user", str(current_user.id), start=start, end=end)
+    return {"items": [serialize_rollup(r) for r in rows]}
+
+
+@app.get("/admin/usage/daily", dependencies=[Depends(require_admin)])
+def get_admin_daily_usage(
+    scope: str = Query(..., pattern="^(user|installation|repo|plan)$"),
+    key: str = Query(None),
+    start: date = Query(None),
+    end: date = Query(None),
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_read_db),
+):
+    """Daily rollups for any scope, e.g. ?scope=plan&key=free&start=2026-10-01."""
+    rows = get_daily_usage(db, scope, key, start=start, end=end, limit=limit)
+    return {"items": [serialize_rollup(r) for r in rows]}
+
+
+# ------------------------------------------------------------
+# Profiling (opt-in, see utils.profiler)
+# ------------------------------------------------------------
+@app.get("/admin/profiles", dependencies=[Depends(require_admin)])
+def get_admin_profiles(limit: int = Query(20, ge=1, le=200)):
+    """Slowest recent request profiles of this worker's host (collapsed-stack files)."""
+    return {"profiles": profiler.list_profiles(limit)}
+
+
+@app.get("/admin/profiles/{name}", dependencies=[Depends(require_admin)], response_class=PlainTextResponse)
+def get_admin_profile(name: str):
+    """One profile in collapsed-stack format (feed to flamegraph.pl / speedscope)."""
+    folded = profiler.read_profile(name)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return folded
+
+
+# ------------------------------------------------------------
+# Backfill: review all open PRs of an installation
+# ------------------------------------------------------------
+_backfill_tasks = set()  # strong refs to running backfills
+
+
+async def _run_backfill_in_background(installation_id: int):
+    try:
+        await asyncio.to_thread(continue_backfill, installation_id)
+    except Exception as e:
+        log(f"⚠️ Backfill {installation_id} failed: {e}")
+
+
+@app.post("/admin/installations/{installation_id}/backfill", dependencies=[Depends(require_admin)], status_code=202)
+async def start_backfill(installation_id: int, restart: bool = Query(False)):
+    """Queue reviews for every open PR; resumes an interrupted run unless ?restart=true."""
+    try:
+        state = await asyncio.to_thread(begin_backfill, installation_id, restart)
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Installation not found")
+    except BackfillBusy:
+        raise HTTPException(status_code=409, detail="Backfill already running")
+
+    task = asyncio.create_task(_run_backfill_in_background(installation_id))
+    _backfill_tasks.add(task)
+    task.add_done_callback(_backfill_tasks.discard)
+    return state
+
+
+@app.get("/admin/installations/{installation_id}/backfill", dependencies=[Depends(require_admin)])
+def get_backfill_status(installation_id: int):
+    """Progress of the installation's last backfill (listed / skipped / queued, throttled finish time)."""
+    state = backfill_status(installation_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="No backfill for this installation")
+    return state
+
 
 GITHUB_APP_NAME = os.getenv("GITHUB_APP_NAME")  # same as on GitHub
 
@@ -153,15 +388,15 @@ def github_login():
 
 # ------------------------------------------------------------
 @app.get("/auth/github/callback")
-def github_callback(code: str, db: Session = Depends(get_db)):
+async def github_callback(code: str, db: Session = Depends(get_db)):
     """
     Step 2: GitHub yahan par `code` ke sath redirect karega.
     Hum:
       - code se access_token lenge
-      - user ka GitHub profile lenge
-      - DB me user find/create karenge
+      - user ka GitHub profile + verified emails ek saath lenge
+      - DB me user upsert karenge (ek hi statement)
       - default plan = 'free' set karenge (agar new user hai)
-      - frontend ko minimal info + token (for now just user data) return karenge
+      - frontend ko minimal info + JWT return karenge
     """
     if not GITHUB_CLIENT_ID or not GITHUB_CLIENT_SECRET:
         raise HTTPException(
@@ -170,107 +405,53 @@ def github_callback(code: str, db: Session = Depends(get_db)):
         )
 
     # 1) Exchange code -> access token
-    token_resp = requests.post(
-        "https://github.com/login/oauth/access_token",
-        headers={"Accept": "application/json"},
-        data={
-            "client_id": GITHUB_CLIENT_ID,
-            "client_secret": GITHUB_CLIENT_SECRET,
-            "code": code,
-            "redirect_uri": GITHUB_OAUTH_REDIRECT_URL,
-        },
-        timeout=10,
-    )
+    try:
+        access_token = await exchange_code(code, GITHUB_CLIENT_ID, GITHUB_CLIENT_SECRET, GITHUB_OAUTH_REDIRECT_URL)
+    except httpx.HTTPError as e:
+        log(f"❌ OAuth code exchange error: {e}")
+        raise HTTPException(status_code=502, detail="GitHub is not reachable.")
 
-    if token_resp.status_code != 200:
+    if not access_token:
         raise HTTPException(
             status_code=400,
             detail="Failed to exchange code for access token.",
         )
 
-    token_data = token_resp.json()
-    access_token = token_data.get("access_token")
-
-    if not access_token:
-        raise HTTPException(
-            status_code=400,
-            detail="No access token returned from GitHub.",
-        )
+    # 2) Fetch GitHub user profile + verified emails (concurrently)
+    try:
+        gh_user = await fetch_github_identity(access_token)
+    except httpx.HTTPError as e:
+        log(f"❌ GitHub profile fetch error: {e}")
+        raise HTTPException(status_code=502, detail="GitHub is not reachable.")
 
-    # 2) Fetch GitHub user profile
-    user_resp = requests.get(
-        "https://api.github.com/user",
-        headers={"Authorization": f"Bearer {access_token}"},
-        timeout=10,
-    )
-    if user_resp.status_code != 200:
+    if not gh_user:
         raise HTTPException(
             status_code=400,
             detail="Failed to fetch GitHub user profile.",
         )
 
-    gh_user = user_resp.json()
-    github_user_id = gh_user["id"]
-    github_username = gh_user["login"]
-    avatar_url = gh_user.get("avatar_url")
-    email = gh_user.get("email")  # kabhi None bhi hota hai
-
-    # 3) Check if user exists in DB
-    user = get_user_by_github_id(db, github_user_id)
-
-    if not user:
-        # DEFAULT PLAN: 'free'
-        plan = get_plan_by_slug(db, "free")
-        if not plan:
-            # fallback: create a default free plan
-            from models import Plan
-
-            plan = Plan(
-                name="Free",
-                slug="free",
-                monthly_pr_limit=20,
-                monthly_token_limit=None,
-                is_active=True,
-            )
-            db.add(plan)
-            db.commit()
-            db.refresh(plan)
-
-        user = create_user(
-            db=db,
-            username=github_username,
-            github_user_id=github_user_id,
-            email=email,
-            avatar_url=avatar_url,
-            plan_id=plan.id,
+    # 3) Upsert user: INSERT ... ON CONFLICT ... RETURNING (new users get the free plan)
+    def upsert_user():
+        return upsert_github_user(
+            db,
+            github_user_id=gh_user["id"],
+            username=gh_user["login"],
+            email=gh_user.get("email"),  # kabhi None bhi hota hai
+            avatar_url=gh_user.get("avatar_url"),
+            plan_id=get_default_plan_id(db),
         )
 
-    # ✅ at this point user exists and has a plan (default: free)
-    # TODO: yahan par JWT generate kar sakte ho (auth token for UI)
-    # For now, simple JSON return kar dete hain
-    # app_token = create_access_token({"sub": str(user.id)})
-
-    # return {
-    #     "status": "ok",
-    #     "user": {
-    #         "id": user.id,
-    #         "github_user_id": user.github_user_id,
-    #         "github_username": user.github_username,
-    #         "email": user.email,
-    #         "avatar_url": user.avatar_url,
-    #         "plan": user.plan.slug if user.plan else None,
-    #     },
-    #     "access_token": access_token,  # optional: frontend store kare ya ignore kare
-    #     "app_token": app_token,  
-    # }
+    user_id, github_user_id, github_username, plan_slug = await asyncio.to_thread(upsert_user)
+
     jwt_payload = {
-         "github_user_id": user.github_user_id,
-        "user_id": user.id,
-        "github_username": user.github_username,
-        "plan": user.plan.slug,
+        "github_user_id": github_user_id,
+        "user_id": user_id,
+        "github_username": github_username,
+        "plan": plan_slug,
     }
 
-    jwt_token = create_jwt_token(jwt_payload)
+    # The login itself was a write: reads just after it stay on the primary
+    jwt_token = create_jwt_token({**jwt_payload, WROTE_AT_CLAIM: int(time.time())})
 
     return {
         "status": "ok",
@@ -285,6 +466,7 @@ def github_callback(code: str, db: Session = Depends(get_db)):
 @app.get("/github/install/callback")
 def github_install_callback(
     request: Request,
+    response: Response,
     installation_id: int = Query(...),
     state: str = Query(...),
     setup_action: str = Query(None),
@@ -303,14 +485,15 @@ def github_install_callback(
     if not user:
         return {"error": "User not found"}
 
-    # Save installation
-    create_installation(
+    # Save installation (the webhook may already have inserted it)
+    link_installation_to_user(
         db=db,
         installation_id=installation_id,
         account_login=user.github_username or "unknown", 
         account_type="User",
         user_id=user_id,
     )
+    remember_write(response, user.github_user_id)
 
     return {"status": "installation_linked", "installation_id": installation_id}
 
@@ -338,42 +521,57 @@ async def github_webhook(
     request: Request,
     x_github_event: str = Header(None),
     x_hub_signature_256: str = Header(None),
+    x_github_delivery: str = Header(None),
 ):
     """
     Handle GitHub App webhooks:
-    - installation: save installation to DB
+    - installation / installation_repositories: bulk upsert installation + repos
     - pull_request: check plan → run AI review → post comment
     """
 
+    # Raw body is read once; routing happens before any JSON parsing
+    delivery = WebhookDelivery(x_github_event, await request.body(), x_github_delivery)
+    if WEBHOOK_CAPTURE_DIR:
+        await asyncio.to_thread(capture_delivery, request.headers, delivery.body)
+
+    if not delivery.is_relevant:
+        return {"status": "ignored", "event": x_github_event}
+
+    if not verify_signature(delivery.body, x_hub_signature_256, GITHUB_WEBHOOK_SECRET, ALLOW_UNSIGNED_WEBHOOKS):
+        log("❌ Invalid webhook signature")
+        return JSONResponse(status_code=401, content={"error": "Invalid signature"})
+
+    log(f"📬 Received GitHub event: {x_github_event}")
+
+    if x_github_event == "pull_request":
+        action = delivery.peek_action()
+        if action is not None and action not in PR_REVIEW_ACTIONS:
+            log(f"ℹ️ Ignored PR action: {action}")
+            return {"status": f"ignored_action: {action}"}
+
     try:
-        payload = await request.json()
-    except Exception:
+        payload = delivery.payload
+    except ValueError:
         log("❌ Failed to parse webhook JSON")
         return JSONResponse(status_code=400, content={"error": "Invalid JSON"})
 
-    log(f"📬 Received GitHub event: {x_github_event}")
-
     # --------------------------------------------------------------------
-    # 1) INSTALLATION EVENT → Save installation in DB
+    # 1) INSTALLATION EVENTS → Bulk upsert installation + repositories
     # --------------------------------------------------------------------
-    if x_github_event == "installation":
-        try:
-            installation_id = payload["installation"]["id"]
-            account_login = payload["installation"]["account"]["login"]
-            account_type = payload["installation"]["account"]["type"]  # "User" / "Organization"
-
+    if x_github_event in ("installation", "installation_repositories"):
+        # Bulk upserts of a large org's repos: off the event loop
+        def ingest():
             db = SessionLocal()
+            try:
+                return handle_installation_event(db, x_github_event, payload)
+            finally:
+                db.close()
 
-            create_installation(
-                db,
-                installation_id,
-                account_login,
-                account_type,
-                None      # user_id will be updated when user logs in
-            )
-
-            log(f"🔧 Installation saved: id={installation_id}, account={account_login}")
-            return {"status": "installation_received"}
+        try:
+            result = await asyncio.to_thread(ingest)
+            # The installing user polls /me/installations next
+            mark_write((payload.get("sender") or {}).get("id"))
+            return result
 
         except Exception as e:
             log(f"⚠️ Installation error: {e}")
@@ -384,108 +582,55 @@ async def github_webhook(
     # --------------------------------------------------------------------
     if x_github_event == "pull_request":
         try:
-            action = payload.get("action")
-            if action not in ["opened", "synchronize", "reopened"]:
-                log(f"ℹ️ Ignored PR action: {action}")
-                return {"status": f"ignored_action: {action}"}
-
-            installation_id = payload["installation"]["id"]
-            repo_full_name = payload["repository"]["full_name"]
-            pr = payload["pull_request"]
-            pr_number = pr["number"]
-            head_branch = pr["head"]["ref"]
-            base_branch = pr["base"]["ref"]
-
-            log(f"🔔 PR #{pr_number} {head_branch} → {base_branch} ({repo_full_name})")
-
-            # ----------------------------------------------------------------
-            # Load installation → user → plan from DB
-            # ----------------------------------------------------------------
-            db = SessionLocal()
-            inst = get_installation_by_installation_id(db, installation_id)
-            if not inst:
-                log("❌ Installation not found in DB")
-                return {"status": "installation_not_found"}
-
-            user = inst.user
-            if not user:
-                log("❌ Installation found but no linked user")
-                return {"status": "user_not_linked"}
-
-            plan = user.plan
-            if not plan:
-                log("❌ User has no plan")
-                return {"status": "plan_not_found"}
-
-            used = user.pr_used_this_period or 0
-            limit = plan.monthly_pr_limit or 0
-
-            log(f"📊 User={user.email}, Plan={plan.name}, Used={used}/{limit}")
-
-            # ----------------------------------------------------------------
-            # PLAN LIMIT CHECK — Free plan allows only 2 PRs
-            # ----------------------------------------------------------------
-            if used >= limit:
-                installation_token = create_installation_token(installation_id)
-
-                upgrade_msg = (
-                    f"🚫 **Review Limit Reached**\n\n"
-                    f"Your **{plan.name} plan** allows only **{limit} PR reviews**.\n"
-                    f"👉 Upgrade your plan to continue using AI Review.\n"
+            pr_event = PullRequestEvent.from_payload(payload)
+            if pr_event.action not in PR_REVIEW_ACTIONS:
+                log(f"ℹ️ Ignored PR action: {pr_event.action}")
+                return {"status": f"ignored_action: {pr_event.action}"}
+
+            # Admission control: accept / defer / reject by current pressure
+            priority = await asyncio.to_thread(lookup_review_priority, pr_event)
+            decision = await asyncio.to_thread(admission.decide, priority)
+
+            if decision.action == "reject":
+                log(f"🚦 Overloaded ({decision.level}) — rejecting PR #{pr_event.pr_number}")
+                return JSONResponse(
+                    status_code=503,
+                    content={"status": "rejected_overloaded", "retry_after": decision.retry_after},
+                    headers={"Retry-After": str(decision.retry_after)},
                 )
 
-                post_github_comment(
-                    installation_token,
-                    repo_full_name,
-                    pr_number,
-                    upgrade_msg,
+            deferred = decision.action == "defer"
+            if deferred:
+                log(f"🚦 Pressure {decision.level} — deferring PR #{pr_event.pr_number} by {decision.retry_after}s")
+
+            if REVIEW_QUEUE_MODE == "queue":
+                # Review workers (python -m services.review_worker) pick it up
+                run_after = datetime.utcnow() + timedelta(seconds=decision.retry_after) if deferred else None
+                result = enqueue_pull_request_review(pr_event, priority, run_after)
+            elif deferred:
+                admission.defer_in_background(
+                    schedule_pull_request_review(pr_event, priority, delay=decision.retry_after)
                 )
-
-                log("❌ Limit reached — upgrade required")
-                return {"status": "limit_reached"}
-
-            # ----------------------------------------------------------------
-            # 1) INSTALLATION TOKEN
-            # ----------------------------------------------------------------
-            installation_token = create_installation_token(installation_id)
-
-            # ----------------------------------------------------------------
-            # 2) FETCH PR DIFF
-            # ----------------------------------------------------------------
-            diff = get_diff_via_api(installation_token, repo_full_name, pr_number)
-            if not diff.strip():
-                log("⚠️ Empty diff")
-                return {"status": "skipped_no_diff"}
-
-            log(f"✅ Diff fetched ({len(diff)} chars)")
-
-            # ----------------------------------------------------------------
-            # 3) RUN AI REVIEW
-            # ----------------------------------------------------------------
-            ai_review = await run_ai_code_review(diff, pr_number)
-            if not ai_review:
-                log("⚠️ AI review failed")
-                return {"status": "error_ai_review"}
-
-            # ----------------------------------------------------------------
-            # 4) POST COMMENT
-            # ----------------------------------------------------------------
-            post_github_comment(installation_token, repo_full_name, pr_number, ai_review)
-            log("💬 Review comment posted")
-
-            # ----------------------------------------------------------------
-            # 5) INCREMENT PR USAGE
-            # ----------------------------------------------------------------
-            increment_user_pr_usage(db, user.id)
-            log("📈 PR usage incremented")
-
-            return {
-                "status": "success",
-                "pr_number": pr_number,
-                "used": used + 1,
-                "limit": limit,
-            }
-
+                result = {"status": "deferred", "retry_after": decision.retry_after}
+            else:
+                # Inline: SJF + per-installation caps inside this process
+                return await schedule_pull_request_review(pr_event, priority)
+
+            # Only a review this delivery actually queued gets the marker (not a duplicate)
+            if deferred and admission.ADMISSION_QUEUED_MARKER and result.get("status") in ("queued", "deferred"):
+                admission.defer_in_background(
+                    asyncio.to_thread(admission.post_queued_marker, pr_event, decision.retry_after)
+                )
+            return result
+
+        except CircuitOpenError as e:
+            log(f"🔌 {e} — PR #{pr_event.pr_number} not reviewed")
+            retry_after = int(e.retry_after) + 1
+            return JSONResponse(
+                status_code=503,
+                content={"status": "dependency_unavailable", "dependency": e.name, "retry_after": retry_after},
+                headers={"Retry-After": str(retry_after)},
+            )
         except Exception as e:
             log(f"❌ Error in PR event: {e}")
             traceback.print_exc()
@@ -10,8 +10,13 @@ from sqlalchemy import (
     Boolean,
     BigInteger,
     DateTime,
+    Date,
     ForeignKey,
     Enum,
+    UniqueConstraint,
+    Index,
+    JSON,
+    func,
 )
 from sqlalchemy.orm import relationship
 
@@ -26,6 +31,14 @@ class PRReviewStatus(str, enum.Enum):
     SKIPPED = "skipped"
     ERROR = "error"
     LIMIT_REACHED = "limit_reached"
+    TIMEOUT = "timeout"  # review deadline ran out (see utils/deadline.py)
+
+
+class ReviewJobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    LEASED = "leased"
+    DONE = "done"
+    FAILED = "failed"
 
 
 # ------------------------------------------------------
@@ -41,6 +54,13 @@ class Plan(Base):
     monthly_token_limit = Column(Integer, nullable=True)  # optional: AI token based limit
     stripe_price_id = Column(String(100), nullable=True)  # Stripe price ID
     is_active = Column(Boolean, default=True)
+    # Comma-separated specialist reviewers, e.g. "security,correctness,performance"
+    # (NULL = single agent, unless REVIEW_MODE=parallel)
+    review_dimensions = Column(String(255), nullable=True)
+    # "remote" (OpenRouter) / "local" (self-hosted Ollama); NULL = REVIEW_MODEL_BACKEND
+    model_backend = Column(String(20), nullable=True)
+    # Scheduling boost: each step moves reviews up one size class (0 = none)
+    review_priority = Column(Integer, default=0, server_default="0", nullable=False)
 
     users = relationship("User", back_populates="plan")
 
@@ -67,7 +87,7 @@ class User(Base):
     # Usage tracking
     pr_used_this_period = Column(Integer, default=0, nullable=False)
     period_start = Column(DateTime(timezone=True), nullable=True)  # e.g. billing cycle start
-    period_end = Column(DateTime(timezone=True), nullable=True)    # e.g. billing cycle end
+    period_end = Column(DateTime(timezone=True), nullable=True, index=True)  # e.g. billing cycle end (rollover job scans this)
 
     # Meta
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
@@ -95,9 +115,16 @@ class Installation(Base):
     account_login = Column(String(255), nullable=False)  # org/user login
     account_type = Column(String(50), nullable=True)     # "User" / "Organization"
 
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # NULL until the installing GitHub user signs in (webhook usually arrives first)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
 
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    updated_at = Column(
+        DateTime(timezone=True),
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        server_default=func.now(),
+    )
 
     user = relationship("User", back_populates="installations")
     repositories = relationship("Repository", back_populates="installation")
@@ -109,6 +136,10 @@ class Installation(Base):
 # ------------------------------------------------------
 class Repository(Base):
     __tablename__ = "repositories"
+    __table_args__ = (
+        # Conflict target for bulk upserts from installation webhooks
+        UniqueConstraint("installation_id", "repo_full_name", name="uq_repositories_installation_repo"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -126,6 +157,20 @@ class Repository(Base):
 # ------------------------------------------------------
 class PRReviewLog(Base):
     __tablename__ = "pr_review_logs"
+    __table_args__ = (
+        # Keyset pagination: "my reviews" and per-repo history, newest first
+        Index("ix_pr_review_logs_user_created", "user_id", "created_at", "id"),
+        Index("ix_pr_review_logs_repo_created", "repo_full_name", "created_at", "id"),
+        Index("ix_pr_review_logs_repo_pr_created", "repo_full_name", "pr_number", "created_at"),
+        {
+            # Monthly partitions on Postgres (crud/review_log_partition_crud.py);
+            # SQLite seals each month into its own table instead
+            "postgresql_partition_by": "RANGE (created_at)",
+            "info": {"partition_key": ("created_at",)},
+            # Ids keep counting across sealed SQLite periods
+            "sqlite_autoincrement": True,
+        },
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -133,12 +178,135 @@ class PRReviewLog(Base):
     installation_id = Column(Integer, ForeignKey("installations.id"), nullable=True)
     repo_full_name = Column(String(255), nullable=False)
     pr_number = Column(Integer, nullable=False)
+    head_sha = Column(String(40), nullable=True)  # commit that was reviewed
 
     status = Column(Enum(PRReviewStatus), default=PRReviewStatus.SUCCESS, nullable=False)
     tokens_used = Column(Integer, nullable=True)  # if you track from LLM response
+    duration_ms = Column(Integer, nullable=True)  # wall-clock time of the review
     error_message = Column(String(2000), nullable=True)
 
-    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
 
     user = relationship("User", back_populates="pr_reviews")
     installation = relationship("Installation", back_populates="pr_reviews")
+
+
+# ------------------------------------------------------
+# ReviewJob – leased work item shared by all review workers
+# ------------------------------------------------------
+class ReviewJob(Base):
+    __tablename__ = "review_jobs"
+    __table_args__ = (
+        # Claim scans: queued jobs that are due / leases that have expired
+        Index("ix_review_jobs_status_run_after", "status", "run_after"),
+        Index("ix_review_jobs_status_lease_expires", "status", "lease_expires_at"),
+        # Fair claim: per-installation ranking by virtual deadline
+        Index("ix_review_jobs_status_inst_sched", "status", "installation_id", "sched_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    kind = Column(String(50), nullable=False, default="pull_request")
+    dedupe_key = Column(String(255), unique=True, nullable=True)  # e.g. "pr:owner/repo#12@<head sha>"; cleared once finished
+    payload = Column(JSON, nullable=False)
+
+    # Scheduling: tenant for fairness caps, size/plan class (0 = smallest first)
+    # and virtual deadline = enqueue time + priority * SCHED_PRIORITY_STEP_SECONDS
+    installation_id = Column(BigInteger, nullable=True)
+    priority = Column(Integer, default=1, nullable=False)
+    sched_key = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+
+    status = Column(Enum(ReviewJobStatus), default=ReviewJobStatus.QUEUED, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=5, nullable=False)
+    run_after = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+
+    # Lease (visibility timeout) – extended by heartbeats, reclaimed once expired
+    lease_owner = Column(String(100), nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(String(2000), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    updated_at = Column(
+        DateTime(timezone=True),
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+    )
+
+
+# ------------------------------------------------------
+# UsageRollupDaily – pre-aggregated review stats per scope per day
+# ------------------------------------------------------
+class UsageRollupDaily(Base):
+    __tablename__ = "usage_rollups_daily"
+    __table_args__ = (
+        UniqueConstraint("scope", "scope_key", "day", name="uq_usage_rollups_scope_key_day"),
+        Index("ix_usage_rollups_scope_day", "scope", "day"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    scope = Column(String(20), nullable=False)       # "user" / "installation" / "repo" / "plan"
+    scope_key = Column(String(255), nullable=False)  # user id / installation id / "owner/repo" / plan slug
+    day = Column(Date, nullable=False)
+
+    review_count = Column(Integer, default=0, nullable=False)
+    success_count = Column(Integer, default=0, nullable=False)
+    skipped_count = Column(Integer, default=0, nullable=False)
+    error_count = Column(Integer, default=0, nullable=False)
+    limit_reached_count = Column(Integer, default=0, nullable=False)
+    timeout_count = Column(Integer, default=0, nullable=False)
+    tokens_used = Column(BigInteger, default=0, nullable=False)
+    duration_ms_total = Column(BigInteger, default=0, nullable=False)
+    duration_samples = Column(Integer, default=0, nullable=False)  # rows with a duration (for averages)
+
+    updated_at = Column(
+        DateTime(timezone=True),
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+    )
+
+
+# ------------------------------------------------------
+# RollupWatermark – last PRReviewLog id folded into the rollups
+# ------------------------------------------------------
+class RollupWatermark(Base):
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String(50), primary_key=True)
+    last_log_id = Column(BigInteger, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# ------------------------------------------------------
+# BackfillCheckpoint – resumable "review all open PRs" pass per installation
+# ------------------------------------------------------
+class BackfillCheckpoint(Base):
+    __tablename__ = "backfill_checkpoints"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    installation_id = Column(BigInteger, unique=True, index=True, nullable=False)  # GitHub installation id
+    status = Column(String(20), default="running", nullable=False)  # running / done / failed
+
+    # Position: repos snapshotted at start, current repo, next page of its open PRs (NULL = first)
+    repos = Column(JSON, nullable=False)
+    repo_index = Column(Integer, default=0, nullable=False)
+    page_url = Column(String(1000), nullable=True)
+    # {page url: [etag, next page url]} of fully processed pages, kept across passes
+    page_etags = Column(JSON, nullable=True)
+
+    listed = Column(Integer, default=0, nullable=False)
+    skipped = Column(Integer, default=0, nullable=False)
+    enqueued = Column(Integer, default=0, nullable=False)
+    # Throttle: run_after of the next enqueued review
+    next_run_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(String(2000), nullable=True)
+
+    started_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(
+        DateTime(timezone=True),
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+    )
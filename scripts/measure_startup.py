@@ -0,0 +1,67 @@
+# scripts/measure_startup.py
+"""
+Measure worker startup cost in a fresh interpreter:
+  - import time of `main`
+  - time until the first /ping answers (startup handlers included)
+  - (optional, --runner) time to build the AI agent runner on first use
+
+Usage:
+    python scripts/measure_startup.py [--runs 3] [--runner]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside the child interpreter; prints one JSON line of timings
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import main
+t_import = time.perf_counter() - t0
+
+from fastapi.testclient import TestClient
+t1 = time.perf_counter()
+with TestClient(main.app) as client:
+    assert client.get("/ping").status_code == 200
+    t_ping = time.perf_counter() - t1
+
+    t_runner = None
+    if "--runner" in sys.argv:
+        from services.ai_review_service import get_runner
+        t2 = time.perf_counter()
+        get_runner()
+        t_runner = time.perf_counter() - t2
+
+print(json.dumps({"import": t_import, "first_ping": t_ping, "runner": t_runner}))
+"""
+
+
+def run_once(with_runner: bool) -> dict:
+    args = [sys.executable, "-c", PROBE] + (["--runner"] if with_runner else [])
+    out = subprocess.run(args, cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--runner", action="store_true", help="also time first agent runner construction")
+    args = parser.parse_args()
+
+    results = [run_once(args.runner) for _ in range(args.runs)]
+
+    for key in ("import", "first_ping", "runner"):
+        values = [r[key] for r in results if r[key] is not None]
+        if values:
+            print(f"{key:<11} median={statistics.median(values) * 1000:8.1f} ms  "
+                  f"min={min(values) * 1000:8.1f} ms  max={max(values) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
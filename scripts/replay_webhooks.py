@@ -0,0 +1,271 @@
+# scripts/replay_webhooks.py
+"""
+Replay captured webhook deliveries (WEBHOOK_CAPTURE_DIR archives) against the app
+and report latency percentiles, status codes, errors and app resource use.
+
+Inter-arrival times are preserved and scaled by --speed (1 = real time,
+10 = ten times faster, max = back to back with --concurrency in flight).
+
+  # against a running app (re-signing with its webhook secret)
+  python scripts/replay_webhooks.py captures/*.jsonl.gz --target http://127.0.0.1:8000 --secret s3cret
+
+  # self-contained: starts GitHub/LLM stand-ins, seeds a scratch DB and runs the app
+  python scripts/replay_webhooks.py captures/*.jsonl.gz --serve-app --speed 10
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+from services.webhook_capture import read_capture  # noqa: E402
+
+# Runs in a child interpreter against the scratch DB: one unlimited plan,
+# one user + installation per installation id seen in the capture
+SEED = r"""
+import json, sys
+from database import Base, SessionLocal, engine
+import models
+
+Base.metadata.create_all(bind=engine)
+db = SessionLocal()
+plan = models.Plan(name="Replay", slug="replay", monthly_pr_limit=10**9)
+db.add(plan)
+db.flush()
+for inst_id in json.loads(sys.argv[1]):
+    user = models.User(github_user_id=inst_id, github_username=f"replay-{inst_id}", plan_id=plan.id)
+    db.add(user)
+    db.flush()
+    db.add(models.Installation(installation_id=inst_id, account_login=f"replay-{inst_id}", user_id=user.id))
+db.commit()
+"""
+
+
+def load_deliveries(paths) -> list:
+    return list(read_capture(paths))
+
+
+def installation_ids(deliveries) -> list:
+    ids = set()
+    for _, _, body in deliveries:
+        try:
+            inst = (json.loads(body).get("installation") or {}).get("id")
+        except ValueError:
+            continue
+        if inst:
+            ids.add(int(inst))
+    return sorted(ids)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _private_key_pem() -> str:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+
+
+def _proc_usage(pid: int) -> dict | None:
+    """CPU seconds and resident memory of a Linux process (None elsewhere)."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/status") as f:
+            status = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return None
+    ticks = os.sysconf("SC_CLK_TCK")
+    return {
+        "cpu_seconds": (int(fields[11]) + int(fields[12])) / ticks,
+        "rss_mb": int(status.get("VmRSS", "0 kB").split()[0]) / 1024,
+        "peak_rss_mb": int(status.get("VmHWM", "0 kB").split()[0]) / 1024,
+        "threads": int(status.get("Threads", "0").strip()),
+    }
+
+
+def start_app(deliveries, llm_latency_ms: int, diff_lines: int, extra_env: dict):
+    """Stand-ins + scratch DB + `uvicorn main:app`; returns (base_url, process, cleanup)."""
+    from stub_servers import start_stub_servers
+
+    github_url, llm_url, stop_stubs = start_stub_servers(llm_latency_ms=llm_latency_ms, diff_lines=diff_lines)
+    workdir = tempfile.mkdtemp(prefix="replay-")
+    port = _free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'replay.db')}",
+        "GITHUB_API_URL": github_url,
+        "GITHUB_APP_ID": "1",
+        "GITHUB_PRIVATE_KEY": _private_key_pem(),
+        "GITHUB_WEBHOOK_SECRET": "",
+        "ALLOW_UNSIGNED_WEBHOOKS": "1",
+        "REVIEW_MODEL_BACKEND": "local",
+        "OLLAMA_HOST": llm_url,
+        **extra_env,
+    }
+
+    subprocess.run(
+        [sys.executable, "-c", SEED, json.dumps(installation_ids(deliveries))],
+        cwd=ROOT, env=env, check=True,
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(300):
+        try:
+            if httpx.get(f"{base_url}/ping", timeout=1).status_code == 200:
+                break
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    else:
+        proc.kill()
+        raise SystemExit("app did not start")
+
+    def cleanup():
+        proc.terminate()
+        proc.wait(timeout=10)
+        stop_stubs()
+
+    return base_url, proc, cleanup
+
+
+def _sign(body: bytes, secret: str) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+async def replay(deliveries, target: str, speed: str, concurrency: int, secret: str | None, timeout: float) -> list:
+    """Send every delivery on schedule; returns [(event, status or None, seconds, error)]."""
+    results = []
+    limit = asyncio.Semaphore(concurrency)
+    start_ts = deliveries[0][0] if deliveries else 0
+    factor = None if speed == "max" else float(speed)
+
+    async with httpx.AsyncClient(
+        timeout=timeout, limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    ) as client:
+
+        async def send(ts, headers, body):
+            if factor:
+                delay = (ts - start_ts) / factor - (time.monotonic() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            headers = dict(headers)
+            if secret is not None:
+                headers["x-hub-signature-256"] = _sign(body, secret)
+
+            async with limit:
+                t0 = time.monotonic()
+                try:
+                    res = await client.post(f"{target}/webhook", content=body, headers=headers)
+                    results.append((headers.get("x-github-event"), res.status_code, time.monotonic() - t0, None))
+                except httpx.HTTPError as e:
+                    results.append((headers.get("x-github-event"), None, time.monotonic() - t0, type(e).__name__))
+
+        started = time.monotonic()
+        await asyncio.gather(*(send(*d) for d in deliveries))
+    return results
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0
+
+
+def report(results, wall: float, usage_before, usage_after, health) -> dict:
+    latencies = [r[2] for r in results]
+    statuses, errors = {}, {}
+    for _, status, _, error in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+        if error:
+            errors[error] = errors.get(error, 0) + 1
+
+    summary = {
+        "deliveries": len(results),
+        "wall_seconds": round(wall, 2),
+        "rate_per_second": round(len(results) / wall, 2) if wall else None,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 0.5) * 1000, 1),
+            "p95": round(_percentile(latencies, 0.95) * 1000, 1),
+            "p99": round(_percentile(latencies, 0.99) * 1000, 1),
+            "max": round(max(latencies, default=0) * 1000, 1),
+            "mean": round(statistics.fmean(latencies) * 1000, 1) if latencies else 0,
+        },
+        "status_codes": statuses,
+        "errors": errors,
+        "pressure": health,
+    }
+    if usage_before and usage_after:
+        summary["app"] = {
+            "cpu_seconds": round(usage_after["cpu_seconds"] - usage_before["cpu_seconds"], 2),
+            "rss_mb": round(usage_after["rss_mb"], 1),
+            "peak_rss_mb": round(usage_after["peak_rss_mb"], 1),
+            "threads": usage_after["threads"],
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("captures", nargs="+", help="webhooks-*.jsonl.gz archives")
+    parser.add_argument("--target", default="http://127.0.0.1:8000")
+    parser.add_argument("--speed", default="1", help='time scale: 1, 10, ... or "max"')
+    parser.add_argument("--concurrency", type=int, default=64, help="max deliveries in flight")
+    parser.add_argument("--secret", help="re-sign bodies with this webhook secret")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--serve-app", action="store_true", help="run the app against local stand-ins")
+    parser.add_argument("--llm-latency-ms", type=int, default=800)
+    parser.add_argument("--diff-lines", type=int, default=40)
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE", help="extra env for --serve-app")
+    args = parser.parse_args()
+
+    deliveries = sorted(load_deliveries(args.captures), key=lambda d: d[0])
+    if not deliveries:
+        raise SystemExit("no deliveries in capture")
+
+    target, proc, cleanup = args.target, None, None
+    if args.serve_app:
+        extra_env = dict(kv.split("=", 1) for kv in args.app_env)
+        target, proc, cleanup = start_app(deliveries, args.llm_latency_ms, args.diff_lines, extra_env)
+
+    try:
+        usage_before = _proc_usage(proc.pid) if proc else None
+        t0 = time.monotonic()
+        results = asyncio.run(replay(deliveries, target, args.speed, args.concurrency, args.secret, args.timeout))
+        wall = time.monotonic() - t0
+        usage_after = _proc_usage(proc.pid) if proc else None
+        try:
+            health = httpx.get(f"{target}/health", timeout=5).json().get("pressure")
+        except (httpx.HTTPError, ValueError):
+            health = None
+    finally:
+        if cleanup:
+            cleanup()
+
+    print(json.dumps(report(results, wall, usage_before, usage_after, health), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# scripts/stub_servers.py
+"""
+Local stand-ins for load tests and replays:
+  - GitHub REST API: installation tokens, PR diffs/files, PR comments
+  - Ollama-compatible LLM (/api/chat) with configurable latency
+
+Point the app at them with:
+    GITHUB_API_URL=http://127.0.0.1:<github port>
+    REVIEW_MODEL_BACKEND=local OLLAMA_HOST=http://127.0.0.1:<llm port>
+
+Usage:
+    python scripts/stub_servers.py [--github-port 9001] [--llm-port 9002]
+                                   [--llm-latency-ms 800] [--diff-lines 40]
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_ROUTES = (
+    ("token", "POST", re.compile(r"^/app/installations/\d+/access_tokens$")),
+    ("files", "GET", re.compile(r"^/repos/[^/]+/[^/]+/pulls/\d+/files$")),
+    ("diff", "GET", re.compile(r"^/repos/[^/]+/[^/]+/pulls/(\d+)$")),
+    ("contents", "GET", re.compile(r"^/repos/[^/]+/[^/]+/contents(/.*)?$")),
+    ("comment", "POST", re.compile(r"^/repos/[^/]+/[^/]+/issues/\d+/comments$")),
+)
+
+
+def synthetic_diff(pr_number: int, base_lines: int) -> str:
+    """Deterministic diff whose size varies with the PR number (1x–5x base_lines)."""
+    lines = base_lines * (1 + pr_number % 5)
+    body = "\n".join(f"+    value_{i} = compute({i}, pr={pr_number})" for i in range(lines))
+    return (
+        f"diff --git a/app/module_{pr_number}.py b/app/module_{pr_number}.py\n"
+        f"index 0000000..1111111 100644\n"
+        f"--- a/app/module_{pr_number}.py\n"
+        f"+++ b/app/module_{pr_number}.py\n"
+        f"@@ -1,1 +1,{lines + 1} @@ def handler():\n"
+        f" def handler():\n{body}\n"
+    )
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    stats = Counter()
+    lock = threading.Lock()
+
+    def _send(self, status: int, payload, content_type: str = "application/json"):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _count(self, route: str):
+        with self.lock:
+            self.stats[route] += 1
+
+    def log_message(self, *args):
+        pass
+
+
+class StubGitHub(_Handler):
+    diff_lines = 40
+    stats = Counter()
+
+    def _route(self, method: str):
+        path = self.path.split("?", 1)[0]
+        if method == "GET" and path == "/_stats":
+            return self._send(200, dict(self.stats))
+        for name, route_method, pattern in _ROUTES:
+            match = pattern.match(path)
+            if match and route_method == method:
+                self._count(name)
+                if name == "token":
+                    return self._send(201, {"token": "stub-installation-token", "expires_at": "2099-01-01T00:00:00Z"})
+                if name == "diff":
+                    diff = synthetic_diff(int(match.group(1)), self.diff_lines)
+                    return self._send(200, diff.encode(), "text/plain; charset=utf-8")
+                if name in ("files", "contents"):
+                    return self._send(200, [])
+                if name == "comment":
+                    return self._send(201, {"id": self.stats["comment"]})
+        self._count("not_found")
+        self._send(404, {"message": "Not Found"})
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._body()
+        self._route("POST")
+
+
+class StubLLM(_Handler):
+    """Ollama /api/chat: sleeps latency_ms + per_kchar_ms per 1000 prompt chars."""
+
+    latency_ms = 800
+    per_kchar_ms = 20
+    stats = Counter()
+
+    def do_POST(self):
+        body = json.loads(self._body() or b"{}")
+        if self.path != "/api/chat":
+            return self._send(404, {"error": "not found"})
+        self._count("chat")
+
+        prompt = body.get("messages", [{}])[-1].get("content", "")
+        time.sleep((self.latency_ms + self.per_kchar_ms * len(prompt) / 1000) / 1000)
+        answer = json.dumps({
+            "summary": f"Stub review of {len(prompt)} chars.",
+            "strengths": [],
+            "issues": [],
+            "recommendations": [],
+        })
+        self._send(200, {
+            "model": body.get("model", "stub"),
+            "created_at": "2026-01-01T00:00:00Z",
+            "message": {"role": "assistant", "content": answer},
+            "done": True,
+        })
+
+    def do_GET(self):
+        if self.path == "/_stats":
+            return self._send(200, dict(self.stats))
+        self._send(404, {"error": "not found"})
+
+
+def start_stub_servers(github_port: int = 0, llm_port: int = 0, llm_latency_ms: int = 800, diff_lines: int = 40):
+    """Start both stand-ins on background threads; returns (github_url, llm_url, shutdown)."""
+    github_handler = type("StubGitHubHandler", (StubGitHub,), {"diff_lines": diff_lines, "stats": Counter()})
+    llm_handler = type("StubLLMHandler", (StubLLM,), {"latency_ms": llm_latency_ms, "stats": Counter()})
+
+    servers = [
+        ThreadingHTTPServer(("127.0.0.1", github_port), github_handler),
+        ThreadingHTTPServer(("127.0.0.1", llm_port), llm_handler),
+    ]
+    for server in servers:
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def shutdown():
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+    github_url, llm_url = (f"http://127.0.0.1:{s.server_address[1]}" for s in servers)
+    return github_url, llm_url, shutdown
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--github-port", type=int, default=9001)
+    parser.add_argument("--llm-port", type=int, default=9002)
+    parser.add_argument("--llm-latency-ms", type=int, default=800)
+    parser.add_argument("--diff-lines", type=int, default=40)
+    args = parser.parse_args()
+
+    github_url, llm_url, shutdown = start_stub_servers(
+        args.github_port, args.llm_port, args.llm_latency_ms, args.diff_lines
+    )
+    print(f"GITHUB_API_URL={github_url}")
+    print(f"OLLAMA_HOST={llm_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+# services/admission.py
+# Admission control for PR reviews: pressure from backlog depth and measured
+# throughput decides whether a new review is accepted, deferred or rejected.
+
+import asyncio
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from utils import metrics
+from utils.logger import log
+
+ADMISSION_SOFT_BACKLOG = int(os.getenv("ADMISSION_SOFT_BACKLOG", "50"))
+ADMISSION_HARD_BACKLOG = int(os.getenv("ADMISSION_HARD_BACKLOG", "200"))
+# Estimated time to drain the backlog at the measured review rate
+ADMISSION_SOFT_WAIT_SECONDS = int(os.getenv("ADMISSION_SOFT_WAIT_SECONDS", "600"))
+ADMISSION_HARD_WAIT_SECONDS = int(os.getenv("ADMISSION_HARD_WAIT_SECONDS", "3600"))
+# Throughput EWMA time constant, and how long queue-mode stats are reused
+ADMISSION_RATE_WINDOW_SECONDS = int(os.getenv("ADMISSION_RATE_WINDOW_SECONDS", "300"))
+ADMISSION_STATS_TTL_SECONDS = float(os.getenv("ADMISSION_STATS_TTL_SECONDS", "5"))
+# Post a "review queued" comment on deferred PRs
+ADMISSION_QUEUED_MARKER = os.getenv("ADMISSION_QUEUED_MARKER", "1") == "1"
+
+PRESSURE_NORMAL = "normal"
+PRESSURE_SOFT = "soft"
+PRESSURE_HARD = "hard"
+
+
+class RateMeter:
+    """Exponentially weighted events/second (time constant `window` seconds)."""
+
+    def __init__(self, window: float = ADMISSION_RATE_WINDOW_SECONDS):
+        self.window = window
+        self._count = 0.0
+        self._at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _decay(self, now: float):
+        self._count *= math.exp(-(now - self._at) / self.window)
+        self._at = now
+
+    def mark(self, n: int = 1):
+        with self._lock:
+            self._decay(time.monotonic())
+            self._count += n
+
+    def rate(self) -> float:
+        with self._lock:
+            self._decay(time.monotonic())
+            return self._count / self.window
+
+
+_completions = RateMeter()
+_queue_stats = {"at": 0.0, "value": (0, 0)}
+
+
+def record_completion():
+    """Called once per finished review (any outcome) in this process."""
+    _completions.mark()
+
+
+def _queue_backlog_and_rate() -> tuple:
+    """Queue mode: backlog and rate come from review_jobs, cached briefly."""
+    from crud.job_crud import get_queue_stats
+    from database import SessionLocal
+
+    if time.monotonic() - _queue_stats["at"] > ADMISSION_STATS_TTL_SECONDS:
+        db = SessionLocal()
+        try:
+            _queue_stats["value"] = get_queue_stats(db, ADMISSION_RATE_WINDOW_SECONDS)
+        finally:
+            db.close()
+        _queue_stats["at"] = time.monotonic()
+
+    backlog, finished = _queue_stats["value"]
+    return backlog, finished / ADMISSION_RATE_WINDOW_SECONDS
+
+
+def current_pressure() -> dict:
+    """Pressure level plus the numbers behind it (also served by GET /health)."""
+    from services.review_scheduler import get_scheduler
+    from services.review_worker import REVIEW_QUEUE_MODE
+
+    if REVIEW_QUEUE_MODE == "queue":
+        backlog, rate = _queue_backlog_and_rate()
+    else:
+        scheduler = get_scheduler()
+        backlog = scheduler.queued + scheduler.running + _deferred_waiting
+        rate = _completions.rate()
+
+    drain = backlog / rate if rate > 0 else None
+    if backlog >= ADMISSION_HARD_BACKLOG or (drain is not None and drain >= ADMISSION_HARD_WAIT_SECONDS):
+        level = PRESSURE_HARD
+    elif backlog >= ADMISSION_SOFT_BACKLOG or (drain is not None and drain >= ADMISSION_SOFT_WAIT_SECONDS):
+        level = PRESSURE_SOFT
+    else:
+        level = PRESSURE_NORMAL
+
+    metrics.set_gauge("review_backlog", backlog)
+    metrics.set_gauge("review_throughput_per_minute", rate * 60)
+    return {
+        "level": level,
+        "backlog": backlog,
+        "throughput_per_minute": round(rate * 60, 2),
+        "estimated_drain_seconds": int(drain) if drain is not None else None,
+    }
+
+
+@dataclass
+class AdmissionDecision:
+    action: str  # "accept" | "defer" | "reject"
+    level: str
+    retry_after: int = 0  # seconds; deferral delay or Retry-After hint
+
+
+def decide(priority: int, pressure: dict | None = None) -> AdmissionDecision:
+    """
+    normal → accept everything
+    soft   → small PRs accepted, the rest deferred until the backlog drains
+    hard   → small PRs deferred, the rest rejected with a Retry-After hint
+    """
+    pressure = pressure or current_pressure()
+    level = pressure["level"]
+    drain = pressure["estimated_drain_seconds"]
+    # Without a measured rate, assume a minute per queued review ahead of us
+    wait = drain if drain is not None else pressure["backlog"] * 60
+
+    if level == PRESSURE_NORMAL or (level == PRESSURE_SOFT and priority == 0):
+        decision = AdmissionDecision("accept", level)
+    elif level == PRESSURE_SOFT or priority == 0:
+        decision = AdmissionDecision("defer", level, retry_after=max(60, wait))
+    else:
+        # Retry once enough has drained to drop back under the soft threshold
+        excess = max(0, pressure["backlog"] - ADMISSION_SOFT_BACKLOG)
+        per_review = wait / pressure["backlog"] if pressure["backlog"] else 60
+        decision = AdmissionDecision("reject", level, retry_after=max(60, int(excess * per_review)))
+
+    metrics.inc("review_admission_total", action=decision.action, level=level)
+    return decision
+
+
+def post_queued_marker(pr_event, eta_seconds: int):
+    """Cheap "review queued" comment on a deferred PR (errors are only logged)."""
+    from services.github_service import create_installation_token, post_github_comment
+
+    minutes = max(1, round(eta_seconds / 60))
+    body = (
+        "⏳ **AI review queued**\n\n"
+        f"We're under heavy load right now; this PR will be reviewed in about {minutes} min."
+    )
+    try:
+        token = create_installation_token(pr_event.installation_id)
+        post_github_comment(token, pr_event.repo_full_name, pr_event.pr_number, body)
+    except Exception as e:
+        log(f"⚠️ Could not post queued marker: {e}")
+
+
+_deferred_tasks = set()
+# Inline mode: deferred reviews still sleeping out their delay (not in the scheduler yet)
+_deferred_waiting = 0
+
+
+@contextmanager
+def deferred_wait():
+    """Counts a deferred inline review towards the backlog while it waits."""
+    global _deferred_waiting
+    _deferred_waiting += 1
+    try:
+        yield
+    finally:
+        _deferred_waiting -= 1
+
+
+def _deferred_done(task):
+    _deferred_tasks.discard(task)
+    if not task.cancelled() and task.exception():
+        log(f"❌ Deferred task failed: {task.exception()}")
+
+
+def defer_in_background(coro):
+    """Run a deferred review / marker later in this process (not persisted)."""
+    task = asyncio.get_running_loop().create_task(coro)
+    _deferred_tasks.add(task)
+    task.add_done_callback(_deferred_done)
+    return task
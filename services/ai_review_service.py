@@ -1,11 +1,14 @@
+import asyncio
+import json
 import uuid
+import threading
 import traceback
 import os
-from google.genai import types
-from google.adk.runners import Runner
-from google.adk.sessions import DatabaseSessionService
-from code_review_agent.agent import agent as code_review_agent
+from services.batch_review import get_tiny_batcher, is_tiny_diff
+from services.review_merge import merge_reviews, parse_review_json
 from utils.logger import log
+from utils.resilience import CircuitOpenError, acall_with_retry, get_breaker
+from utils.token_usage import TokenUsage, adk_event_tokens, add_usage, litellm_tokens
 
 # AI Session Database Configuration
 # Can use the same DATABASE_URL as main app, or a separate one
@@ -19,39 +22,257 @@ elif AI_SESSION_DB_URL.startswith("postgresql://"):
     # Convert PostgreSQL URL to use asyncpg driver for async support
     AI_SESSION_DB_URL = AI_SESSION_DB_URL.replace("postgresql://", "postgresql+asyncpg://")
 
-session_service = DatabaseSessionService(db_url=AI_SESSION_DB_URL)
-runner = Runner(agent=code_review_agent, app_name="agents", session_service=session_service)
+# "single" = one agent covers every dimension; "parallel" = specialists run concurrently
+REVIEW_MODE = os.getenv("REVIEW_MODE", "single")
+
+# "remote" = ADK agent via OpenRouter; "local" = Ollama-compatible server (see local_model_service)
+REVIEW_MODEL_BACKEND = os.getenv("REVIEW_MODEL_BACKEND", "remote")
+
+# Model behind the remote backend (code_review_agent/agent.py); names its circuit breaker
+OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "openrouter/kwaipilot/kat-coder-pro-v1:free")
+
+# Warm the agent runner in the background once the worker is serving
+AI_WARMUP_ON_STARTUP = os.getenv("AI_WARMUP_ON_STARTUP", "0") == "1"
+
+# google.adk / litellm / PyGithub are heavy to import, so the session service
+# and runner are built on first use instead of at import time.
+_session_service = None
+_runner = None
+_parallel_runners = {}
+_runner_lock = threading.Lock()
+
+
+def get_runner():
+    """Return the shared (session_service, runner), building them on first call."""
+    global _session_service, _runner
+
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                from google.adk.runners import Runner
+                from google.adk.sessions import DatabaseSessionService
+                from code_review_agent.agent import agent as code_review_agent
+
+                _session_service = DatabaseSessionService(db_url=AI_SESSION_DB_URL)
+                _runner = Runner(agent=code_review_agent, app_name="agents", session_service=_session_service)
+                log("🤖 AI review runner initialised")
+
+    return _session_service, _runner
+
+
+def get_parallel_runner(dimensions):
+    """Runner for a ParallelAgent of specialists; one per distinct dimension set."""
+    session_service, _ = get_runner()
+    key = tuple(sorted(dimensions))
+
+    if key not in _parallel_runners:
+        with _runner_lock:
+            if key not in _parallel_runners:
+                from google.adk.runners import Runner
+                from code_review_agent.specialists import get_parallel_review_agent
+
+                _parallel_runners[key] = Runner(
+                    agent=get_parallel_review_agent(key),
+                    app_name="agents",
+                    session_service=session_service,
+                )
+                log(f"🤖 Parallel review runner initialised: {', '.join(key)}")
+
+    return session_service, _parallel_runners[key]
+
+
+def resolve_review_dimensions(plan) -> list | None:
+    """
+    Specialist dimensions for a plan: its own comma-separated list, or the
+    default set when REVIEW_MODE=parallel. None → single monolithic agent.
+    """
+    configured = getattr(plan, "review_dimensions", None) if plan else None
+    if not configured and REVIEW_MODE != "parallel":
+        return None
+
+    # Importing the specialists pulls in google.adk; only pay for it when used
+    from code_review_agent.specialists import DEFAULT_PARALLEL_DIMENSIONS, REVIEW_DIMENSIONS
+
+    if configured:
+        dims = [d.strip().lower() for d in configured.split(",")]
+        return [d for d in dims if d in REVIEW_DIMENSIONS] or None
+    if REVIEW_MODE == "parallel":
+        return list(DEFAULT_PARALLEL_DIMENSIONS)
+    return None
+
+
+def warm_up():
+    """Build the runner ahead of the first review (errors are logged, not raised)."""
+    try:
+        get_runner()
+    except Exception as e:
+        log(f"⚠️ AI runner warm-up failed: {e}")
+
+
+def resolve_model_backend(plan) -> str:
+    """Plan's `model_backend` ("local" / "remote"), else REVIEW_MODEL_BACKEND."""
+    backend = getattr(plan, "model_backend", None) if plan else None
+    return (backend or REVIEW_MODEL_BACKEND).lower()
+
+
+async def _run_agent(session_service, runner, diff: str, pr_number: int, usage: TokenUsage | None = None) -> dict:
+    """Run one agent turn over the diff; returns the last text per event author (tokens go to `usage`)."""
+    from google.genai import types
 
-async def run_ai_code_review(diff: str, pr_number: int):
-    """Send diff to AI agent and get structured feedback."""
     user_id = "github_auto_reviewer"
     session_id = f"pr_{pr_number}_{uuid.uuid4().hex[:8]}"
-    final_response = None
+    texts = {}
+
+    await session_service.create_session(
+        app_name=runner.app_name,
+        user_id=user_id,
+        session_id=session_id
+    )
+    content = types.Content(
+        role="user",
+        parts=[types.Part(text=f"Review this code diff:\n\n{diff}")]
+    )
+
+    async for event in runner.run_async(
+        user_id=user_id,
+        session_id=session_id,
+        new_message=content
+    ):
+        add_usage(usage, adk_event_tokens(event))
+        if getattr(event, "content", None) and getattr(event.content, "parts", None):
+            for part in event.content.parts:
+                if getattr(part, "text", None):
+                    texts[getattr(event, "author", None)] = part.text
+                    texts[None] = part.text  # overall last answer
+    return texts
+
+
+async def _run_parallel_review(diff: str, pr_number: int, dimensions, usage: TokenUsage | None = None) -> str | None:
+    """Specialists review concurrently; their JSON findings are merged and ranked."""
+    session_service, runner = await asyncio.to_thread(get_parallel_runner, dimensions)
+    texts = await _run_agent(session_service, runner, diff, pr_number, usage)
+
+    results = {d: parse_review_json(texts.get(f"{d}_reviewer")) for d in dimensions}
+    if not any(results.values()):
+        return None
+
+    missing = [d for d, r in results.items() if not r]
+    if missing:
+        log(f"⚠️ No usable output from specialists: {', '.join(missing)}")
+    return json.dumps(merge_reviews(results), indent=2)
+
+
+def model_breaker_name(backend: str, model: str | None = None) -> str:
+    """One breaker per model: the local server's model or the remote one."""
+    if model:
+        return f"llm:{model}"
+    if backend == "local":
+        from services.local_model_service import OLLAMA_MODEL
+
+        return f"llm:{OLLAMA_MODEL}"
+    return f"llm:{OPENROUTER_MODEL}"
+
 
+def is_transient_model_error(e: Exception) -> bool:
+    """
+    Provider hiccups worth retrying: connection errors / timeouts and
+    429 / 5xx (litellm and ollama errors carry `status_code`, httpx ones a response).
+    """
+    import httpx
+
+    if isinstance(e, (httpx.TransportError, ConnectionError, TimeoutError)):
+        return True
+    if type(e).__name__ in ("APIConnectionError", "Timeout", "ServiceUnavailableError", "RateLimitError"):
+        return True
+    status = getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+async def complete_json(
+    system: str, prompt: str, model: str = OPENROUTER_MODEL, usage: TokenUsage | None = None
+) -> str | None:
+    """One direct litellm chat call in JSON mode: no ADK session, no agent instruction."""
+    import litellm
+
+    response = await litellm.acompletion(
+        model=model,
+        api_key=os.getenv("OPENROUTER_API_KEY"),
+        messages=[{"role": "system", "content": system}, {"role": "user", "content": prompt}],
+        response_format={"type": "json_object"},
+    )
+    add_usage(usage, litellm_tokens(response))
+    return response.choices[0].message.content
+
+
+async def _review_once(
+    diff: str,
+    pr_number: int,
+    dimensions,
+    backend: str,
+    context: str = "",
+    model: str | None = None,
+    usage: TokenUsage | None = None,
+) -> str | None:
+    if context:
+        diff = f"{diff}\n\n## Surrounding code (reference only — review the diff above)\n\n{context}"
+    if backend == "local":
+        from services.local_model_service import get_local_backend
+
+        return await get_local_backend().review(diff, usage)
+    if model:
+        # Routed to a specific model: the compact review prompt, one call
+        from services.local_model_service import LOCAL_REVIEW_INSTRUCTION
+
+        return await complete_json(LOCAL_REVIEW_INSTRUCTION, f"Review this code diff:\n\n{diff}", model, usage)
+    if dimensions:
+        return await _run_parallel_review(diff, pr_number, dimensions, usage)
+    # First call pays the import/construction cost off the event loop
+    session_service, runner = await asyncio.to_thread(get_runner)
+    texts = await _run_agent(session_service, runner, diff, pr_number, usage)
+    return texts.get(None)
+
+
+async def run_ai_code_review(
+    diff: str,
+    pr_number: int,
+    dimensions=None,
+    backend: str = "remote",
+    context: str = "",
+    model: str | None = None,
+    installation_id: int | None = None,
+    usage: TokenUsage | None = None,
+):
+    """
+    Send diff to AI agent and get structured feedback.
+    With `dimensions`, focused specialists run in parallel instead of one agent.
+    backend="local" sends the diff to the self-hosted model server instead.
+    `model` (set by routing) reviews with that model and the compact prompt.
+    `context` (enclosing code of the hunks) is appended for reference only.
+    Tiny diffs (TINY_PR_BATCH_ENABLED) are batched with other PRs' of the same
+    `installation_id` into one call, which is retried and counted on the
+    breaker once for the whole batch.
+    Transient provider errors are retried behind the model's circuit breaker;
+    CircuitOpenError is raised so the review can be retried later.
+    Tokens of every model call (retries included) are added to `usage`.
+    """
+    final_response = None
     try:
-        await session_service.create_session(
-            app_name=runner.app_name,
-            user_id=user_id,
-            session_id=session_id
-        )
-        content = types.Content(
-            role="user",
-            parts=[types.Part(text=f"Review this code diff:\n\n{diff}")]
-        )
-
-        async for event in runner.run_async(
-            user_id=user_id,
-            session_id=session_id,
-            new_message=content
-        ):
-            if getattr(event, "content", None) and getattr(event.content, "parts", None):
-                for part in event.content.parts:
-                    if getattr(part, "text", None):
-                        final_response = part.text
+        if backend != "local" and not dimensions and is_tiny_diff(diff):
+            # Tiny PRs share one structured model call; None = not answered, review alone
+            final_response = await get_tiny_batcher().review(diff, pr_number, installation_id, model, usage)
+        if not final_response:
+            final_response = await acall_with_retry(
+                get_breaker(model_breaker_name(backend, model)),
+                lambda: _review_once(diff, pr_number, dimensions, backend, context, model, usage),
+                is_transient_model_error,
+            )
+
         if final_response:
             log("✅ AI Review completed.")
             return final_response
         log("⚠️ No response from AI agent.")
+    except CircuitOpenError:
+        raise
     except Exception as e:
         log(f"❌ AI runner failed: {e}")
         traceback.print_exc()
@@ -0,0 +1,212 @@
+# services/backfill_service.py
+"""
+Backfill: review every open PR of an installation (e.g. right after an org
+installs the app), not just PRs that get new events.
+
+Open PRs are listed repo by repo with paginated, conditional GitHub requests;
+PRs whose head SHA was already reviewed are skipped and the rest are queued
+for the review workers at BACKFILL_REVIEWS_PER_MINUTE, behind live reviews,
+so onboarding a 2,000-PR org takes a predictable 2000 / rate minutes. Every
+page is checkpointed (backfill_checkpoints), so an interrupted run resumes
+where it stopped.
+
+    python -m services.backfill_service <installation_id> [--restart]
+
+or POST /admin/installations/{installation_id}/backfill.
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+from crud.backfill_crud import claim_backfill, get_backfill, serialize_backfill
+from crud.installation_crud import get_installation_by_installation_id
+from crud.repo_crud import get_repositories_by_installation
+from crud.review_log_crud import reviewed_head_shas
+from database import SessionLocal
+from services.github_service import create_installation_token, list_open_pulls_page, open_pulls_url
+from services.review_scheduler import PRIORITY_CLASSES
+from services.review_worker import REVIEW_QUEUE_MODE, enqueue_pull_request_review
+from services.webhook_intake import PullRequestEvent
+from utils import metrics
+from utils.logger import log
+
+# Reviews queued per minute for one installation (spaced out via the jobs' run_after)
+BACKFILL_REVIEWS_PER_MINUTE = float(os.getenv("BACKFILL_REVIEWS_PER_MINUTE", "10"))
+BACKFILL_PAGE_SIZE = int(os.getenv("BACKFILL_PAGE_SIZE", "100"))
+# Pause listing while fewer GitHub requests than this are left in the rate-limit window
+BACKFILL_RATE_LIMIT_FLOOR = int(os.getenv("BACKFILL_RATE_LIMIT_FLOOR", "200"))
+# A running backfill that hasn't checkpointed for this long is considered dead and resumable
+BACKFILL_STALE_SECONDS = int(os.getenv("BACKFILL_STALE_SECONDS", "300"))
+
+# Behind every live review size class
+BACKFILL_PRIORITY = len(PRIORITY_CLASSES)
+# Installation tokens live an hour; refresh well before
+TOKEN_REFRESH_SECONDS = 45 * 60
+
+
+class BackfillBusy(Exception):
+    """Another run of this installation's backfill is still making progress."""
+
+
+def _pr_event(installation_id: int, repo_full_name: str, pr: dict) -> PullRequestEvent:
+    # The list endpoint has no size fields; the review still sees the real diff
+    return PullRequestEvent(
+        action="backfill",
+        installation_id=installation_id,
+        repo_full_name=repo_full_name,
+        pr_number=pr["number"],
+        head_ref=pr["head"]["ref"],
+        base_ref=pr["base"]["ref"],
+        head_sha=pr["head"].get("sha"),
+        base_sha=pr["base"].get("sha"),
+    )
+
+
+def _pr_summary(pr: dict) -> list:
+    # What _pr_event needs, stored with the page's ETag so a 304 can be replayed
+    return [pr["number"], pr["head"].get("sha"), pr["head"]["ref"], pr["base"]["ref"], pr["base"].get("sha")]
+
+
+def _summary_pr(row: list) -> dict:
+    number, head_sha, head_ref, base_ref, base_sha = row
+    return {"number": number, "head": {"ref": head_ref, "sha": head_sha}, "base": {"ref": base_ref, "sha": base_sha}}
+
+
+def begin_backfill(installation_id: int, restart: bool = False) -> dict:
+    """
+    Claim the installation's backfill (new pass or resume). Raises LookupError
+    for an unknown installation, BackfillBusy if it is already running.
+    """
+    db = SessionLocal()
+    try:
+        inst = get_installation_by_installation_id(db, installation_id)
+        if not inst:
+            raise LookupError(f"installation {installation_id} not found")
+        repos = sorted(r.repo_full_name for r in get_repositories_by_installation(db, inst.id) if r.is_active)
+
+        cp = claim_backfill(db, installation_id, repos, restart=restart, stale_seconds=BACKFILL_STALE_SECONDS)
+        if cp is None:
+            raise BackfillBusy(f"backfill for installation {installation_id} is already running")
+        if REVIEW_QUEUE_MODE != "queue":
+            log("⚠️ Backfill queues reviews for `python -m services.review_worker` (REVIEW_QUEUE_MODE is not queue)")
+        return serialize_backfill(cp)
+    finally:
+        db.close()
+
+
+def _enqueue_page(db, cp, repo_full_name: str, pulls: list, enqueue, now: datetime) -> None:
+    interval = timedelta(minutes=1 / BACKFILL_REVIEWS_PER_MINUTE)
+    reviewed = reviewed_head_shas(db, repo_full_name, {pr["head"].get("sha") for pr in pulls})
+
+    for pr in pulls:
+        cp.listed += 1
+        if pr["head"].get("sha") in reviewed:
+            cp.skipped += 1
+            continue
+
+        run_after = max(cp.next_run_at.replace(tzinfo=None) if cp.next_run_at else now, now)
+        result = enqueue(_pr_event(cp.installation_id, repo_full_name, pr), priority=BACKFILL_PRIORITY, run_after=run_after)
+        if result.get("status") == "queued":
+            cp.enqueued += 1
+            cp.next_run_at = run_after + interval
+        else:
+            cp.skipped += 1  # already queued by a webhook or an earlier pass
+
+
+def continue_backfill(
+    installation_id: int,
+    fetch_page=list_open_pulls_page,
+    enqueue=enqueue_pull_request_review,
+    get_token=create_installation_token,
+) -> dict:
+    """
+    Work through a claimed backfill from its checkpoint to the end, one page
+    per transaction. Errors mark it failed (a later run resumes) and re-raise.
+    """
+    db = SessionLocal()
+    cp = get_backfill(db, installation_id)
+    if cp is None:
+        db.close()
+        raise LookupError(f"no backfill claimed for installation {installation_id}")
+    token, token_at = None, 0.0
+    try:
+        while cp.repo_index < len(cp.repos):
+            if token is None or time.monotonic() - token_at > TOKEN_REFRESH_SECONDS:
+                token, token_at = get_token(installation_id), time.monotonic()
+
+            repo_full_name = cp.repos[cp.repo_index]
+            url = cp.page_url or open_pulls_url(repo_full_name, BACKFILL_PAGE_SIZE)
+            known = (cp.page_etags or {}).get(url)
+            if known and len(known) < 3:
+                known = None  # stored before page summaries were kept: fetch it in full
+
+            page = fetch_page(token, url, etag=known[0] if known else None)
+            metrics.inc("backfill_pages_total", result="not_modified" if page.not_modified else "fetched")
+            if page.not_modified:
+                # Same open PRs and head SHAs as when this page was last listed, but
+                # their reviews may have failed since: re-check them like a fresh page
+                pulls, next_url = [_summary_pr(row) for row in known[2]], known[1]
+            else:
+                pulls, next_url = page.items, page.next_url
+                if page.etag:
+                    # JSON column: assign a new dict so the change is persisted
+                    cp.page_etags = {
+                        **(cp.page_etags or {}),
+                        url: [page.etag, next_url, [_pr_summary(pr) for pr in pulls]],
+                    }
+            _enqueue_page(db, cp, repo_full_name, pulls, enqueue, datetime.utcnow())
+
+            if next_url:
+                cp.page_url = next_url
+            else:
+                cp.repo_index += 1
+                cp.page_url = None
+            cp.updated_at = datetime.utcnow()
+            db.commit()
+
+            if page.rate_remaining is not None and page.rate_remaining < BACKFILL_RATE_LIMIT_FLOOR:
+                wait = max(1, min((page.rate_reset or 0) - time.time(), BACKFILL_STALE_SECONDS // 2))
+                log(f"⏳ Backfill {installation_id}: {page.rate_remaining} GitHub requests left, pausing {wait:.0f}s")
+                time.sleep(wait)
+
+        cp.status = "done"
+        cp.finished_at = datetime.utcnow()
+        db.commit()
+        log(
+            f"✅ Backfill {installation_id} listed {cp.listed} open PRs: "
+            f"{cp.enqueued} queued, {cp.skipped} skipped"
+        )
+        return serialize_backfill(cp)
+    except Exception as e:
+        db.rollback()
+        cp.status = "failed"
+        cp.last_error = str(e)[:2000]
+        db.commit()
+        log(f"❌ Backfill {installation_id} stopped at repo {cp.repo_index + 1}/{len(cp.repos)}: {e}")
+        raise
+    finally:
+        db.close()
+
+
+def run_backfill(installation_id: int, restart: bool = False) -> dict:
+    begin_backfill(installation_id, restart=restart)
+    return continue_backfill(installation_id)
+
+
+def backfill_status(installation_id: int) -> dict | None:
+    db = SessionLocal()
+    try:
+        cp = get_backfill(db, installation_id)
+        return serialize_backfill(cp) if cp else None
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Review every open PR of a GitHub App installation.")
+    parser.add_argument("installation_id", type=int, help="GitHub installation id")
+    parser.add_argument("--restart", action="store_true", help="start a new pass instead of resuming")
+    args = parser.parse_args()
+    print(run_backfill(args.installation_id, restart=args.restart))
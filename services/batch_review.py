@@ -0,0 +1,232 @@
+# services/batch_review.py
+# Micro-batching for tiny PRs (dependency bumps, typo fixes, one-line config):
+# diffs arriving within a short window are packed into ONE structured model
+# call instead of each paying for a session, the full agent instruction and
+# its own round trip. Results are fanned back out per PR. Batches never mix
+# installations: one customer's code (or prompt injection) must not reach
+# another customer's review.
+
+import asyncio
+import json
+import os
+
+from services.review_merge import parse_review_json
+from utils import metrics
+from utils.logger import log
+from utils.resilience import CircuitOpenError, acall_with_retry, get_breaker
+from utils.token_usage import TokenUsage, add_usage
+
+TINY_PR_BATCH_ENABLED = os.getenv("TINY_PR_BATCH_ENABLED", "0") == "1"
+# Diffs up to this size (chars) are batch candidates
+TINY_PR_MAX_CHARS = int(os.getenv("TINY_PR_MAX_CHARS", "3000"))
+TINY_PR_BATCH_WINDOW_MS = int(os.getenv("TINY_PR_BATCH_WINDOW_MS", "750"))
+# Prompt budget per batched call (estimated at ~4 chars per token)
+TINY_PR_BATCH_MAX_TOKENS = int(os.getenv("TINY_PR_BATCH_MAX_TOKENS", "12000"))
+TINY_PR_BATCH_MAX_ITEMS = int(os.getenv("TINY_PR_BATCH_MAX_ITEMS", "16"))
+
+BATCH_REVIEW_INSTRUCTION = """
+You are a senior code reviewer. You receive several small, independent pull
+request diffs, each tagged with an id. Review each one on its own for
+correctness, security and maintainability; report only actionable findings
+(an empty list is fine for trivial changes).
+
+Respond with JSON only, one entry per id, in exactly this format:
+{
+  "reviews": [
+    {
+      "id": "<id>",
+      "summary": "Overall findings and impression",
+      "strengths": ["..."],
+      "issues": [{"file": "path", "code": "snippet", "severity": "high|medium|low", "issue": "what and why"}],
+      "recommendations": ["..."]
+    }
+  ]
+}
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def build_batch_prompt(items) -> str:
+    """items: [(id, diff)] → one user message with every diff fenced by its id."""
+    parts = [f"Review these {len(items)} pull requests independently.\n"]
+    for item_id, diff in items:
+        parts.append(f'<pr id="{item_id}">\n{diff}\n</pr>')
+    return "\n\n".join(parts)
+
+
+def split_batch_response(text: str | None, ids) -> dict:
+    """{id: review JSON text} for every id the model answered in the schema."""
+    data = parse_review_json(text)
+    reviews = data.get("reviews") if data else None
+    if not isinstance(reviews, list):
+        return {}
+    wanted, out = set(ids), {}
+    for review in reviews:
+        if not isinstance(review, dict) or str(review.get("id")) not in wanted:
+            continue
+        item_id = str(review.pop("id"))
+        if "summary" in review or "issues" in review:
+            out[item_id] = json.dumps(review, indent=2)
+    return out
+
+
+async def _litellm_complete(
+    system: str, prompt: str, model: str | None = None, usage: TokenUsage | None = None
+) -> str | None:
+    from services.ai_review_service import OPENROUTER_MODEL, complete_json
+
+    return await complete_json(system, prompt, model or OPENROUTER_MODEL, usage)
+
+
+async def _guarded_call(complete, system: str, prompt: str, model: str | None, usage: TokenUsage):
+    """The batch's one model call, retried and counted once on the model's breaker."""
+    from services.ai_review_service import is_transient_model_error, model_breaker_name
+
+    return await acall_with_retry(
+        get_breaker(model_breaker_name("remote", model)),
+        lambda: complete(system, prompt, model, usage),
+        is_transient_model_error,
+    )
+
+
+def _share_tokens(batch, spent: int) -> None:
+    """Split the batch call's tokens evenly over its PRs (remainder to the first)."""
+    share, rest = divmod(spent, len(batch))
+    for n, (_, _, _, usage) in enumerate(batch):
+        add_usage(usage, share + (rest if n == 0 else 0))
+
+
+class _Batch:
+    def __init__(self):
+        self.items = []
+        self.tokens = 0
+        self.timer = None
+
+
+class TinyReviewBatcher:
+    """
+    Collects tiny diffs per (installation, model) for `window_ms` (or until
+    the token / item budget is full) and reviews them in one
+    `complete(system, prompt, model, usage)` call, whose tokens are shared out
+    evenly over the PRs in it. A PR the model skipped or answered
+    malformed – or whose batch call failed – gets None, so the caller can fall
+    back to a normal single review; an open breaker is raised to every caller.
+    """
+
+    def __init__(
+        self,
+        complete=_litellm_complete,
+        window_ms: int = TINY_PR_BATCH_WINDOW_MS,
+        max_tokens: int = TINY_PR_BATCH_MAX_TOKENS,
+        max_items: int = TINY_PR_BATCH_MAX_ITEMS,
+    ):
+        self.complete = complete
+        self.window = window_ms / 1000
+        self.max_tokens = max_tokens
+        self.max_items = max_items
+        self._pending = {}  # (installation_id, model) -> _Batch
+        self._seq = 0
+        self._sending = set()  # strong refs to in-flight batch tasks
+
+    def _spawn_send(self, key):
+        task = asyncio.create_task(self._send(key, self._take_batch(key)))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    def _take_batch(self, key):
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return []
+        if batch.timer is not None:
+            batch.timer.cancel()
+        return batch.items
+
+    async def _flush_after_window(self, key):
+        await asyncio.sleep(self.window)
+        batch = self._pending.get(key)
+        if batch is not None:
+            batch.timer = None  # don't cancel ourselves
+        await self._send(key, self._take_batch(key))
+
+    async def _send(self, key, batch):
+        if not batch:
+            return
+        ids = [item_id for item_id, _, _, _ in batch]
+        log(f"📦 Tiny-PR batch: {len(batch)} review(s) in one model call")
+        metrics.inc("tiny_pr_batches_total")
+        metrics.observe("tiny_pr_batch_size", len(batch))
+        spent = TokenUsage()
+        try:
+            text = await _guarded_call(
+                self.complete,
+                BATCH_REVIEW_INSTRUCTION,
+                build_batch_prompt([(i, d) for i, d, _, _ in batch]),
+                key[1],
+                spent,
+            )
+        except CircuitOpenError as e:
+            for _, _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        except Exception as e:
+            # Already counted once on the breaker; every PR falls back to a single review
+            log(f"⚠️ Tiny-PR batch failed, reviewing {len(batch)} PR(s) alone: {e}")
+            metrics.inc("tiny_pr_batch_failures_total")
+            text = None
+        _share_tokens(batch, spent.total)
+
+        results = split_batch_response(text, ids)
+        missing = len(ids) - len(results)
+        if missing:
+            log(f"⚠️ Tiny-PR batch: {missing} review(s) missing from the answer")
+            metrics.inc("tiny_pr_batch_missing_total", missing)
+        for item_id, _, future, _ in batch:
+            if not future.done():
+                future.set_result(results.get(item_id))
+
+    async def review(
+        self,
+        diff: str,
+        pr_number: int,
+        installation_id: int | None = None,
+        model: str | None = None,
+        usage: TokenUsage | None = None,
+    ) -> str | None:
+        """Queue one tiny diff; returns its review JSON text (None = review it alone)."""
+        key = (installation_id, model)
+        tokens = estimate_tokens(diff)
+        batch = self._pending.get(key)
+        if batch is not None and batch.tokens + tokens > self.max_tokens:
+            self._spawn_send(key)
+            batch = None
+        if batch is None:
+            batch = self._pending[key] = _Batch()
+
+        self._seq += 1
+        future = asyncio.get_running_loop().create_future()
+        batch.items.append((f"pr{pr_number}-{self._seq}", diff, future, usage))
+        batch.tokens += tokens
+
+        if len(batch.items) >= self.max_items:
+            self._spawn_send(key)
+        elif batch.timer is None:
+            batch.timer = asyncio.create_task(self._flush_after_window(key))
+        return await future
+
+
+_batcher = None
+
+
+def get_tiny_batcher() -> TinyReviewBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = TinyReviewBatcher()
+    return _batcher
+
+
+def is_tiny_diff(diff: str) -> bool:
+    return TINY_PR_BATCH_ENABLED and len(diff) <= TINY_PR_MAX_CHARS
@@ -0,0 +1,51 @@
+# services/billing_service.py
+
+import asyncio
+import os
+from datetime import datetime
+
+from crud.user_crud import rollover_expired_periods
+from database import SessionLocal
+from utils.logger import log
+
+ROLLOVER_BATCH_SIZE = int(os.getenv("BILLING_ROLLOVER_BATCH_SIZE", "1000"))
+# 0 disables the in-process schedule (use cron + `python -m services.billing_service` instead)
+ROLLOVER_INTERVAL_SECONDS = int(os.getenv("BILLING_ROLLOVER_INTERVAL_SECONDS", "0"))
+
+
+def run_period_rollover(batch_size: int = ROLLOVER_BATCH_SIZE) -> int:
+    """
+    Roll over every expired billing period, one batch (= one UPDATE) at a time.
+    Idempotent and safe to run from several workers at once; an interrupted
+    run simply continues with the remaining expired rows next time.
+    """
+    now = datetime.utcnow()
+    total = 0
+
+    db = SessionLocal()
+    try:
+        while True:
+            updated = rollover_expired_periods(db, now=now, batch_size=batch_size)
+            total += updated
+            if updated < batch_size:
+                break
+    finally:
+        db.close()
+
+    if total:
+        log(f"🔄 Billing periods rolled over: {total}")
+    return total
+
+
+async def period_rollover_loop(interval_seconds: int = ROLLOVER_INTERVAL_SECONDS):
+    """Background schedule for the rollover job (started from app startup)."""
+    while True:
+        try:
+            await asyncio.to_thread(run_period_rollover)
+        except Exception as e:
+            log(f"⚠️ Billing rollover failed: {e}")
+        await asyncio.sleep(interval_seconds)
+
+
+if __name__ == "__main__":
+    run_period_rollover()
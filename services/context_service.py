@@ -0,0 +1,383 @@
+# services/context_service.py
+# Surrounding-code context for reviews: the enclosing function/class of each
+# hunk, read from file versions cached by git blob SHA.
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+
+from services.hunk_memo import parse_diff
+from utils import metrics
+from utils.logger import log
+
+FILE_CONTEXT_ENABLED = os.getenv("FILE_CONTEXT_ENABLED", "0") == "1"
+CONTEXT_CACHE_DIR = os.getenv("CONTEXT_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "code-review-blobs")
+CONTEXT_CACHE_MAX_BYTES = int(os.getenv("CONTEXT_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+CONTEXT_MEMORY_MAX_BYTES = int(os.getenv("CONTEXT_MEMORY_MAX_BYTES", str(64 * 1024 * 1024)))
+# Prompt budget for all context blocks of one review
+CONTEXT_MAX_CHARS = int(os.getenv("CONTEXT_MAX_CHARS", "20000"))
+# Scopes longer than this fall back to a window of CONTEXT_WINDOW_LINES around the hunk
+CONTEXT_MAX_SCOPE_LINES = int(os.getenv("CONTEXT_MAX_SCOPE_LINES", "150"))
+CONTEXT_WINDOW_LINES = int(os.getenv("CONTEXT_WINDOW_LINES", "15"))
+# Files bigger than this are skipped (generated code, lockfiles, ...): not fetched
+# when the source knows the size up front, and never cached
+CONTEXT_MAX_FILE_BYTES = int(os.getenv("CONTEXT_MAX_FILE_BYTES", str(512 * 1024)))
+
+_HUNK_RANGES = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+_SCOPE_OPENER = re.compile(
+    r"^\s*(?:@\w+\s*)*"
+    r"(?:(?:export|public|private|protected|internal|static|abstract|final|override|async|pub(?:\(\w+\))?|default)\s+)*"
+    r"(?:(?:def|class|function|func|fn|interface|struct|enum|impl|trait|module|object|record)\b"
+    r"|(?!(?:if|else|for|while|switch|return|catch|new|throw)\b)[\w<>\[\],.?]+\s+\w+\s*\([^;]*$)"
+)
+# Scope ends where indentation drops back; everything else is brace-balanced
+INDENT_SCOPED_EXTENSIONS = {".py", ".pyi", ".rb", ".yaml", ".yml", ".coffee"}
+
+
+def git_blob_sha(content: bytes) -> str:
+    """SHA git assigns to a blob with this content."""
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+# ---------------------------------------------------------------------
+# Blob cache (memory LRU in front of a size-capped disk store)
+# ---------------------------------------------------------------------
+class BlobCache:
+    """
+    Content-addressed cache: blobs never change, so entries never go stale
+    and both tiers evict purely by size (least recently used first).
+    """
+
+    def __init__(
+        self,
+        directory: str = CONTEXT_CACHE_DIR,
+        max_disk_bytes: int = CONTEXT_CACHE_MAX_BYTES,
+        max_memory_bytes: int = CONTEXT_MEMORY_MAX_BYTES,
+    ):
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = None  # computed lazily on first write
+        self._lock = threading.Lock()
+
+    def _path(self, sha: str) -> str:
+        return os.path.join(self.directory, sha[:2], sha)
+
+    def _remember(self, sha: str, content: bytes):
+        if len(content) > self.max_memory_bytes:
+            return
+        if sha in self._memory:
+            self._memory.move_to_end(sha)
+            return
+        self._memory[sha] = content
+        self._memory_bytes += len(content)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def get(self, sha: str) -> bytes | None:
+        with self._lock:
+            content = self._memory.get(sha)
+            if content is not None:
+                self._memory.move_to_end(sha)
+                metrics.inc("blob_cache_hits_total", tier="memory")
+                return content
+
+        path = self._path(sha)
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except OSError:
+            metrics.inc("blob_cache_misses_total")
+            return None
+
+        if git_blob_sha(content) != sha:  # torn write or disk corruption
+            self._unlink(path)
+            metrics.inc("blob_cache_misses_total")
+            return None
+
+        try:
+            os.utime(path)  # mtime doubles as the disk tier's LRU clock
+        except OSError:
+            pass
+        with self._lock:
+            self._remember(sha, content)
+        metrics.inc("blob_cache_hits_total", tier="disk")
+        return content
+
+    def put(self, sha: str, content: bytes):
+        with self._lock:
+            self._remember(sha, content)
+
+        path = self._path(sha)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(content)
+        os.replace(tmp, path)
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk_bytes()
+            else:
+                self._disk_bytes += len(content)
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _scan_disk_bytes(self) -> int:
+        total = 0
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+    def _evict_disk(self):
+        """Drop least recently used blobs until the disk tier is at 90% of its cap."""
+        entries = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_disk_bytes * 0.9)
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            self._unlink(path)
+            total -= size
+            metrics.inc("blob_cache_evictions_total")
+        self._disk_bytes = total
+
+    @staticmethod
+    def _unlink(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+_blob_cache = None
+
+
+def get_blob_cache() -> BlobCache:
+    global _blob_cache
+    if _blob_cache is None:
+        _blob_cache = BlobCache()
+    return _blob_cache
+
+
+# ---------------------------------------------------------------------
+# Blob sources
+# ---------------------------------------------------------------------
+class GitHubBlobSource:
+    """
+    Blob SHAs and contents for one PR via the GitHub API.
+    New-side SHAs come from the PR files listing; base-side SHAs (and sizes)
+    from a contents listing of each touched directory at the base commit.
+    """
+
+    def __init__(self, installation_token: str, repo_full_name: str, pr_number: int, base_sha: str):
+        self.token = installation_token
+        self.repo_full_name = repo_full_name
+        self.pr_number = pr_number
+        self.base_sha = base_sha
+        self._base_dirs = {}
+        self._sizes = {}
+
+    def changed_files(self) -> dict:
+        """{new path: (status, new blob SHA, previous path)}"""
+        from services.github_service import list_pr_files
+
+        files = list_pr_files(self.token, self.repo_full_name, self.pr_number)
+        return {
+            f["filename"]: (f.get("status"), f.get("sha"), f.get("previous_filename") or f["filename"])
+            for f in files
+        }
+
+    def base_blob_sha(self, path: str) -> str | None:
+        from services.github_service import list_directory_blobs
+
+        directory = os.path.dirname(path)
+        if directory not in self._base_dirs:
+            listing = list_directory_blobs(self.token, self.repo_full_name, directory, self.base_sha)
+            self._base_dirs[directory] = {p: sha for p, (sha, _) in listing.items()}
+            self._sizes.update((sha, size) for sha, size in listing.values() if size is not None)
+        return self._base_dirs[directory].get(path)
+
+    def blob_size(self, sha: str) -> int | None:
+        # The PR files listing has no sizes, so only base-side blobs are known
+        return self._sizes.get(sha)
+
+    def fetch_blob(self, sha: str) -> bytes:
+        from services.github_service import get_blob
+
+        return get_blob(self.token, self.repo_full_name, sha)
+
+
+def load_blob(source, sha: str | None, cache: BlobCache | None = None) -> str | None:
+    """Blob text through the cache; None for missing, oversized or binary blobs."""
+    if not sha:
+        return None
+    cache = cache or get_blob_cache()
+
+    content = cache.get(sha)
+    if content is None:
+        size = source.blob_size(sha)
+        if size is not None and size > CONTEXT_MAX_FILE_BYTES:
+            metrics.inc("blob_oversized_total")
+            return None
+        content = source.fetch_blob(sha)
+        metrics.inc("blob_fetches_total")
+        if content is None:
+            return None
+        if len(content) > CONTEXT_MAX_FILE_BYTES:
+            metrics.inc("blob_oversized_total")
+            return None
+        cache.put(sha, content)
+
+    if len(content) > CONTEXT_MAX_FILE_BYTES or b"\0" in content[:8000]:
+        return None
+    return content.decode("utf-8", errors="replace")
+
+
+# ---------------------------------------------------------------------
+# Scope extraction
+# ---------------------------------------------------------------------
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip())
+
+
+def enclosing_scope(lines: list, start: int, end: int, indent_scoped: bool = True) -> tuple:
+    """
+    1-based inclusive line range of the innermost function/class around
+    [start, end], found heuristically (indentation for Python-like code,
+    brace balance otherwise). Falls back to a fixed window.
+    """
+    start = max(1, min(start, len(lines)))
+    end = max(start, min(end, len(lines)))
+    window = (max(1, start - CONTEXT_WINDOW_LINES), min(len(lines), end + CONTEXT_WINDOW_LINES))
+
+    body = [l for l in lines[start - 1:end] if l.strip()]
+    body_indent = min((_indent(l) for l in body), default=0)
+
+    opener = None
+    for i in range(start, 0, -1):
+        line = lines[i - 1]
+        if line.strip() and _SCOPE_OPENER.match(line) and (_indent(line) < body_indent or i == start):
+            opener = i
+            break
+    if opener is None:
+        return window
+
+    head = lines[opener - 1]
+    if not indent_scoped:
+        depth, seen_open, close = 0, False, None
+        for i in range(opener, len(lines) + 1):
+            depth += lines[i - 1].count("{") - lines[i - 1].count("}")
+            seen_open = seen_open or "{" in lines[i - 1]
+            if seen_open and depth <= 0 and i >= end:
+                close = i
+                break
+        close = close or len(lines)
+    else:
+        close = len(lines)
+        for i in range(max(opener, end) + 1, len(lines) + 1):
+            line = lines[i - 1]
+            if line.strip() and _indent(line) <= _indent(head):
+                close = i - 1
+                break
+        while close > end and not lines[close - 1].strip():
+            close -= 1
+
+    if close - opener + 1 > CONTEXT_MAX_SCOPE_LINES:
+        return window
+    return opener, close
+
+
+def _merge_ranges(ranges: list) -> list:
+    merged = []
+    for lo, hi in sorted(ranges):
+        if merged and lo <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+def _hunk_ranges(header: str) -> tuple:
+    m = _HUNK_RANGES.match(header)
+    old_start, old_len = int(m.group(1)), int(m.group(2) or 1)
+    new_start, new_len = int(m.group(3)), int(m.group(4) or 1)
+    return (old_start, old_start + max(old_len, 1) - 1), (new_start, new_start + max(new_len, 1) - 1)
+
+
+def build_file_context(source, diff: str, cache: BlobCache | None = None, max_chars: int = CONTEXT_MAX_CHARS) -> str:
+    """
+    Prompt section with the enclosing scope of every hunk: taken from the
+    new file version, or the base version for pure deletions and removed files.
+    """
+    changed = source.changed_files()
+    blocks, used = [], 0
+
+    for file_diff in parse_diff(diff):
+        status, new_sha, old_path = changed.get(file_diff.path, (None, None, file_diff.path))
+        new_ranges, old_ranges = [], []
+        for hunk in file_diff.hunks:
+            if not _HUNK_RANGES.match(hunk.header):
+                continue
+            old_range, new_range = _hunk_ranges(hunk.header)
+            adds_lines = any(l.startswith("+") for l in hunk.lines)
+            if status != "removed" and adds_lines:
+                new_ranges.append(new_range)
+            else:
+                old_ranges.append(old_range)
+
+        for path, sha_fn, ranges in (
+            (file_diff.path, lambda: new_sha, new_ranges),
+            (old_path, lambda: source.base_blob_sha(old_path), old_ranges),
+        ):
+            if not ranges:
+                continue
+            text = load_blob(source, sha_fn(), cache)
+            if text is None:
+                continue
+            lines = text.splitlines()
+            indent_scoped = os.path.splitext(path)[1].lower() in INDENT_SCOPED_EXTENSIONS
+            scopes = [enclosing_scope(lines, a, b, indent_scoped) for a, b in ranges]
+            for lo, hi in _merge_ranges(scopes):
+                snippet = "\n".join(lines[lo - 1:hi])
+                block = f"### {path} (lines {lo}-{hi})\n```\n{snippet}\n```"
+                if used + len(block) > max_chars:
+                    log(f"✂️ File context truncated at {used} chars")
+                    return "\n\n".join(blocks)
+                blocks.append(block)
+                used += len(block)
+
+    return "\n\n".join(blocks)
+
+
+def fetch_review_context(
+    installation_token: str, repo_full_name: str, pr_number: int, base_sha: str, diff: str, source=None
+) -> str:
+    """Context for one PR (GitHub API unless another blob source is given); errors degrade to no context."""
+    try:
+        source = source or GitHubBlobSource(installation_token, repo_full_name, pr_number, base_sha)
+        return build_file_context(source, diff)
+    except Exception as e:
+        log(f"⚠️ File context unavailable: {e}")
+        return ""
@@ -2,9 +2,12 @@
 
 import os
 import time
-import jwt
+from dataclasses import dataclass
+
 import requests
+from utils.deadline import HTTP_DEFAULT_TIMEOUT
 from utils.logger import log
+from utils.resilience import RETRY_MAX_ATTEMPTS, call_with_retry, get_breaker
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -13,17 +16,67 @@ GITHUB_APP_ID = os.getenv("GITHUB_APP_ID")
 GITHUB_WEBHOOK_SECRET = os.getenv("GITHUB_WEBHOOK_SECRET")
 GITHUB_PRIVATE_KEY = os.getenv("GITHUB_PRIVATE_KEY")
 GITHUB_PRIVATE_KEY_PATH = os.getenv("GITHUB_PRIVATE_KEY_PATH")
+# Overridable for GitHub Enterprise or local stand-ins (scripts/stub_servers.py)
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+
+
+class _TransientResponse(Exception):
+    """5xx / 429 from GitHub: worth retrying, counts against the endpoint's breaker."""
+
+    def __init__(self, response):
+        super().__init__(f"GitHub returned {response.status_code}")
+        self.response = response
+        retry_after = response.headers.get("Retry-After", "")
+        self.retry_after = float(retry_after) if retry_after.isdigit() else None
+
+
+_RETRYABLE = (requests.ConnectionError, requests.Timeout, _TransientResponse)
+
+
+def _github_request(endpoint: str, method: str, url: str, timeout: float, retry: bool = True, **kwargs):
+    """
+    One GitHub API call through the breaker for its endpoint class
+    ("token", "pulls", "contents", "comments"), with retries on network
+    errors, 5xx and 429 that all fit in `timeout`. Returns the response
+    (the last one if retries ran out); raises CircuitOpenError if the
+    endpoint class is failing fast. retry=False for calls that must not
+    run twice (a 502 on a comment POST may still have posted it).
+    """
+    give_up_at = time.monotonic() + timeout
+
+    def attempt():
+        res = requests.request(method, url, timeout=max(0.1, give_up_at - time.monotonic()), **kwargs)
+        if res.status_code >= 500 or res.status_code == 429:
+            raise _TransientResponse(res)
+        return res
+
+    try:
+        return call_with_retry(
+            get_breaker(f"github:{endpoint}"), attempt, _RETRYABLE, give_up_at=give_up_at, max_attempts=RETRY_MAX_ATTEMPTS if retry else 1
+        )
+    except _TransientResponse as e:
+        return e.response
+
+
+def _get_app_credentials():
+    """
+    Resolve (app_id, private_key) on first use rather than at import time,
+    so workers can boot and answer /ping before GitHub config is touched.
+    """
+    global GITHUB_PRIVATE_KEY
 
-# Load private key from file if not directly in env
-if not GITHUB_PRIVATE_KEY and GITHUB_PRIVATE_KEY_PATH:
-    with open(GITHUB_PRIVATE_KEY_PATH, "r", encoding="utf-8") as f:
-        GITHUB_PRIVATE_KEY = f.read()
+    # Load private key from file if not directly in env
+    if not GITHUB_PRIVATE_KEY and GITHUB_PRIVATE_KEY_PATH:
+        with open(GITHUB_PRIVATE_KEY_PATH, "r", encoding="utf-8") as f:
+            GITHUB_PRIVATE_KEY = f.read()
 
-if not GITHUB_APP_ID:
-    raise RuntimeError("GITHUB_APP_ID is not set")
+    if not GITHUB_APP_ID:
+        raise RuntimeError("GITHUB_APP_ID is not set")
 
-if not GITHUB_PRIVATE_KEY:
-    raise RuntimeError("GitHub App private key is not configured (GITHUB_PRIVATE_KEY or GITHUB_PRIVATE_KEY_PATH).")
+    if not GITHUB_PRIVATE_KEY:
+        raise RuntimeError("GitHub App private key is not configured (GITHUB_PRIVATE_KEY or GITHUB_PRIVATE_KEY_PATH).")
+
+    return GITHUB_APP_ID, GITHUB_PRIVATE_KEY
 
 
 def create_app_jwt() -> str:
@@ -31,16 +84,19 @@ def create_app_jwt() -> str:
     Create a short-lived JWT for GitHub App authentication.
     Used only to request installation access tokens.
     """
+    import jwt  # pyjwt + cryptography, only needed once we talk to GitHub
+
+    app_id, private_key = _get_app_credentials()
     now = int(time.time())
     payload = {
         "iat": now - 60,         # issued at
         "exp": now + (10 * 60),  # max 10 minutes
-        "iss": int(GITHUB_APP_ID),
+        "iss": str(app_id),  # pyjwt >= 2.10 rejects non-string issuers
     }
 
     encoded = jwt.encode(
         payload,
-        GITHUB_PRIVATE_KEY,
+        private_key,
         algorithm="RS256",
     )
     # pyjwt v2 returns str, v1 returns bytes
@@ -49,18 +105,21 @@ def create_app_jwt() -> str:
     return encoded
 
 
-def create_installation_token(installation_id: int) -> str:
+def create_installation_token(installation_id: int, timeout: float = HTTP_DEFAULT_TIMEOUT) -> str:
     """
     Exchange App JWT for an installation access token.
     This token is used in all GitHub API calls (PR diff, comments, etc.).
     """
     app_jwt = create_app_jwt()
 
-    url = f"https://api.github.com/app/installations/{installation_id}/access_tokens"
+    url = f"{GITHUB_API_URL}/app/installations/{installation_id}/access_tokens"
     log(f"🔑 Creating installation token for installation_id={installation_id}")
 
-    res = requests.post(
+    res = _github_request(
+        "token",
+        "POST",
         url,
+        timeout,
         headers={
             "Authorization": f"Bearer {app_jwt}",
             "Accept": "application/vnd.github+json",
@@ -77,15 +136,18 @@ def create_installation_token(installation_id: int) -> str:
     return token
 
 
-def get_diff_via_api(installation_token: str, repo_full_name: str, pr_number: int) -> str:
+def get_diff_via_api(installation_token: str, repo_full_name: str, pr_number: int, timeout: float = HTTP_DEFAULT_TIMEOUT) -> str:
     """
     Fetch PR diff via GitHub API using the installation access token.
     """
-    url = f"https://api.github.com/repos/{repo_full_name}/pulls/{pr_number}"
+    url = f"{GITHUB_API_URL}/repos/{repo_full_name}/pulls/{pr_number}"
     log(f"📥 Fetching diff for {repo_full_name} PR #{pr_number}")
 
-    res = requests.get(
+    res = _github_request(
+        "pulls",
+        "GET",
         url,
+        timeout,
         headers={
             "Authorization": f"Bearer {installation_token}",
             # This Accept header tells GitHub to return a unified diff
@@ -101,16 +163,69 @@ def get_diff_via_api(installation_token: str, repo_full_name: str, pr_number: in
     return diff
 
 
-def post_github_comment(installation_token: str, repo_full_name: str, pr_number: int, body: str):
+@dataclass
+class PullsPage:
+    not_modified: bool
+    items: list
+    next_url: str | None
+    etag: str | None
+    rate_remaining: int | None = None
+    rate_reset: int | None = None  # epoch seconds
+
+
+def open_pulls_url(repo_full_name: str, per_page: int = 100) -> str:
+    """First page of a repo's open PRs, oldest first (stable across resumed runs)."""
+    return f"{GITHUB_API_URL}/repos/{repo_full_name}/pulls?state=open&sort=created&direction=asc&per_page={per_page}"
+
+
+def list_open_pulls_page(
+    installation_token: str, url: str, etag: str | None = None, timeout: float = HTTP_DEFAULT_TIMEOUT
+) -> PullsPage:
+    """
+    One page of open PRs (`url` from open_pulls_url or a previous next_url).
+    With `etag` the request is conditional: an unchanged page comes back as
+    304 (not_modified, no items), which doesn't count against the rate limit.
+    """
+    headers = {
+        "Authorization": f"Bearer {installation_token}",
+        "Accept": "application/vnd.github+json",
+    }
+    if etag:
+        headers["If-None-Match"] = etag
+
+    res = _github_request("pulls", "GET", url, timeout, headers=headers)
+
+    remaining = res.headers.get("X-RateLimit-Remaining", "")
+    reset = res.headers.get("X-RateLimit-Reset", "")
+    rate = {
+        "rate_remaining": int(remaining) if remaining.isdigit() else None,
+        "rate_reset": int(reset) if reset.isdigit() else None,
+    }
+    if res.status_code == 304:
+        return PullsPage(True, [], None, etag, **rate)
+    if res.status_code >= 400:
+        log(f"❌ Failed to list open PRs: {res.status_code} {res.text}")
+        res.raise_for_status()
+
+    return PullsPage(False, res.json(), res.links.get("next", {}).get("url"), res.headers.get("ETag"), **rate)
+
+
+def post_github_comment(
+    installation_token: str, repo_full_name: str, pr_number: int, body: str, timeout: float = HTTP_DEFAULT_TIMEOUT
+):
     """
     Post a normal PR comment (issue comment) using the installation access token.
     Appears as `your-app-name[bot]`.
     """
-    url = f"https://api.github.com/repos/{repo_full_name}/issues/{pr_number}/comments"
+    url = f"{GITHUB_API_URL}/repos/{repo_full_name}/issues/{pr_number}/comments"
     log(f"💬 Posting comment to {repo_full_name} PR #{pr_number}")
 
-    res = requests.post(
+    res = _github_request(
+        "comments",
+        "POST",
         url,
+        timeout,
+        retry=False,
         json={"body": body},
         headers={
             "Authorization": f"Bearer {installation_token}",
@@ -124,3 +239,84 @@ def post_github_comment(installation_token: str, repo_full_name: str, pr_number:
 
     log("✅ Comment posted successfully")
     return res.json()
+
+
+def list_pr_files(installation_token: str, repo_full_name: str, pr_number: int, timeout: float = HTTP_DEFAULT_TIMEOUT) -> list:
+    """
+    Changed files of a PR (filename, status, sha = new blob SHA, previous_filename).
+    Follows pagination; GitHub caps this listing at 3000 files.
+    """
+    url = f"{GITHUB_API_URL}/repos/{repo_full_name}/pulls/{pr_number}/files"
+    files, page = [], 1
+
+    while True:
+        res = _github_request(
+            "pulls",
+            "GET",
+            url,
+            timeout,
+            params={"per_page": 100, "page": page},
+            headers={
+                "Authorization": f"Bearer {installation_token}",
+                "Accept": "application/vnd.github+json",
+            },
+        )
+        if res.status_code >= 400:
+            log(f"❌ Failed to list PR files: {res.status_code} {res.text}")
+            res.raise_for_status()
+
+        batch = res.json()
+        files.extend(batch)
+        if len(batch) < 100:
+            return files
+        page += 1
+
+
+def list_directory_blobs(
+    installation_token: str, repo_full_name: str, path: str, ref: str, timeout: float = HTTP_DEFAULT_TIMEOUT
+) -> dict:
+    """{file path: (blob SHA, size in bytes)} for one directory at `ref` (contents API, no file bodies)."""
+    url = f"{GITHUB_API_URL}/repos/{repo_full_name}/contents/{path}".rstrip("/")
+
+    res = _github_request(
+        "contents",
+        "GET",
+        url,
+        timeout,
+        params={"ref": ref},
+        headers={
+            "Authorization": f"Bearer {installation_token}",
+            "Accept": "application/vnd.github+json",
+        },
+    )
+    if res.status_code == 404:
+        return {}
+    if res.status_code >= 400:
+        log(f"❌ Failed to list {path or '/'}@{ref}: {res.status_code} {res.text}")
+        res.raise_for_status()
+
+    entries = res.json()
+    if not isinstance(entries, list):
+        return {}
+    return {e["path"]: (e["sha"], e.get("size")) for e in entries if e.get("type") == "file"}
+
+
+def get_blob(installation_token: str, repo_full_name: str, blob_sha: str, timeout: float = HTTP_DEFAULT_TIMEOUT) -> bytes:
+    """Raw bytes of one git blob."""
+    url = f"{GITHUB_API_URL}/repos/{repo_full_name}/git/blobs/{blob_sha}"
+
+    res = _github_request(
+        "contents",
+        "GET",
+        url,
+        timeout,
+        headers={
+            "Authorization": f"Bearer {installation_token}",
+            "Accept": "application/vnd.github.raw",
+        },
+    )
+    if res.status_code >= 400:
+        log(f"❌ Failed to fetch blob {blob_sha}: {res.status_code} {res.text}")
+        res.raise_for_status()
+
+    return res.content
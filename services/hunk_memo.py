@@ -0,0 +1,279 @@
+# services/hunk_memo.py
+# Hunk-level review memo: identical hunks (vendored code, cherry-picks,
+# backports) reuse earlier findings instead of going back to the model.
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from services.review_merge import SEVERITY_RANK, _norm, parse_review_json
+from utils import metrics
+from utils.logger import log
+
+HUNK_MEMO_ENABLED = os.getenv("HUNK_MEMO_ENABLED", "0") == "1"
+HUNK_MEMO_MAX_ENTRIES = int(os.getenv("HUNK_MEMO_MAX_ENTRIES", "50000"))
+HUNK_MEMO_TTL_SECONDS = int(os.getenv("HUNK_MEMO_TTL_SECONDS", str(7 * 24 * 3600)))
+# "installation" = findings are only shared inside one installation; "global" = across all
+HUNK_MEMO_SCOPE = os.getenv("HUNK_MEMO_SCOPE", "installation")
+
+_HUNK_HEADER = re.compile(r"^@@ -\d+(?:,\d+)? \+\d+(?:,\d+)? @@ ?(.*)$")
+_GIT_HEADER = re.compile(r"^diff --git a/(.+?) b/(.+)$")
+
+
+# ---------------------------------------------------------------------
+# Diff parsing
+# ---------------------------------------------------------------------
+@dataclass
+class Hunk:
+    header: str
+    lines: list = field(default_factory=list)
+    key: str = ""
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+
+@dataclass
+class FileDiff:
+    path: str
+    header_lines: list = field(default_factory=list)
+    hunks: list = field(default_factory=list)
+
+
+def _hunk_key(path: str, hunk: Hunk) -> str:
+    """
+    Hash of the hunk body plus its context: line numbers are dropped and
+    whitespace collapsed, so a hunk hashes the same in any file position or
+    branch. Only the file extension is kept, so vendored copies match too.
+    """
+    match = _HUNK_HEADER.match(hunk.header)
+    section = match.group(1).strip() if match else ""
+    ext = os.path.splitext(path)[1].lower()
+
+    normalised = [ext, " ".join(section.split())]
+    for line in hunk.lines:
+        if line.startswith("\\"):  # "\ No newline at end of file"
+            continue
+        marker, body = line[:1], " ".join(line[1:].split())
+        normalised.append(marker + body)
+    return hashlib.sha256("\n".join(normalised).encode()).hexdigest()
+
+
+def parse_diff(diff: str) -> list:
+    """Split a unified diff into files → hunks, each hunk carrying its memo key."""
+    files, current, hunk = [], None, None
+
+    for line in diff.splitlines():
+        git_header = _GIT_HEADER.match(line)
+        if git_header:
+            current = FileDiff(path=git_header.group(2), header_lines=[line])
+            files.append(current)
+            hunk = None
+        elif current is None:
+            continue
+        elif line.startswith("@@"):
+            hunk = Hunk(header=line)
+            current.hunks.append(hunk)
+        elif hunk is not None:
+            hunk.lines.append(line)
+        else:
+            if line.startswith("+++ ") and line[4:] != "/dev/null":
+                current.path = line[4:].removeprefix("b/")
+            current.header_lines.append(line)
+
+    for f in files:
+        for h in f.hunks:
+            h.key = _hunk_key(f.path, h)
+    return files
+
+
+def render_diff(files, hunk_filter) -> str:
+    """Rebuild a diff containing only the hunks for which `hunk_filter(hunk)` is true."""
+    out = []
+    for f in files:
+        hunks = [h for h in f.hunks if hunk_filter(h)]
+        if not hunks:
+            continue
+        out.extend(f.header_lines)
+        for h in hunks:
+            out.append(h.header)
+            out.extend(h.lines)
+    return "\n".join(out) + "\n" if out else ""
+
+
+# ---------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------
+class HunkMemo:
+    """In-process LRU + TTL map of (scope, hunk key) → findings for that hunk."""
+
+    def __init__(self, max_entries: int = HUNK_MEMO_MAX_ENTRIES, ttl_seconds: int = HUNK_MEMO_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, scope: str, key: str):
+        with self._lock:
+            entry = self._entries.get((scope, key))
+            if entry is None:
+                metrics.inc("hunk_memo_misses_total")
+                return None
+            expires_at, findings = entry
+            if expires_at <= time.monotonic():
+                del self._entries[(scope, key)]
+                metrics.inc("hunk_memo_misses_total")
+                metrics.inc("hunk_memo_expired_total")
+                return None
+            self._entries.move_to_end((scope, key))
+        metrics.inc("hunk_memo_hits_total")
+        return findings
+
+    def put(self, scope: str, key: str, findings: list):
+        with self._lock:
+            self._entries[(scope, key)] = (time.monotonic() + self.ttl_seconds, findings)
+            self._entries.move_to_end((scope, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                metrics.inc("hunk_memo_evictions_total")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_memo = HunkMemo()
+
+
+def get_hunk_memo() -> HunkMemo:
+    return _memo
+
+
+@metrics.register_collector
+def _memo_gauges() -> list:
+    hits = metrics.get_counter("hunk_memo_hits_total")
+    misses = metrics.get_counter("hunk_memo_misses_total")
+    total = hits + misses
+    return [
+        ("hunk_memo_entries", {}, len(_memo)),
+        ("hunk_memo_hit_ratio", {}, hits / total if total else 0),
+    ]
+
+
+def memo_scope(installation_id, backend: str = "remote", model: str | None = None, dimensions=None) -> str:
+    """
+    Findings are only reused for the same reviewer: a small routed model's or
+    one specialist set's findings must not stand in for another's.
+    """
+    owner = f"installation:{installation_id}" if HUNK_MEMO_SCOPE == "installation" else "global"
+    return f"{owner}|{backend}:{model or 'default'}|{','.join(sorted(dimensions or [])) or 'single'}"
+
+
+# ---------------------------------------------------------------------
+# Review wrapper
+# ---------------------------------------------------------------------
+def _same_file(a: str, b: str) -> bool:
+    a, b = (a or "").strip().lstrip("./"), (b or "").strip().lstrip("./")
+    return bool(a and b) and (a == b or a.endswith("/" + b) or b.endswith("/" + a))
+
+
+def _attribute_issues(files, unseen, issues) -> dict | None:
+    """
+    Map each reported issue onto the unseen hunk it belongs to (same file,
+    snippet found in the hunk; or the file's only unseen hunk).
+    Returns {hunk key: [issues]}; files with an unplaceable issue are left
+    out entirely so a finding is never lost by caching its hunk as clean.
+    """
+    by_key = {h.key: [] for f in files for h in f.hunks if h.key in unseen}
+    unsafe_files = set()
+
+    for issue in issues:
+        if not isinstance(issue, dict):
+            continue
+        owner = next((f for f in files if _same_file(f.path, issue.get("file"))), None)
+        if owner is None:
+            continue
+        candidates = [h for h in owner.hunks if h.key in unseen]
+        snippet = _norm((issue.get("code") or "").strip().splitlines()[0] if issue.get("code") else "")
+        target = None
+        if snippet:
+            target = next((h for h in candidates if snippet in _norm(h.text)), None)
+        if target is None and len(candidates) == 1:
+            target = candidates[0]
+        if target is None:
+            unsafe_files.add(owner.path)
+            continue
+        by_key[target.key].append({k: v for k, v in issue.items() if k != "file"})
+
+    for f in files:
+        if f.path in unsafe_files:
+            for h in f.hunks:
+                by_key.pop(h.key, None)
+    return by_key
+
+
+def _rank(issues: list) -> list:
+    return sorted(issues, key=lambda i: SEVERITY_RANK.get(_norm(i.get("severity")), len(SEVERITY_RANK)))
+
+
+async def review_with_memo(diff: str, review_fn, scope: str) -> str | None:
+    """
+    Review only the hunks not seen before in `scope` (via `review_fn(diff)`),
+    cache the findings per hunk and merge remembered findings back in.
+    Output is the standard review JSON.
+    """
+    memo = get_hunk_memo()
+    files = parse_diff(diff)
+    if not any(f.hunks for f in files):
+        return await review_fn(diff)
+
+    reused, unseen, total = [], set(), 0
+    for f in files:
+        for h in f.hunks:
+            total += 1
+            findings = memo.get(scope, h.key)
+            if findings is None:
+                unseen.add(h.key)
+            else:
+                reused.extend(dict(issue, file=f.path) for issue in findings)
+
+    log(f"🧠 Hunk memo: {total - len(unseen)}/{total} hunks reused")
+
+    if not unseen:
+        return json.dumps({
+            "summary": f"All {total} changed hunks match previously reviewed code; earlier findings reused.",
+            "strengths": [],
+            "issues": _rank(reused),
+            "recommendations": [],
+        }, indent=2)
+
+    text = await review_fn(render_diff(files, lambda h: h.key in unseen))
+    review = parse_review_json(text)
+    if review is None:
+        # Free-form answer: nothing to attribute, pass it through uncached
+        return text
+
+    issues = [i for i in review.get("issues") or [] if isinstance(i, dict)]
+    for key, findings in _attribute_issues(files, unseen, issues).items():
+        memo.put(scope, key, findings)
+
+    if not reused:
+        return text
+
+    seen = {(_norm(i.get("file")), _norm(i.get("code")) or _norm(i.get("issue"))) for i in issues}
+    extra = [i for i in reused if (_norm(i.get("file")), _norm(i.get("code")) or _norm(i.get("issue"))) not in seen]
+    review["issues"] = _rank(issues + extra)
+    review["summary"] = (
+        f"{review.get('summary') or ''}\n"
+        f"({total - len(unseen)} of {total} hunks matched earlier reviews; their findings are included.)"
+    ).strip()
+    return json.dumps(review, indent=2)
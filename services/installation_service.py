@@ -0,0 +1,81 @@
+# services/installation_service.py
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from crud.installation_crud import delete_installation, upsert_installation
+from crud.repo_crud import bulk_upsert_repositories, deactivate_repositories
+from models import User
+from utils.logger import log
+
+# installation.<action> values that (re)activate an installation
+UPSERT_ACTIONS = {"created", "new_permissions_accepted", "unsuspend"}
+
+
+def _repo_names(repos) -> list:
+    return [r["full_name"] for r in (repos or []) if r.get("full_name")]
+
+
+def _upsert_from_payload(db: Session, payload: dict) -> int:
+    """Upsert the payload's installation, linking it to the sender if they have signed in."""
+    inst = payload["installation"]
+    account = inst["account"]
+    sender_id = (payload.get("sender") or {}).get("id")
+
+    # Resolved inside the INSERT – no extra round trip for the user lookup
+    user_id = None
+    if sender_id is not None:
+        user_id = select(User.id).where(User.github_user_id == sender_id).scalar_subquery()
+
+    return upsert_installation(
+        db,
+        installation_id=inst["id"],
+        account_login=account["login"],
+        account_type=account.get("type"),
+        user_id=user_id,
+    )
+
+
+def handle_installation_event(db: Session, event: str, payload: dict) -> dict:
+    """
+    Apply an `installation` / `installation_repositories` webhook in ONE transaction
+    using set-based upserts (installs on orgs with thousands of repos included).
+    """
+    action = payload.get("action")
+    installation_id = payload["installation"]["id"]
+
+    try:
+        if event == "installation" and action == "deleted":
+            removed = delete_installation(db, installation_id)
+            db.commit()
+            log(f"🗑️ Installation deleted: id={installation_id}")
+            return {"status": "installation_deleted", "found": removed}
+
+        if event == "installation" and action == "suspend":
+            pk = _upsert_from_payload(db, payload)
+            count = deactivate_repositories(db, pk)
+            db.commit()
+            log(f"⏸️ Installation suspended: id={installation_id}, repos={count}")
+            return {"status": "installation_suspended", "repositories": count}
+
+        if event == "installation" and action in UPSERT_ACTIONS:
+            pk = _upsert_from_payload(db, payload)
+            count = bulk_upsert_repositories(db, pk, _repo_names(payload.get("repositories")))
+            db.commit()
+            log(f"🔧 Installation saved: id={installation_id}, repos={count}")
+            return {"status": "installation_received", "repositories": count}
+
+        if event == "installation_repositories":
+            pk = _upsert_from_payload(db, payload)
+            added = bulk_upsert_repositories(db, pk, _repo_names(payload.get("repositories_added")))
+            removed = deactivate_repositories(db, pk, _repo_names(payload.get("repositories_removed")))
+            db.commit()
+            log(f"🔧 Installation repos synced: id={installation_id}, +{added} -{removed}")
+            return {"status": "installation_repositories_synced", "added": added, "removed": removed}
+
+    except Exception:
+        db.rollback()
+        raise
+
+    log(f"ℹ️ Ignored {event} action: {action}")
+    return {"status": f"ignored_action: {action}"}
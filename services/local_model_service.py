@@ -0,0 +1,105 @@
+# services/local_model_service.py
+# Self-hosted review backend: a local Ollama-compatible server instead of OpenRouter.
+
+import asyncio
+import os
+
+import httpx
+
+from utils.token_usage import TokenUsage, add_usage, ollama_tokens
+
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "qwen2.5-coder:7b")
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "300"))
+# Should match the server's OLLAMA_NUM_PARALLEL: the server batches the
+# requests it has in flight, anything beyond its slots would just queue there
+OLLAMA_MAX_PARALLEL = int(os.getenv("OLLAMA_MAX_PARALLEL", "4"))
+
+LOCAL_REVIEW_INSTRUCTION = """
+You are a senior code reviewer. Review the changed lines of the diff for
+correctness, security, performance and maintainability. Report only
+actionable, high-impact findings.
+
+Respond with JSON only, in exactly this format:
+{
+  "summary": "Overall findings and impression",
+  "strengths": ["..."],
+  "issues": [
+    {"file": "path/to/file", "code": "offending snippet", "severity": "high|medium|low", "issue": "what is wrong and why"}
+  ],
+  "recommendations": ["..."]
+}
+"""
+
+
+class LocalModelBackend:
+    """
+    Pooled client for one Ollama-compatible server: one keep-alive httpx pool
+    per event loop, sized to the server's parallel slots, and at most
+    OLLAMA_MAX_PARALLEL requests in flight so the server's own continuous
+    batching stays full without queueing.
+    """
+
+    def __init__(
+        self,
+        host: str = OLLAMA_HOST,
+        model: str = OLLAMA_MODEL,
+        max_parallel: int = OLLAMA_MAX_PARALLEL,
+        timeout: float = OLLAMA_TIMEOUT,
+    ):
+        self.host = host
+        self.model = model
+        self.max_parallel = max_parallel
+        self.timeout = timeout
+
+        self._loop = None
+        self._client = None
+        self._slots = None
+
+    def _ensure_loop_state(self):
+        """(Re)create loop-bound resources if we're on a new event loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            from ollama import AsyncClient
+
+            self._loop = loop
+            self._client = AsyncClient(
+                host=self.host,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_parallel,
+                    max_keepalive_connections=self.max_parallel,
+                ),
+            )
+            self._slots = asyncio.Semaphore(self.max_parallel)
+
+    async def review(self, diff: str, usage: TokenUsage | None = None) -> str | None:
+        """Review one diff on the local server; returns the model's JSON text (tokens go to `usage`)."""
+        self._ensure_loop_state()
+        async with self._slots:
+            response = await self._client.chat(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": LOCAL_REVIEW_INSTRUCTION},
+                    {"role": "user", "content": f"Review this code diff:\n\n{diff}"},
+                ],
+                format="json",
+            )
+        add_usage(usage, ollama_tokens(response))
+        return response.message.content if response and response.message else None
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+            self._loop = None
+
+
+_backend = None
+
+
+def get_local_backend() -> LocalModelBackend:
+    global _backend
+    if _backend is None:
+        _backend = LocalModelBackend()
+    return _backend
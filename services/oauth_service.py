@@ -0,0 +1,96 @@
+# services/oauth_service.py
+# GitHub OAuth login calls, on one pooled async client so logins don't
+# tie up worker threads or pay a TLS handshake each.
+
+import asyncio
+import os
+
+import httpx
+
+from services.github_service import GITHUB_API_URL
+from utils.logger import log
+
+GITHUB_OAUTH_URL = os.getenv("GITHUB_OAUTH_URL", "https://github.com").rstrip("/")
+OAUTH_HTTP_TIMEOUT = float(os.getenv("OAUTH_HTTP_TIMEOUT", "10"))
+OAUTH_MAX_CONNECTIONS = int(os.getenv("OAUTH_MAX_CONNECTIONS", "50"))
+
+_client = None
+_client_loop = None
+
+
+def get_oauth_client() -> httpx.AsyncClient:
+    """Shared keep-alive client, rebuilt if we're on a new event loop."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            timeout=OAUTH_HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=OAUTH_MAX_CONNECTIONS,
+                max_keepalive_connections=OAUTH_MAX_CONNECTIONS,
+            ),
+        )
+        _client_loop = loop
+    return _client
+
+
+async def close_oauth_client():
+    global _client, _client_loop
+    if _client is not None:
+        await _client.aclose()
+        _client = _client_loop = None
+
+
+async def exchange_code(code: str, client_id: str, client_secret: str, redirect_uri: str) -> str | None:
+    """OAuth `code` → user access token (None if GitHub refuses it)."""
+    res = await get_oauth_client().post(
+        f"{GITHUB_OAUTH_URL}/login/oauth/access_token",
+        headers={"Accept": "application/json"},
+        data={
+            "client_id": client_id,
+            "client_secret": client_secret,
+            "code": code,
+            "redirect_uri": redirect_uri,
+        },
+    )
+    if res.status_code != 200:
+        log(f"❌ OAuth code exchange failed: {res.status_code}")
+        return None
+    return res.json().get("access_token")
+
+
+def primary_email(emails, fallback: str | None = None) -> str | None:
+    """Primary verified address from /user/emails, else any verified one, else `fallback`."""
+    verified = [e for e in emails or () if isinstance(e, dict) and e.get("verified")]
+    for entry in verified:
+        if entry.get("primary"):
+            return entry.get("email")
+    return verified[0].get("email") if verified else fallback
+
+
+async def fetch_github_identity(access_token: str) -> dict | None:
+    """
+    Profile and verified emails fetched concurrently. Returns the /user
+    payload with `email` set to the primary verified address, or None if
+    the profile can't be read. Missing email scope only loses the email.
+    """
+    client = get_oauth_client()
+    headers = {"Authorization": f"Bearer {access_token}", "Accept": "application/vnd.github+json"}
+    profile_res, emails_res = await asyncio.gather(
+        client.get(f"{GITHUB_API_URL}/user", headers=headers),
+        client.get(f"{GITHUB_API_URL}/user/emails", headers=headers),
+        return_exceptions=True,
+    )
+
+    if isinstance(profile_res, BaseException):
+        raise profile_res
+    if profile_res.status_code != 200:
+        log(f"❌ Failed to fetch GitHub user profile: {profile_res.status_code}")
+        return None
+
+    profile = profile_res.json()
+    emails = None
+    if not isinstance(emails_res, BaseException) and emails_res.status_code == 200:
+        emails = emails_res.json()
+    profile["email"] = primary_email(emails, profile.get("email"))
+    return profile
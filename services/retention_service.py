@@ -0,0 +1,83 @@
+# services/retention_service.py
+# Review log partition upkeep: create upcoming monthly partitions (Postgres),
+# seal the closed month into its own table (SQLite) and drop whole partitions
+# past the retention period.
+
+import asyncio
+import os
+from datetime import datetime
+
+from crud.review_log_partition_crud import (
+    add_months,
+    drop_expired_partitions,
+    ensure_partitions,
+    is_partitioned,
+    month_start,
+    seal_closed_period,
+)
+from database import SessionLocal
+from utils.logger import log
+
+# Whole months of review logs kept besides the current one (0 = keep forever)
+REVIEW_LOG_RETENTION_MONTHS = int(os.getenv("REVIEW_LOG_RETENTION_MONTHS", "12"))
+# Postgres partitions created ahead of the current month
+REVIEW_LOG_PARTITIONS_AHEAD = int(os.getenv("REVIEW_LOG_PARTITIONS_AHEAD", "2"))
+# Daily by default: next month's Postgres partitions must exist before it starts.
+# 0 disables the in-process schedule (use cron + `python -m services.retention_service` instead)
+RETENTION_INTERVAL_SECONDS = int(os.getenv("REVIEW_LOG_RETENTION_INTERVAL_SECONDS", str(24 * 3600)))
+
+
+def retention_cutoff(now: datetime, months: int = REVIEW_LOG_RETENTION_MONTHS) -> datetime | None:
+    """Partitions ending on or before this are expired (None = keep everything)."""
+    if months <= 0:
+        return None
+    return add_months(month_start(now), -months)
+
+
+def prepare_partitions(now: datetime | None = None) -> None:
+    """Partitions for this month onwards; run at startup before any review is logged."""
+    db = SessionLocal()
+    try:
+        if not is_partitioned(db):
+            log("⚠️ pr_review_logs is not partitioned – migrate it to enable monthly retention")
+            return
+        created = ensure_partitions(db, now, months_ahead=REVIEW_LOG_PARTITIONS_AHEAD)
+    finally:
+        db.close()
+    if created:
+        log(f"🗂️ Review log partitions created: {', '.join(created)}")
+
+
+def run_retention(now: datetime | None = None) -> list[str]:
+    """One maintenance pass; returns the partitions dropped."""
+    now = now or datetime.utcnow()
+    prepare_partitions(now)
+
+    db = SessionLocal()
+    try:
+        sealed = seal_closed_period(db, now)
+        if sealed:
+            log(f"🗂️ Review logs sealed into {sealed}")
+
+        cutoff = retention_cutoff(now)
+        dropped = drop_expired_partitions(db, cutoff) if cutoff else []
+    finally:
+        db.close()
+
+    if dropped:
+        log(f"🧹 Review log retention dropped: {', '.join(dropped)}")
+    return dropped
+
+
+async def retention_loop(interval_seconds: int = RETENTION_INTERVAL_SECONDS):
+    """Background schedule for partition upkeep (started from app startup)."""
+    while True:
+        try:
+            await asyncio.to_thread(run_retention)
+        except Exception as e:
+            log(f"⚠️ Review log retention failed: {e}")
+        await asyncio.sleep(interval_seconds)
+
+
+if __name__ == "__main__":
+    run_retention()
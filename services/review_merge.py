@@ -0,0 +1,84 @@
+# services/review_merge.py
+
+import json
+import re
+
+SEVERITY_RANK = {"critical": 0, "high": 1, "medium": 2, "low": 3, "info": 4}
+
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+
+
+def parse_review_json(text: str | None) -> dict | None:
+    """
+    Best-effort parse of a model answer in the review JSON schema.
+    Tolerates ```json fences and prose around the object; None if no JSON found.
+    """
+    if not text:
+        return None
+
+    cleaned = _FENCE.sub("", text.strip())
+    try:
+        data = json.loads(cleaned)
+    except ValueError:
+        start, end = cleaned.find("{"), cleaned.rfind("}")
+        if start < 0 or end <= start:
+            return None
+        try:
+            data = json.loads(cleaned[start:end + 1])
+        except ValueError:
+            return None
+
+    return data if isinstance(data, dict) else None
+
+
+def _norm(value) -> str:
+    return " ".join(str(value or "").lower().split())
+
+
+def _unique(items):
+    seen, out = set(), []
+    for item in items:
+        key = _norm(item)
+        if key and key not in seen:
+            seen.add(key)
+            out.append(item)
+    return out
+
+
+def merge_reviews(results: dict) -> dict:
+    """
+    Merge specialist reviews ({dimension: review dict}) into one review in the
+    standard schema: issues deduped by (file, code/issue) keeping the most
+    severe copy, then ranked by severity.
+    """
+    summaries, strengths, recommendations = [], [], []
+    issues = {}
+
+    for dimension, review in results.items():
+        if not review:
+            continue
+        if review.get("summary"):
+            summaries.append(f"**{dimension.capitalize()}:** {review['summary']}")
+        strengths.extend(review.get("strengths") or [])
+        recommendations.extend(review.get("recommendations") or [])
+
+        for issue in review.get("issues") or []:
+            if not isinstance(issue, dict):
+                continue
+            key = (_norm(issue.get("file")), _norm(issue.get("code")) or _norm(issue.get("issue")))
+            current = issues.get(key)
+            rank = SEVERITY_RANK.get(_norm(issue.get("severity")), len(SEVERITY_RANK))
+            if current is None or rank < SEVERITY_RANK.get(_norm(current.get("severity")), len(SEVERITY_RANK)):
+                issues[key] = issue
+
+    ranked = sorted(
+        issues.values(),
+        key=lambda i: (SEVERITY_RANK.get(_norm(i.get("severity")), len(SEVERITY_RANK)), _norm(i.get("file"))),
+    )
+
+    return {
+        "summary": "\n".join(summaries) or "No significant findings.",
+        "strengths": _unique(strengths),
+        "issues": ranked,
+        "recommendations": _unique(recommendations),
+    }
@@ -0,0 +1,284 @@
+# services/review_pipeline.py
+
+import asyncio
+import time
+
+from crud.installation_crud import get_installation_by_installation_id
+from crud.review_log_crud import create_review_log
+from crud.user_crud import increment_user_pr_usage, rollover_user_period_if_expired
+from database import SessionLocal
+from models import PRReviewStatus
+from services.ai_review_service import (
+    resolve_model_backend,
+    resolve_review_dimensions,
+    run_ai_code_review,
+)
+from services.admission import record_completion
+from services.context_service import FILE_CONTEXT_ENABLED, fetch_review_context
+from services.github_service import (
+    create_installation_token,
+    get_diff_via_api,
+    post_github_comment,
+)
+from services.hunk_memo import HUNK_MEMO_ENABLED, memo_scope, review_with_memo
+from services.mirror_service import REPO_MIRROR_ENABLED, pr_mirror_diff, prepare_pr_mirror
+from services.review_router import (
+    MODEL_ROUTING_ENABLED,
+    TIER_RULE,
+    TIER_SMALL,
+    classify_diff,
+    log_route,
+    route_review,
+    rule_based_review,
+)
+from services.webhook_intake import PullRequestEvent
+from utils import metrics
+from utils.deadline import REVIEW_COMMENT_RESERVE_SECONDS, Deadline, DeadlineExceeded
+from utils.logger import log
+from utils.resilience import CircuitOpenError
+from utils.token_usage import TokenUsage
+
+
+def _record_review(
+    db,
+    inst,
+    user,
+    pr_event: PullRequestEvent,
+    started: float,
+    status: PRReviewStatus,
+    error: str | None = None,
+    usage: TokenUsage | None = None,
+):
+    """Write the PRReviewLog row that backs review history and analytics (tokens from `usage`)."""
+    create_review_log(
+        db,
+        user_id=user.id,
+        installation_id=inst.id,
+        repo_full_name=pr_event.repo_full_name,
+        pr_number=pr_event.pr_number,
+        head_sha=pr_event.head_sha,
+        status=status,
+        error_message=error,
+        tokens_used=(usage.total or None) if usage else None,
+        duration_ms=int((time.monotonic() - started) * 1000),
+    )
+
+
+async def review_pull_request(pr_event: PullRequestEvent, deadline: Deadline | None = None) -> dict:
+    """
+    Review one PR: check plan → fetch diff → run AI review → post comment.
+    Shared by the inline webhook path and the queue workers; unexpected
+    errors are raised so the caller can decide (respond / retry the job).
+    Blocking GitHub calls run in threads so one worker can hold many reviews.
+
+    Every stage gets what is left of `deadline` (created at intake; a fresh
+    REVIEW_DEADLINE_SECONDS budget if omitted). Running out is recorded as
+    PRReviewStatus.TIMEOUT rather than raised.
+    """
+    if deadline is None:
+        deadline = Deadline.after()
+    installation_id = pr_event.installation_id
+    repo_full_name = pr_event.repo_full_name
+    pr_number = pr_event.pr_number
+
+    log(f"🔔 PR #{pr_number} {pr_event.head_ref} → {pr_event.base_ref} ({repo_full_name})")
+    started = time.monotonic()
+    usage = TokenUsage()
+
+    db = SessionLocal()
+    try:
+        # ----------------------------------------------------------------
+        # Load installation → user → plan from DB
+        # ----------------------------------------------------------------
+        inst = get_installation_by_installation_id(db, installation_id)
+        if not inst:
+            log("❌ Installation not found in DB")
+            return {"status": "installation_not_found"}
+
+        user = inst.user
+        if not user:
+            log("❌ Installation found but no linked user")
+            return {"status": "user_not_linked"}
+
+        plan = user.plan
+        if not plan:
+            log("❌ User has no plan")
+            return {"status": "plan_not_found"}
+
+        # Lazily start a new billing period if the current one has expired
+        if rollover_user_period_if_expired(db, user):
+            log("🔄 Billing period rolled over")
+
+        used = user.pr_used_this_period or 0
+        limit = plan.monthly_pr_limit or 0
+
+        log(f"📊 User={user.email}, Plan={plan.name}, Used={used}/{limit}")
+
+        try:
+            return await _run_review(db, inst, user, plan, pr_event, started, used, limit, deadline, usage)
+        except DeadlineExceeded as e:
+            log(f"⏱️ PR #{pr_number} review timed out during {e.stage}")
+            metrics.inc("review_timeouts_total", stage=e.stage)
+            _record_review(db, inst, user, pr_event, started, PRReviewStatus.TIMEOUT, str(e), usage)
+            return {"status": "timeout", "stage": e.stage}
+        except CircuitOpenError:
+            # Not attempted – the caller postpones or rejects it, nothing to log yet
+            raise
+        except Exception as e:
+            _record_review(db, inst, user, pr_event, started, PRReviewStatus.ERROR, str(e), usage)
+            raise
+    finally:
+        db.close()
+        record_completion()
+
+
+async def _run_review(
+    db,
+    inst,
+    user,
+    plan,
+    pr_event: PullRequestEvent,
+    started: float,
+    used: int,
+    limit: int,
+    deadline: Deadline,
+    usage: TokenUsage | None = None,
+) -> dict:
+    """Limit check → diff → AI review → comment, for an already-resolved user/plan."""
+    installation_id = pr_event.installation_id
+    repo_full_name = pr_event.repo_full_name
+    pr_number = pr_event.pr_number
+
+    # ----------------------------------------------------------------
+    # PLAN LIMIT CHECK
+    # ----------------------------------------------------------------
+    if used >= limit:
+        installation_token = await deadline.to_thread("token", create_installation_token, installation_id)
+
+        upgrade_msg = (
+            f"🚫 **Review Limit Reached**\n\n"
+            f"Your **{plan.name} plan** allows only **{limit} PR reviews**.\n"
+            f"👉 Upgrade your plan to continue using AI Review.\n"
+        )
+
+        await deadline.to_thread(
+            "comment",
+            post_github_comment,
+            installation_token,
+            repo_full_name,
+            pr_number,
+            upgrade_msg,
+        )
+
+        log("❌ Limit reached — upgrade required")
+        _record_review(db, inst, user, pr_event, started, PRReviewStatus.LIMIT_REACHED)
+        return {"status": "limit_reached"}
+
+    # ----------------------------------------------------------------
+    # 1) INSTALLATION TOKEN
+    # ----------------------------------------------------------------
+    installation_token = await deadline.to_thread("token", create_installation_token, installation_id)
+
+    # ----------------------------------------------------------------
+    # 2) FETCH PR DIFF
+    # ----------------------------------------------------------------
+    # The mirror is held (not evicted) until the review no longer reads from it
+    mirror = None
+    try:
+        diff = None
+        if REPO_MIRROR_ENABLED:
+            mirror = await deadline.run("diff", asyncio.to_thread(prepare_pr_mirror, installation_token, pr_event))
+            if mirror:
+                diff = await deadline.run("diff", asyncio.to_thread(pr_mirror_diff, mirror))
+                if diff is None:
+                    mirror.close()
+                    mirror = None
+        if diff is None:
+            diff = await deadline.to_thread("diff", get_diff_via_api, installation_token, repo_full_name, pr_number)
+        if not diff.strip():
+            log("⚠️ Empty diff")
+            _record_review(db, inst, user, pr_event, started, PRReviewStatus.SKIPPED)
+            return {"status": "skipped_no_diff"}
+
+        log(f"✅ Diff fetched ({len(diff)} chars)")
+
+        # ----------------------------------------------------------------
+        # 3) RUN AI REVIEW
+        # ----------------------------------------------------------------
+        dimensions = resolve_review_dimensions(plan)
+        backend = resolve_model_backend(plan)
+        model, route = None, None
+        if MODEL_ROUTING_ENABLED:
+            profile = classify_diff(diff)
+            route = route_review(profile)
+            log_route(pr_event, profile, route)
+            if route.tier == TIER_SMALL:
+                dimensions = None  # specialists are for the full tier
+                if backend != "local":
+                    model = route.model
+
+        if route and route.tier == TIER_RULE:
+            # Lockfile bumps / generated files: deterministic summary, no model call
+            ai_review = rule_based_review(profile)
+        else:
+            context = ""
+            if FILE_CONTEXT_ENABLED and (mirror or pr_event.base_sha):
+                context = await deadline.run(
+                    "context",
+                    asyncio.to_thread(
+                        fetch_review_context,
+                        installation_token,
+                        repo_full_name,
+                        pr_number,
+                        pr_event.base_sha,
+                        diff,
+                        mirror,
+                    ),
+                    reserve=REVIEW_COMMENT_RESERVE_SECONDS,
+                )
+
+            async def review_fn(review_diff: str):
+                return await run_ai_code_review(
+                    review_diff,
+                    pr_number,
+                    dimensions=dimensions,
+                    backend=backend,
+                    context=context,
+                    model=model,
+                    installation_id=installation_id,
+                    usage=usage,
+                )
+
+            # The LLM leaves REVIEW_COMMENT_RESERVE_SECONDS for posting the result
+            if HUNK_MEMO_ENABLED:
+                review = review_with_memo(diff, review_fn, memo_scope(installation_id, backend, model, dimensions))
+            else:
+                review = review_fn(diff)
+            ai_review = await deadline.run("ai_review", review, reserve=REVIEW_COMMENT_RESERVE_SECONDS)
+    finally:
+        if mirror:
+            mirror.close()
+    if not ai_review:
+        log("⚠️ AI review failed")
+        _record_review(db, inst, user, pr_event, started, PRReviewStatus.ERROR, "AI review failed", usage)
+        return {"status": "error_ai_review"}
+
+    # ----------------------------------------------------------------
+    # 4) POST COMMENT
+    # ----------------------------------------------------------------
+    await deadline.to_thread("comment", post_github_comment, installation_token, repo_full_name, pr_number, ai_review)
+    log("💬 Review comment posted")
+
+    # ----------------------------------------------------------------
+    # 5) INCREMENT PR USAGE
+    # ----------------------------------------------------------------
+    increment_user_pr_usage(db, user.id)
+    log("📈 PR usage incremented")
+    _record_review(db, inst, user, pr_event, started, PRReviewStatus.SUCCESS, usage=usage)
+
+    return {
+        "status": "success",
+        "pr_number": pr_number,
+        "used": used + 1,
+        "limit": limit,
+    }
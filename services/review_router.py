@@ -0,0 +1,139 @@
+# services/review_router.py
+# Complexity-based model routing. A cheap classifier over the diff (size,
+# file types, churn, security-sensitive paths) picks one of three tiers:
+#   rule  – deterministic summary, no LLM (lockfile bumps, generated files)
+#   small – fast model with a compact prompt (routine diffs)
+#   full  – the full review agent (large or security-sensitive changes)
+
+import json
+import os
+import re
+from dataclasses import dataclass, field
+
+from services.ai_review_service import OPENROUTER_MODEL
+from services.hunk_memo import parse_diff
+from utils import metrics
+from utils.logger import log
+
+MODEL_ROUTING_ENABLED = os.getenv("MODEL_ROUTING_ENABLED", "0") == "1"
+# Fast model for routine diffs (defaults to the full model, still via the lean prompt)
+OPENROUTER_SMALL_MODEL = os.getenv("OPENROUTER_SMALL_MODEL")
+ROUTER_SMALL_MAX_LINES = int(os.getenv("ROUTER_SMALL_MAX_LINES", "150"))
+ROUTER_SMALL_MAX_FILES = int(os.getenv("ROUTER_SMALL_MAX_FILES", "8"))
+# Docs/config-only diffs stay on the small tier up to this many changed lines
+ROUTER_DOCS_MAX_LINES = int(os.getenv("ROUTER_DOCS_MAX_LINES", "600"))
+
+TIER_RULE, TIER_SMALL, TIER_FULL = "rule", "small", "full"
+
+# Never worth a model call: dependency lockfiles, generated and minified files
+TRIVIAL_FILES = re.compile(
+    r"(^|/)(package-lock\.json|yarn\.lock|pnpm-lock\.yaml|poetry\.lock|Pipfile\.lock|uv\.lock|"
+    r"Cargo\.lock|Gemfile\.lock|composer\.lock|go\.sum|mix\.lock|pubspec\.lock|packages\.lock\.json)$"
+    r"|\.min\.(js|css)$|\.map$|(^|/)(vendor|node_modules|dist)/|\.(snap|svg|png|jpe?g|gif|ico|woff2?|pdf)$",
+    re.IGNORECASE,
+)
+DOC_CONFIG_EXTENSIONS = {".md", ".rst", ".txt", ".adoc", ".yml", ".yaml", ".toml", ".ini", ".cfg", ".json"}
+# Paths whose changes always get the full model, whatever their size
+SECURITY_PATHS = re.compile(
+    os.getenv(
+        "ROUTER_SECURITY_PATHS",
+        r"auth|login|session|token|secret|credential|password|crypt|permission|acl|oauth|jwt|"
+        r"payment|billing|webhook|sanitiz|migration|\.github/workflows|dockerfile|\.env",
+    ),
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class DiffProfile:
+    files: list = field(default_factory=list)
+    added: int = 0
+    removed: int = 0
+    trivial_files: list = field(default_factory=list)
+    security_files: list = field(default_factory=list)
+    docs_only: bool = False
+
+    @property
+    def churn(self) -> int:
+        return self.added + self.removed
+
+
+@dataclass
+class RouteDecision:
+    tier: str
+    model: str | None
+    reason: str
+
+
+def classify_diff(diff: str) -> DiffProfile:
+    profile = DiffProfile()
+    for f in parse_diff(diff):
+        profile.files.append(f.path)
+        for hunk in f.hunks:
+            for line in hunk.lines:
+                if line.startswith("+"):
+                    profile.added += 1
+                elif line.startswith("-"):
+                    profile.removed += 1
+        if TRIVIAL_FILES.search(f.path):
+            profile.trivial_files.append(f.path)
+        if SECURITY_PATHS.search(f.path):
+            profile.security_files.append(f.path)
+    profile.docs_only = bool(profile.files) and all(
+        os.path.splitext(p)[1].lower() in DOC_CONFIG_EXTENSIONS or p in profile.trivial_files for p in profile.files
+    )
+    return profile
+
+
+def route_review(profile: DiffProfile) -> RouteDecision:
+    """model=None on the full tier means the review agent (and plan dimensions) as before."""
+    small_model = OPENROUTER_SMALL_MODEL or OPENROUTER_MODEL
+    files = len(profile.files)
+
+    if profile.files and len(profile.trivial_files) == files:
+        return RouteDecision(TIER_RULE, None, "only lockfiles / generated files")
+    if profile.security_files:
+        return RouteDecision(TIER_FULL, None, f"security-sensitive: {', '.join(profile.security_files[:3])}")
+    if profile.docs_only and profile.churn <= ROUTER_DOCS_MAX_LINES:
+        return RouteDecision(TIER_SMALL, small_model, f"docs/config only, {profile.churn} lines")
+    if profile.churn <= ROUTER_SMALL_MAX_LINES and files <= ROUTER_SMALL_MAX_FILES:
+        return RouteDecision(TIER_SMALL, small_model, f"routine: {profile.churn} lines in {files} file(s)")
+    return RouteDecision(TIER_FULL, None, f"complex: {profile.churn} lines in {files} file(s)")
+
+
+def log_route(pr_event, profile: DiffProfile, decision: RouteDecision):
+    """One JSON line per decision so thresholds can be tuned from the logs."""
+    metrics.inc("review_route_total", tier=decision.tier)
+    record = {
+        "repo": pr_event.repo_full_name,
+        "pr": pr_event.pr_number,
+        "tier": decision.tier,
+        "model": decision.model,
+        "reason": decision.reason,
+        "files": len(profile.files),
+        "added": profile.added,
+        "removed": profile.removed,
+        "trivial_files": len(profile.trivial_files),
+        "security_files": len(profile.security_files),
+        "docs_only": profile.docs_only,
+    }
+    log(f"🧭 Review route {json.dumps(record, separators=(',', ':'))}")
+
+
+def rule_based_review(profile: DiffProfile) -> str:
+    """Deterministic review for trivial diffs, in the usual review JSON schema."""
+    shown = ", ".join(profile.trivial_files[:5]) + (" …" if len(profile.trivial_files) > 5 else "")
+    return json.dumps(
+        {
+            "summary": (
+                f"Only dependency lockfiles or generated files changed ({shown}; "
+                f"+{profile.added}/-{profile.removed} lines). No hand-written code to review."
+            ),
+            "strengths": [],
+            "issues": [],
+            "recommendations": [
+                "Make sure the change that regenerated these files (manifest bump, build) is intended.",
+            ],
+        },
+        indent=2,
+    )
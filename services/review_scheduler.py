@@ -0,0 +1,178 @@
+# services/review_scheduler.py
+# Shortest-job-first review scheduling with per-installation fairness.
+#
+# Every review gets a priority class from its diff size minus the plan's
+# boost, and a virtual deadline = arrival + class * SCHED_PRIORITY_STEP_SECONDS
+# (small PRs first, large ones can't starve). Among tenants under their cap,
+# the one with the fewest reviews running goes next, earliest deadline first.
+# The DB queue (crud.job_crud.claim_jobs) applies the same policy.
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from services.admission import deferred_wait
+from utils import metrics
+from utils.deadline import Deadline
+from utils.logger import log
+
+SCHED_SMALL_DIFF_LINES = int(os.getenv("SCHED_SMALL_DIFF_LINES", "50"))
+SCHED_LARGE_DIFF_LINES = int(os.getenv("SCHED_LARGE_DIFF_LINES", "1000"))
+SCHED_PRIORITY_STEP_SECONDS = int(os.getenv("SCHED_PRIORITY_STEP_SECONDS", "60"))
+# Inline mode: reviews running at once in this process
+REVIEW_MAX_CONCURRENCY = int(os.getenv("REVIEW_MAX_CONCURRENCY", "8"))
+# Both modes: reviews running at once for one installation
+REVIEW_PER_INSTALLATION_CONCURRENCY = int(os.getenv("REVIEW_PER_INSTALLATION_CONCURRENCY", "2"))
+
+PRIORITY_CLASSES = ("small", "medium", "large")
+
+
+def size_class(pr_event) -> int:
+    """0 = small, 1 = medium, 2 = large; unknown size counts as medium."""
+    if pr_event.additions is None and pr_event.deletions is None:
+        return 1
+    lines = (pr_event.additions or 0) + (pr_event.deletions or 0)
+    if lines <= SCHED_SMALL_DIFF_LINES:
+        return 0
+    if lines <= SCHED_LARGE_DIFF_LINES:
+        return 1
+    return 2
+
+
+def review_priority(pr_event, plan_boost: int = 0) -> int:
+    return max(0, size_class(pr_event) - (plan_boost or 0))
+
+
+def priority_label(priority: int) -> str:
+    return PRIORITY_CLASSES[min(max(priority, 0), len(PRIORITY_CLASSES) - 1)]
+
+
+def virtual_deadline(priority: int, now: datetime | None = None) -> datetime:
+    return (now or datetime.utcnow()) + timedelta(seconds=priority * SCHED_PRIORITY_STEP_SECONDS)
+
+
+def lookup_review_priority(pr_event) -> int:
+    """Priority for a PR event, including its plan's boost (one small query)."""
+    from crud.plan_crud import get_review_priority_for_installation
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        boost = get_review_priority_for_installation(db, pr_event.installation_id)
+    finally:
+        db.close()
+    return review_priority(pr_event, boost)
+
+
+class FairScheduler:
+    """In-process admission gate for inline reviews (one per event loop)."""
+
+    def __init__(
+        self,
+        max_concurrency: int = REVIEW_MAX_CONCURRENCY,
+        per_tenant_cap: int = REVIEW_PER_INSTALLATION_CONCURRENCY,
+    ):
+        self.max_concurrency = max_concurrency
+        self.per_tenant_cap = per_tenant_cap
+        self._queues = defaultdict(list)  # tenant → heap of (deadline, seq, future)
+        self._running = defaultdict(int)
+        self._active = 0
+        self._seq = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    @property
+    def running(self) -> int:
+        return self._active
+
+    def _dispatch(self):
+        while self._active < self.max_concurrency:
+            best = None
+            for tenant, heap in self._queues.items():
+                if heap and self._running[tenant] < self.per_tenant_cap:
+                    key = (self._running[tenant], heap[0][0], heap[0][1])
+                    if best is None or key < best[0]:
+                        best = (key, tenant)
+            if best is None:
+                return
+
+            tenant = best[1]
+            _, _, future = heapq.heappop(self._queues[tenant])
+            if not self._queues[tenant]:
+                del self._queues[tenant]
+            if future.done():  # waiter was cancelled
+                continue
+            self._running[tenant] += 1
+            self._active += 1
+            future.set_result(None)
+
+    def _release(self, tenant):
+        self._running[tenant] -= 1
+        if not self._running[tenant]:
+            del self._running[tenant]
+        self._active -= 1
+        self._dispatch()
+
+    async def run(self, tenant, priority: int, factory):
+        """Wait for a slot, then `await factory()`; the slot is freed afterwards."""
+        arrived = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        deadline = arrived + priority * SCHED_PRIORITY_STEP_SECONDS
+        heapq.heappush(self._queues[tenant], (deadline, next(self._seq), future))
+        self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release(tenant)  # slot was granted just before cancellation
+            raise
+
+        metrics.observe("review_queue_wait_seconds", time.monotonic() - arrived, priority=priority_label(priority))
+        try:
+            return await factory()
+        finally:
+            self._release(tenant)
+
+
+_scheduler = None
+
+
+def get_scheduler() -> FairScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = FairScheduler()
+    return _scheduler
+
+
+@metrics.register_collector
+def _scheduler_gauges() -> list:
+    if _scheduler is None:
+        return []
+    return [
+        ("review_scheduler_queued", {}, _scheduler.queued),
+        ("review_scheduler_running", {}, _scheduler.running),
+    ]
+
+
+async def schedule_pull_request_review(pr_event, priority: int | None = None, delay: int = 0) -> dict:
+    """Inline mode: run the review once the fair scheduler grants a slot (after `delay`s)."""
+    from services.review_pipeline import review_pull_request
+
+    if priority is None:
+        priority = await asyncio.to_thread(lookup_review_priority, pr_event)
+    if delay:
+        with deferred_wait():
+            await asyncio.sleep(delay)
+    # The budget starts at intake, so time spent waiting for a slot counts
+    deadline = Deadline.after()
+    scheduler = get_scheduler()
+    if scheduler.running >= scheduler.max_concurrency:
+        log(f"⏳ PR #{pr_event.pr_number} waiting for a review slot ({priority_label(priority)})")
+    return await scheduler.run(pr_event.installation_id, priority, lambda: review_pull_request(pr_event, deadline))
@@ -0,0 +1,184 @@
+# services/review_worker.py
+"""
+Review worker: claims leased jobs from `review_jobs` and runs the review pipeline.
+Run as many as you like, on any node sharing the database:
+
+    python -m services.review_worker
+"""
+
+import asyncio
+import os
+import socket
+import traceback
+import uuid
+from dataclasses import asdict
+from datetime import datetime
+
+from crud.job_crud import claim_jobs, complete_job, enqueue_job, fail_job, heartbeat_job, postpone_job
+from database import SessionLocal
+from services.review_scheduler import (
+    REVIEW_PER_INSTALLATION_CONCURRENCY,
+    lookup_review_priority,
+    priority_label,
+    virtual_deadline,
+)
+from services.webhook_intake import PullRequestEvent
+from utils import metrics
+from utils.deadline import Deadline
+from utils.logger import log
+from utils.resilience import CircuitOpenError
+
+# "inline" (review inside the webhook request) or "queue" (enqueue for workers)
+REVIEW_QUEUE_MODE = os.getenv("REVIEW_QUEUE_MODE", "inline")
+
+JOB_VISIBILITY_TIMEOUT = int(os.getenv("REVIEW_JOB_VISIBILITY_TIMEOUT", "300"))
+JOB_HEARTBEAT_INTERVAL = max(1, JOB_VISIBILITY_TIMEOUT // 3)
+JOB_RETRY_DELAY = int(os.getenv("REVIEW_JOB_RETRY_DELAY", "60"))
+WORKER_CONCURRENCY = int(os.getenv("REVIEW_WORKER_CONCURRENCY", "4"))
+WORKER_POLL_INTERVAL = float(os.getenv("REVIEW_WORKER_POLL_INTERVAL", "2"))
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def _db_call(fn, *args, **kwargs):
+    """Run one job-table operation in its own short-lived session."""
+    db = SessionLocal()
+    try:
+        return fn(db, *args, **kwargs)
+    finally:
+        db.close()
+
+
+def pull_request_dedupe_key(pr_event: PullRequestEvent) -> str:
+    return f"pr:{pr_event.repo_full_name}#{pr_event.pr_number}@{pr_event.head_sha or pr_event.action}"
+
+
+def enqueue_pull_request_review(
+    pr_event: PullRequestEvent,
+    priority: int | None = None,
+    run_after: datetime | None = None,
+) -> dict:
+    """Queue a PR review for the worker pool (redeliveries are deduplicated)."""
+    if priority is None:
+        priority = lookup_review_priority(pr_event)
+    job_id = _db_call(
+        enqueue_job,
+        payload=asdict(pr_event),
+        dedupe_key=pull_request_dedupe_key(pr_event),
+        run_after=run_after,
+        installation_id=pr_event.installation_id,
+        priority=priority,
+        # Deadline counts from when the job becomes due: deferred / backfill
+        # jobs must not outrank live reviews queued after them
+        sched_key=virtual_deadline(priority, run_after),
+    )
+    if job_id is None:
+        log(f"ℹ️ Review already queued for PR #{pr_event.pr_number}")
+        return {"status": "already_queued", "pr_number": pr_event.pr_number}
+
+    log(f"📥 Review job {job_id} queued for PR #{pr_event.pr_number}")
+    return {"status": "queued", "job_id": job_id, "pr_number": pr_event.pr_number}
+
+
+async def _keep_lease(job_id: int, review: asyncio.Task) -> bool:
+    """
+    Heartbeat until cancelled. If the lease was lost (another worker may
+    already have re-claimed the job) the review is cancelled so the PR isn't
+    reviewed twice; returns False in that case.
+    """
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_INTERVAL)
+        alive = await asyncio.to_thread(
+            _db_call, heartbeat_job, job_id, WORKER_ID, JOB_VISIBILITY_TIMEOUT
+        )
+        if not alive:
+            log(f"⚠️ Lease lost for job {job_id}, abandoning its review")
+            metrics.inc("review_job_leases_lost_total")
+            review.cancel()
+            return False
+
+
+def _lease_lost(heartbeat: asyncio.Task) -> bool:
+    return heartbeat.done() and not heartbeat.cancelled() and heartbeat.result() is False
+
+
+def _record_outcome(job_id: int, recorded: bool, outcome: str):
+    if not recorded:
+        # The lease expired meanwhile: the job's new owner decides its outcome
+        log(f"⚠️ Job {job_id} {outcome} after its lease was lost; not recorded")
+        metrics.inc("review_job_stale_results_total")
+
+
+async def process_job(job) -> None:
+    """Run one claimed job and record the outcome."""
+    from services.review_pipeline import review_pull_request
+
+    if job.attempts > job.max_attempts:
+        # Reclaimed from a crashed worker too many times
+        await asyncio.to_thread(_db_call, fail_job, job.id, WORKER_ID, "max attempts exceeded")
+        return
+
+    if job.attempts == 1 and job.created_at:
+        wait = (datetime.utcnow() - job.created_at.replace(tzinfo=None)).total_seconds()
+        metrics.observe("review_queue_wait_seconds", wait, priority=priority_label(job.priority))
+
+    review = asyncio.create_task(review_pull_request(PullRequestEvent(**job.payload), Deadline.after()))
+    heartbeat = asyncio.create_task(_keep_lease(job.id, review))
+    try:
+        result = await review
+        done = await asyncio.to_thread(_db_call, complete_job, job.id, WORKER_ID)
+        _record_outcome(job.id, done, "finished")
+        if done:
+            log(f"✅ Job {job.id} done: {result.get('status')}")
+    except asyncio.CancelledError:
+        if _lease_lost(heartbeat):
+            return
+        review.cancel()
+        raise
+    except CircuitOpenError as e:
+        # Dependency is failing fast: no traceback, no attempt spent – come back
+        # once the breaker may probe again, however long the outage lasts
+        log(f"🔌 Job {job.id} postponed: {e}")
+        delay = max(JOB_RETRY_DELAY, int(e.retry_after) + 1)
+        released = await asyncio.to_thread(_db_call, postpone_job, job.id, WORKER_ID, str(e), delay)
+        _record_outcome(job.id, released, "postponed")
+    except Exception as e:
+        log(f"❌ Job {job.id} failed (attempt {job.attempts}): {e}")
+        traceback.print_exc()
+        released = await asyncio.to_thread(_db_call, fail_job, job.id, WORKER_ID, str(e), JOB_RETRY_DELAY)
+        _record_outcome(job.id, released, "failed")
+    finally:
+        heartbeat.cancel()
+
+
+async def run_worker(concurrency: int = WORKER_CONCURRENCY):
+    """Claim-and-run loop; at most `concurrency` jobs in flight per process."""
+    log(f"👷 Review worker {WORKER_ID} started (concurrency={concurrency})")
+    in_flight = set()
+
+    while True:
+        free = concurrency - len(in_flight)
+        jobs = []
+        if free > 0:
+            jobs = await asyncio.to_thread(
+                _db_call,
+                claim_jobs,
+                WORKER_ID,
+                free,
+                JOB_VISIBILITY_TIMEOUT,
+                per_tenant_cap=REVIEW_PER_INSTALLATION_CONCURRENCY,
+            )
+
+        for job in jobs:
+            task = asyncio.create_task(process_job(job))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+        if not jobs:
+            await asyncio.sleep(WORKER_POLL_INTERVAL)
+        elif len(in_flight) >= concurrency:
+            await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+
+
+if __name__ == "__main__":
+    asyncio.run(run_worker())
@@ -0,0 +1,46 @@
+# services/rollup_service.py
+
+import asyncio
+import os
+
+from crud.rollup_crud import apply_rollup_batch
+from database import SessionLocal
+from utils.logger import log
+
+ROLLUP_BATCH_SIZE = int(os.getenv("USAGE_ROLLUP_BATCH_SIZE", "5000"))
+ROLLUP_SETTLE_SECONDS = int(os.getenv("USAGE_ROLLUP_SETTLE_SECONDS", "60"))
+# 0 disables the in-process schedule (use cron + `python -m services.rollup_service` instead)
+ROLLUP_INTERVAL_SECONDS = int(os.getenv("USAGE_ROLLUP_INTERVAL_SECONDS", "0"))
+
+
+def run_rollups(batch_size: int = ROLLUP_BATCH_SIZE) -> int:
+    """Fold all settled review logs into the daily rollups; returns rows folded."""
+    total = 0
+
+    db = SessionLocal()
+    try:
+        while True:
+            folded = apply_rollup_batch(db, batch_size=batch_size, settle_seconds=ROLLUP_SETTLE_SECONDS)
+            if not folded:
+                break
+            total += folded
+    finally:
+        db.close()
+
+    if total:
+        log(f"📊 Usage rollups updated from {total} review logs")
+    return total
+
+
+async def rollup_loop(interval_seconds: int = ROLLUP_INTERVAL_SECONDS):
+    """Background schedule for the rollup job (started from app startup)."""
+    while True:
+        try:
+            await asyncio.to_thread(run_rollups)
+        except Exception as e:
+            log(f"⚠️ Usage rollup failed: {e}")
+        await asyncio.sleep(interval_seconds)
+
+
+if __name__ == "__main__":
+    run_rollups()
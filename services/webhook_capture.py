@@ -0,0 +1,120 @@
+# services/webhook_capture.py
+# Opt-in recording of raw webhook deliveries for replay (scripts/replay_webhooks.py).
+# One JSON object per line in gzip files that rotate by size:
+#   {"ts": <unix time>, "headers": {...}, "body_b64": "<exact raw body>"}
+
+import base64
+import glob
+import gzip
+import json
+import os
+import threading
+import time
+
+from utils import metrics
+from utils.logger import log
+
+# Unset = capture off
+WEBHOOK_CAPTURE_DIR = os.getenv("WEBHOOK_CAPTURE_DIR")
+WEBHOOK_CAPTURE_MAX_BYTES = int(os.getenv("WEBHOOK_CAPTURE_MAX_BYTES", str(64 * 1024 * 1024)))
+WEBHOOK_CAPTURE_KEEP_FILES = int(os.getenv("WEBHOOK_CAPTURE_KEEP_FILES", "20"))
+
+# Everything needed to replay a delivery faithfully (signature included)
+CAPTURED_HEADERS = (
+    "content-type",
+    "user-agent",
+    "x-github-event",
+    "x-github-delivery",
+    "x-github-hook-id",
+    "x-github-hook-installation-target-id",
+    "x-github-hook-installation-target-type",
+    "x-hub-signature-256",
+)
+
+
+class CaptureWriter:
+    """Appends deliveries to `<dir>/webhooks-<start>.jsonl.gz`, rotating by size."""
+
+    def __init__(self, directory: str, max_bytes: int = WEBHOOK_CAPTURE_MAX_BYTES, keep_files: int = WEBHOOK_CAPTURE_KEEP_FILES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.keep_files = keep_files
+        self._file = None
+        self._raw = None
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._seq += 1
+        name = f"webhooks-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{self._seq:04d}.jsonl.gz"
+        path = os.path.join(self.directory, name)
+        self._raw = open(path, "ab")
+        self._file = gzip.GzipFile(fileobj=self._raw, mode="ab")
+        log(f"🎙️ Capturing webhooks to {path}")
+
+        # Keep only the newest `keep_files` archives
+        archives = sorted(glob.glob(os.path.join(self.directory, "webhooks-*.jsonl.gz")), key=os.path.getmtime)
+        for old in archives[:-self.keep_files]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._raw.close()
+            self._file = self._raw = None
+
+    def write(self, headers, body: bytes, ts: float | None = None):
+        record = {
+            "ts": ts if ts is not None else time.time(),
+            "headers": {k: headers[k] for k in CAPTURED_HEADERS if k in headers},
+            "body_b64": base64.b64encode(body).decode("ascii"),
+        }
+        line = json.dumps(record, separators=(",", ":")).encode() + b"\n"
+
+        with self._lock:
+            if self._file is None:
+                self._open()
+            self._file.write(line)
+            self._file.flush()  # sync-flush: a crash loses at most the current line
+            if self._raw.tell() >= self.max_bytes:
+                self._close()
+        metrics.inc("webhook_captured_total")
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+_writer = None
+
+
+def capture_delivery(headers, body: bytes):
+    """Record one delivery if WEBHOOK_CAPTURE_DIR is set (errors are only logged)."""
+    global _writer
+    if not WEBHOOK_CAPTURE_DIR:
+        return
+    try:
+        if _writer is None:
+            _writer = CaptureWriter(WEBHOOK_CAPTURE_DIR)
+        _writer.write({k.lower(): v for k, v in headers.items()}, body)
+    except Exception as e:
+        log(f"⚠️ Webhook capture failed: {e}")
+
+
+def read_capture(paths):
+    """Yield captured deliveries (ts, headers, raw body) from archives, oldest file first."""
+    for path in sorted(paths):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn last line of an archive cut off by a crash
+                yield record["ts"], record["headers"], base64.b64decode(record["body_b64"])
@@ -0,0 +1,103 @@
+# services/webhook_intake.py
+
+import hashlib
+import hmac
+import json
+import os
+import re
+from dataclasses import dataclass
+from functools import cached_property
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # optional speed-up; stdlib json works the same on bytes
+    _json_loads = json.loads
+
+# Local development only: accept webhooks without a signature while
+# GITHUB_WEBHOOK_SECRET is unset (otherwise every delivery is rejected)
+ALLOW_UNSIGNED_WEBHOOKS = os.getenv("ALLOW_UNSIGNED_WEBHOOKS", "0") == "1"
+
+# Events we act on – everything else is answered without touching the body
+RELEVANT_EVENTS = {"installation", "installation_repositories", "pull_request"}
+PR_REVIEW_ACTIONS = {"opened", "synchronize", "reopened"}
+
+# GitHub serialises "action" as the first key; peeking at it lets us drop
+# ignored pull_request actions (labeled, closed, ...) without a full parse.
+_ACTION_PREFIX = re.compile(rb'^\s*\{\s*"action"\s*:\s*"([A-Za-z_]+)"')
+
+
+def verify_signature(
+    body: bytes, signature_header: str | None, secret: str | None, allow_unsigned: bool = False
+) -> bool:
+    """
+    Verify `X-Hub-Signature-256` over the raw request bytes.
+    Without a configured webhook secret every delivery fails, unless
+    `allow_unsigned` (ALLOW_UNSIGNED_WEBHOOKS) opts out of verification.
+    """
+    if not secret:
+        return allow_unsigned
+    if not signature_header or not signature_header.startswith("sha256="):
+        return False
+
+    expected = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature_header[len("sha256="):])
+
+
+class WebhookDelivery:
+    """One webhook delivery: raw body read once, JSON parsed only on demand."""
+
+    def __init__(self, event: str | None, body: bytes, delivery_id: str | None = None):
+        self.event = event
+        self.body = body
+        self.delivery_id = delivery_id
+
+    @property
+    def is_relevant(self) -> bool:
+        return self.event in RELEVANT_EVENTS
+
+    def peek_action(self) -> str | None:
+        """Cheap `action` lookup from the body prefix (None if not found there)."""
+        match = _ACTION_PREFIX.match(self.body[:128])
+        if match:
+            return match.group(1).decode("ascii")
+        return None
+
+    @cached_property
+    def payload(self) -> dict:
+        """Full JSON payload (raises ValueError on invalid JSON)."""
+        return _json_loads(self.body)
+
+
+@dataclass
+class PullRequestEvent:
+    """The handful of `pull_request` payload fields the review pipeline needs."""
+
+    action: str
+    installation_id: int
+    repo_full_name: str
+    pr_number: int
+    head_ref: str
+    base_ref: str
+    head_sha: str | None = None
+    base_sha: str | None = None
+    additions: int = 0
+    deletions: int = 0
+    changed_files: int = 0
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "PullRequestEvent":
+        pr = payload["pull_request"]
+        return cls(
+            action=payload.get("action"),
+            installation_id=payload["installation"]["id"],
+            repo_full_name=payload["repository"]["full_name"],
+            pr_number=pr["number"],
+            head_ref=pr["head"]["ref"],
+            base_ref=pr["base"]["ref"],
+            head_sha=pr["head"].get("sha"),
+            base_sha=pr["base"].get("sha"),
+            additions=pr.get("additions") or 0,
+            deletions=pr.get("deletions") or 0,
+            changed_files=pr.get("changed_files") or 0,
+        )
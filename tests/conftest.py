@@ -1,6 +1,22 @@
 import pytest
-from database import SessionLocal
-from models import Plan, User, Installation, Repository
+from sqlalchemy import text
+
+from crud.review_log_partition_crud import list_partitions
+from database import Base, SessionLocal, engine
+from models import (
+    BackfillCheckpoint,
+    Plan,
+    User,
+    Installation,
+    Repository,
+    PRReviewLog,
+    ReviewJob,
+    RollupWatermark,
+    UsageRollupDaily,
+)
+
+# Tables are normally created on app startup; tests use the DB directly
+Base.metadata.create_all(bind=engine)
 
 
 @pytest.fixture(autouse=True)
@@ -8,6 +24,13 @@ def clean_db():
     db = SessionLocal()
 
     # Order matters because of FK constraints
+    db.query(BackfillCheckpoint).delete()
+    db.query(UsageRollupDaily).delete()
+    db.query(RollupWatermark).delete()
+    db.query(ReviewJob).delete()
+    db.query(PRReviewLog).delete()
+    for name in list_partitions(db):
+        db.execute(text(f'DROP TABLE "{name}"'))
     db.query(Repository).delete()
     db.query(Installation).delete()
     db.query(User).delete()
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+from crud.job_crud import claim_jobs, complete_job, enqueue_job, get_queue_stats
+from database import SessionLocal
+from services.admission import PRESSURE_HARD, PRESSURE_NORMAL, PRESSURE_SOFT, RateMeter, decide
+
+
+def _pressure(level, backlog, drain):
+    return {"level": level, "backlog": backlog, "throughput_per_minute": 1, "estimated_drain_seconds": drain}
+
+
+def test_decide_by_pressure_level():
+    normal = _pressure(PRESSURE_NORMAL, 3, 30)
+    soft = _pressure(PRESSURE_SOFT, 80, 900)
+    hard = _pressure(PRESSURE_HARD, 250, 5000)
+
+    assert decide(2, normal).action == "accept"
+
+    # Soft: small PRs keep flowing, larger ones wait for the backlog to drain
+    assert decide(0, soft).action == "accept"
+    deferred = decide(1, soft)
+    assert deferred.action == "defer" and deferred.retry_after == 900
+
+    # Hard: retry hint = time to drain back under the soft threshold
+    assert decide(0, hard).action == "defer"
+    rejected = decide(2, hard)
+    assert rejected.action == "reject"
+    assert rejected.retry_after == int((250 - 50) * 5000 / 250)
+
+
+def test_rate_meter_and_queue_stats():
+    meter = RateMeter(window=60)
+    for _ in range(6):
+        meter.mark()
+    assert 0.09 < meter.rate() <= 0.1
+
+    db = SessionLocal()
+    for i in range(3):
+        enqueue_job(db, {"pr": i}, dedupe_key=f"stats-{i}")
+    job = claim_jobs(db, "w", now=datetime.utcnow() + timedelta(seconds=1))[0]
+    complete_job(db, job.id, "w")
+
+    assert get_queue_stats(db) == (2, 1)
+
+
+def test_deferred_inline_reviews_count_as_backlog(monkeypatch):
+    from services import admission, review_worker
+
+    monkeypatch.setattr(review_worker, "REVIEW_QUEUE_MODE", "inline")
+    before = admission.current_pressure()["backlog"]
+
+    # STEP 1 — A deferred review counts while it waits out its delay, not after
+    with admission.deferred_wait():
+        assert admission.current_pressure()["backlog"] == before + 1
+    assert admission.current_pressure()["backlog"] == before
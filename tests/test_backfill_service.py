@@ -0,0 +1,101 @@
+from datetime import timedelta
+
+import pytest
+
+from database import SessionLocal
+from crud.installation_crud import create_installation
+from crud.repo_crud import add_repository
+from crud.review_log_crud import create_review_log
+from models import PRReviewStatus, ReviewJob, ReviewJobStatus, User
+from services.backfill_service import BackfillBusy, backfill_status, begin_backfill, continue_backfill
+from services.github_service import PullsPage, open_pulls_url
+
+
+def _pr(number, sha):
+    return {"number": number, "head": {"ref": f"feature-{number}", "sha": sha}, "base": {"ref": "main", "sha": "base"}}
+
+
+class FakeGitHub:
+    """Open PR pages by URL; answers 304 to a matching ETag, can fail once per URL."""
+
+    def __init__(self, pages, fail_once=()):
+        self.pages = pages
+        self.fail_once = set(fail_once)
+        self.calls = []
+
+    def __call__(self, token, url, etag=None):
+        self.calls.append((url, etag))
+        if url in self.fail_once:
+            self.fail_once.discard(url)
+            raise RuntimeError("GitHub hiccup")
+        items, next_url = self.pages[url]
+        page_etag = f'W/"{url}"'
+        if etag == page_etag:
+            return PullsPage(True, [], None, etag)
+        return PullsPage(False, items, next_url, page_etag)
+
+
+def test_backfill_resumes_skips_reviewed_and_throttles():
+    db = SessionLocal()
+    user = User(github_user_id=3131, github_username="noor")
+    db.add(user)
+    db.commit()
+    inst = create_installation(db, installation_id=77, account_login="noor-org", account_type="Organization", user_id=user.id)
+    add_repository(db, inst.id, "noor-org/api")
+    add_repository(db, inst.id, "noor-org/web")
+    create_review_log(
+        db, user_id=user.id, installation_id=inst.id, repo_full_name="noor-org/api", pr_number=1,
+        status=PRReviewStatus.SUCCESS, head_sha="aaa",
+    )
+
+    api, web = open_pulls_url("noor-org/api"), open_pulls_url("noor-org/web")
+    github = FakeGitHub(
+        {
+            api: ([_pr(1, "aaa"), _pr(2, "bbb")], api + "&page=2"),
+            api + "&page=2": ([_pr(3, "ccc")], None),
+            web: ([_pr(9, "ddd")], None),
+        },
+        fail_once=[web],
+    )
+    run = lambda: continue_backfill(77, fetch_page=github, get_token=lambda _: "token")  # noqa: E731
+
+    # STEP 1 — Interrupted in the second repo: failed, api repo checkpointed
+    begin_backfill(77)
+    with pytest.raises(BackfillBusy):
+        begin_backfill(77)
+    with pytest.raises(RuntimeError):
+        run()
+    state = backfill_status(77)
+    assert state["status"] == "failed" and state["current_repo"] == "noor-org/web"
+    assert (state["listed"], state["skipped"], state["enqueued"]) == (3, 1, 2)
+
+    # STEP 2 — Resume continues from the checkpoint, not from the start
+    begin_backfill(77)
+    state = run()
+    assert state["status"] == "done"
+    assert (state["listed"], state["skipped"], state["enqueued"]) == (4, 1, 3)
+    assert [url for url, _ in github.calls].count(api) == 1
+
+    # STEP 3 — Queued reviews (already reviewed head SHA skipped), spaced out for the rate limit
+    jobs = db.query(ReviewJob).order_by(ReviewJob.run_after).all()
+    assert [(j.payload["pr_number"], j.payload["head_sha"]) for j in jobs] == [(2, "bbb"), (3, "ccc"), (9, "ddd")]
+    assert jobs[1].run_after - jobs[0].run_after >= timedelta(seconds=5)
+
+    # STEP 4 — A new pass sends conditional requests; unchanged pages queue nothing new
+    begin_backfill(77)
+    state = run()
+    assert (state["listed"], state["skipped"], state["enqueued"]) == (4, 4, 0)
+    assert all(etag for _, etag in github.calls[-3:])
+    assert db.query(ReviewJob).count() == 3
+
+    # STEP 5 — A review that failed is queued again even though its page answers 304
+    failed = jobs[0]  # PR #2, parked after its last attempt (frees the dedupe key)
+    failed.status, failed.dedupe_key = ReviewJobStatus.FAILED, None
+    db.commit()
+    begin_backfill(77)
+    state = run()
+    assert (state["listed"], state["skipped"], state["enqueued"]) == (4, 3, 1)
+    assert all(etag for _, etag in github.calls[-3:])
+    requeued = db.query(ReviewJob).filter(ReviewJob.status == ReviewJobStatus.QUEUED).all()
+    assert sorted(j.payload["pr_number"] for j in requeued) == [2, 3, 9]
+    db.close()
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import re
+
+from services.batch_review import TinyReviewBatcher
+from utils.resilience import get_breaker
+from utils.token_usage import TokenUsage
+
+
+def _answering(calls, skip=()):
+    """Model stand-in: answers every <pr id=...> in the prompt except `skip`ped PR numbers."""
+
+    async def complete(system, prompt, model=None, usage=None):
+        calls.append(prompt)
+        ids = re.findall(r'<pr id="([^"]+)">', prompt)
+        reviews = [
+            {"id": i, "summary": f"review of {i}", "strengths": [], "issues": [], "recommendations": []}
+            for i in ids
+            if not any(i.startswith(f"pr{n}-") for n in skip)
+        ]
+        return json.dumps({"reviews": reviews})
+
+    return complete
+
+
+def test_tiny_prs_share_one_call_and_fan_out():
+    calls = []
+    batcher = TinyReviewBatcher(_answering(calls, skip=(3,)), window_ms=20, max_tokens=1000, max_items=10)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.review(f"+ bump dep {n}", n) for n in (1, 2, 3)))
+
+    first, second, skipped = asyncio.run(scenario())
+
+    # STEP 1: one model call for all three PRs
+    assert len(calls) == 1
+    # STEP 2: each PR gets its own review back; the one the model skipped gets None
+    assert json.loads(first)["summary"].startswith("review of pr1-")
+    assert json.loads(second)["summary"].startswith("review of pr2-")
+    assert skipped is None
+
+
+def test_token_budget_splits_batches():
+    calls = []
+    # Each diff is ~26 tokens: two fit the budget, the third starts a new batch
+    batcher = TinyReviewBatcher(_answering(calls), window_ms=20, max_tokens=60, max_items=10)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.review("+" + "x" * 100, n) for n in (1, 2, 3)))
+
+    results = asyncio.run(scenario())
+    assert all(results)
+    assert len(calls) == 2
+
+
+def test_installations_never_share_a_batch():
+    calls = []
+    batcher = TinyReviewBatcher(_answering(calls), window_ms=20, max_tokens=1000, max_items=10)
+
+    async def scenario():
+        return await asyncio.gather(
+            batcher.review("+ bump dep a", 1, installation_id=101),
+            batcher.review("+ bump dep b", 2, installation_id=202),
+            batcher.review("+ bump dep c", 3, installation_id=101),
+        )
+
+    results = asyncio.run(scenario())
+
+    # STEP 1: one call per installation, each prompt holding only that installation's diffs
+    assert all(results)
+    assert len(calls) == 2
+    assert any("bump dep a" in p and "bump dep c" in p and "bump dep b" not in p for p in calls)
+    assert any("bump dep b" in p and "bump dep a" not in p for p in calls)
+
+
+def test_failed_batch_counts_once_and_falls_back():
+    calls = []
+
+    async def down(system, prompt, model=None, usage=None):
+        calls.append(prompt)
+        raise ConnectionError("provider down")
+
+    batcher = TinyReviewBatcher(down, window_ms=20, max_tokens=1000, max_items=10)
+    breaker = get_breaker("llm:test/tiny-batch-down")
+
+    async def scenario():
+        return await asyncio.gather(
+            *(batcher.review(f"+ bump dep {n}", n, model="test/tiny-batch-down") for n in (1, 2, 3))
+        )
+
+    results = asyncio.run(scenario())
+
+    # STEP 1: every PR is told to review alone
+    assert results == [None, None, None]
+    # STEP 2: the breaker saw one failure per batch attempt, not one per PR in it
+    assert calls and breaker.failures == len(calls)
+
+
+def test_batch_tokens_are_shared_out_per_pr():
+    async def complete(system, prompt, model=None, usage=None):
+        usage.add(10)
+        return await _answering([])(system, prompt)
+
+    batcher = TinyReviewBatcher(complete, window_ms=20, max_tokens=1000, max_items=10)
+    usages = [TokenUsage() for _ in range(3)]
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.review(f"+ bump {n}", n, usage=usages[n]) for n in range(3)))
+
+    asyncio.run(scenario())
+
+    # STEP 1 — One call's 10 tokens, split over its three PRs
+    assert sorted(u.total for u in usages) == [3, 3, 4]
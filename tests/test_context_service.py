@@ -0,0 +1,102 @@
+from services import context_service
+from services.context_service import BlobCache, build_file_context, enclosing_scope, git_blob_sha, load_blob
+
+OLD_SRC = """import os
+
+
+class Loader:
+    def load(self, path):
+        data = read(path)
+        return data
+
+    def save(self, path, data):
+        write(path, data)
+
+
+def helper():
+    return 1
+"""
+
+NEW_SRC = OLD_SRC.replace("        return data\n", "        value = eval(data)\n        return value\n")
+
+DIFF = """diff --git a/app/loader.py b/app/loader.py
+index 1..2 100644
+--- a/app/loader.py
++++ b/app/loader.py
+@@ -6,2 +6,3 @@ class Loader:
+         data = read(path)
+-        return data
++        value = eval(data)
++        return value
+"""
+
+
+class FakeSource:
+    def __init__(self, sizes=None):
+        self.blobs = {git_blob_sha(NEW_SRC.encode()): NEW_SRC.encode()}
+        self.sizes = sizes or {}
+        self.fetched = []
+
+    def changed_files(self):
+        return {"app/loader.py": ("modified", git_blob_sha(NEW_SRC.encode()), "app/loader.py")}
+
+    def base_blob_sha(self, path):
+        return None
+
+    def blob_size(self, sha):
+        return self.sizes.get(sha)
+
+    def fetch_blob(self, sha):
+        self.fetched.append(sha)
+        return self.blobs.get(sha)
+
+
+def test_enclosing_scope_python_and_braces():
+    lines = NEW_SRC.splitlines()
+    assert enclosing_scope(lines, 7, 8) == (5, 8)
+
+    js = ["function a() {", "  let x = 1;", "  if (x) {", "    x++;", "  }", "  return x;", "}", "", "const y = 2;"]
+    assert enclosing_scope(js, 4, 4, indent_scoped=False) == (1, 7)
+
+
+def test_build_file_context_uses_blob_cache(tmp_path):
+    cache = BlobCache(directory=str(tmp_path), max_disk_bytes=10_000, max_memory_bytes=10_000)
+    source = FakeSource()
+
+    # STEP 1: first review fetches the new blob once and extracts the method
+    context = build_file_context(source, DIFF, cache=cache)
+    assert "### app/loader.py (lines 5-8)" in context
+    assert "def load(self, path):" in context and "def helper" not in context
+    assert len(source.fetched) == 1
+
+    # STEP 2: a fresh process (empty memory tier) is served from disk
+    cold = BlobCache(directory=str(tmp_path), max_disk_bytes=10_000, max_memory_bytes=10_000)
+    assert build_file_context(source, DIFF, cache=cold) == context
+    assert len(source.fetched) == 1
+
+
+def test_blob_cache_evicts_by_size(tmp_path):
+    cache = BlobCache(directory=str(tmp_path), max_disk_bytes=250, max_memory_bytes=0)
+    blobs = [bytes([65 + i]) * 100 for i in range(3)]
+    for blob in blobs:
+        cache.put(git_blob_sha(blob), blob)
+
+    assert cache.get(git_blob_sha(blobs[0])) is None
+    assert cache.get(git_blob_sha(blobs[2])) == blobs[2]
+
+
+def test_oversized_blobs_are_not_fetched_or_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(context_service, "CONTEXT_MAX_FILE_BYTES", 100)
+    cache = BlobCache(directory=str(tmp_path), max_disk_bytes=10_000, max_memory_bytes=10_000)
+    sha = git_blob_sha(NEW_SRC.encode())
+
+    # STEP 1: size known from the listing -> skipped without a download
+    source = FakeSource(sizes={sha: len(NEW_SRC)})
+    assert load_blob(source, sha, cache) is None
+    assert source.fetched == []
+
+    # STEP 2: size unknown -> fetched once to find out, but never cached
+    source = FakeSource()
+    assert load_blob(source, sha, cache) is None
+    assert source.fetched == [sha]
+    assert cache.get(sha) is None
@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+import pytest
+
+from utils.deadline import Deadline, DeadlineExceeded
+
+
+def test_stage_is_cancelled_when_budget_runs_out():
+    cancelled = []
+
+    async def hung_llm():
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def scenario():
+        deadline = Deadline.after(0.2)
+        # STEP 1: a stage that fits its budget returns normally
+        assert await deadline.run("token", asyncio.sleep(0, result="tok")) == "tok"
+        # STEP 2: a hung stage is cancelled and reported under its own name
+        with pytest.raises(DeadlineExceeded) as exc:
+            await deadline.run("ai_review", hung_llm())
+        assert exc.value.stage == "ai_review"
+
+    started = time.monotonic()
+    asyncio.run(scenario())
+    assert cancelled and time.monotonic() - started < 5
+
+
+def test_reserve_and_exhausted_budget():
+    deadline = Deadline.after(10)
+    assert 9 < deadline.timeout("comment") <= 10
+    assert deadline.timeout("diff", cap=3) == 3
+    # The LLM stage may not eat into the time held back for the comment
+    with pytest.raises(DeadlineExceeded):
+        deadline.timeout("ai_review", reserve=11)
+
+    # Nothing left: later stages fail at once, passing remaining budget as timeout
+    async def scenario():
+        spent = Deadline.after(0)
+        with pytest.raises(DeadlineExceeded) as exc:
+            await spent.to_thread("comment", lambda **kw: kw)
+        assert exc.value.stage == "comment"
+        assert (await Deadline.after(5).to_thread("diff", lambda **kw: kw))["timeout"] <= 5
+
+    asyncio.run(scenario())
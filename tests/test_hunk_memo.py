@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+from services.hunk_memo import HunkMemo, memo_scope, parse_diff, review_with_memo
+import services.hunk_memo as hunk_memo
+
+DIFF_MAIN = """diff --git a/app/util.py b/app/util.py
+index 111..222 100644
+--- a/app/util.py
++++ b/app/util.py
+@@ -10,3 +10,4 @@ def load(path):
+     data = read(path)
+-    return data
++    value = eval(data)
++    return value
+@@ -40,2 +41,3 @@ def save(path, data):
+     write(path, data)
++    log("saved")
+"""
+
+# Same change backported: different line numbers, whitespace and vendored path,
+# plus one new hunk
+DIFF_BACKPORT = """diff --git a/vendor/util.py b/vendor/util.py
+index 333..444 100644
+--- a/vendor/util.py
++++ b/vendor/util.py
+@@ -3,3 +3,4 @@ def load(path):
+     data = read(path)
+-    return data
++    value =  eval(data)
++    return value
+@@ -80,2 +81,3 @@ def extra():
+     pass
++    os.system(cmd)
+"""
+
+
+def test_parse_diff_keys_ignore_line_numbers_and_whitespace():
+    main_hunks = parse_diff(DIFF_MAIN)[0].hunks
+    backport_hunks = parse_diff(DIFF_BACKPORT)[0].hunks
+
+    assert len(main_hunks) == 2
+    assert main_hunks[0].key == backport_hunks[0].key
+    assert main_hunks[1].key != backport_hunks[1].key
+
+
+def test_review_with_memo_sends_only_unseen_hunks(monkeypatch):
+    monkeypatch.setattr(hunk_memo, "_memo", HunkMemo(max_entries=100, ttl_seconds=60))
+    sent = []
+
+    async def review_fn(diff):
+        sent.append(diff)
+        issues = []
+        if "eval(data)" in diff:
+            issues.append({"file": "app/util.py", "code": "value = eval(data)", "severity": "high", "issue": "eval"})
+        if "os.system" in diff:
+            issues.append({"file": "vendor/util.py", "code": "os.system(cmd)", "severity": "high", "issue": "shell"})
+        return json.dumps({"summary": "s", "strengths": [], "issues": issues, "recommendations": []})
+
+    # STEP 1: first PR goes to the model in full and populates the memo
+    asyncio.run(review_with_memo(DIFF_MAIN, review_fn, "installation:1"))
+    assert len(hunk_memo.get_hunk_memo()) == 2
+
+    # STEP 2: the backport only sends the new hunk; the eval finding is reused
+    result = json.loads(asyncio.run(review_with_memo(DIFF_BACKPORT, review_fn, "installation:1")))
+    assert "os.system" in sent[1] and "eval(data)" not in sent[1]
+    assert {(i["file"], i["issue"]) for i in result["issues"]} == {
+        ("vendor/util.py", "eval"),
+        ("vendor/util.py", "shell"),
+    }
+
+    # STEP 3: a fully seen diff never reaches the model
+    asyncio.run(review_with_memo(DIFF_MAIN, review_fn, "installation:1"))
+    assert len(sent) == 2
+
+    # STEP 4: another installation does not see this scope's findings
+    asyncio.run(review_with_memo(DIFF_MAIN, review_fn, "installation:2"))
+    assert len(sent) == 3
+
+
+def test_hunk_memo_evicts_lru_and_expired():
+    memo = HunkMemo(max_entries=2, ttl_seconds=60)
+    memo.put("s", "a", [])
+    memo.put("s", "b", [])
+    memo.get("s", "a")
+    memo.put("s", "c", [])
+    assert memo.get("s", "b") is None
+    assert memo.get("s", "a") == []
+
+    expired = HunkMemo(max_entries=2, ttl_seconds=0)
+    expired.put("s", "a", [])
+    assert expired.get("s", "a") is None
+
+
+def test_memo_scope_separates_reviewers():
+    base = memo_scope(1)
+    # STEP 1: another model, backend or specialist set never reuses these findings
+    assert memo_scope(1, model="small/model") != base
+    assert memo_scope(1, backend="local") != base
+    assert memo_scope(1, dimensions=["security"]) != base
+    # STEP 2: the specialist order doesn't matter
+    assert memo_scope(1, dimensions=["style", "security"]) == memo_scope(1, dimensions=["security", "style"])
+
+
+def test_metrics_endpoint_renders_memo_gauges():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    response = TestClient(main.app).get("/metrics")
+
+    assert response.status_code == 200
+    assert "hunk_memo_entries" in response.text
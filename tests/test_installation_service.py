@@ -0,0 +1,55 @@
+from database import SessionLocal
+from services.installation_service import handle_installation_event
+from models import User, Plan, Installation, Repository
+
+
+def _payload(action, repos, sender_id=444):
+    return {
+        "action": action,
+        "installation": {"id": 5555, "account": {"login": "acme", "type": "Organization"}},
+        "repositories": [{"full_name": f"acme/repo-{i}"} for i in range(repos)],
+        "sender": {"id": sender_id},
+    }
+
+
+def test_bulk_installation_ingestion():
+    db = SessionLocal()
+
+    # STEP 1 — Seed plan + the installing user
+    plan = Plan(name="Free", slug="free", monthly_pr_limit=5)
+    db.add(plan)
+    db.commit()
+    user = User(github_user_id=444, github_username="acme-admin", plan_id=plan.id)
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+
+    # STEP 2 — Org install with thousands of repos (one transaction)
+    result = handle_installation_event(db, "installation", _payload("created", 2500))
+    assert result["repositories"] == 2500
+
+    inst = db.query(Installation).filter(Installation.installation_id == 5555).one()
+    assert inst.user_id == user.id
+    assert db.query(Repository).filter(Repository.installation_id == inst.id).count() == 2500
+
+    # STEP 3 — Redelivery is idempotent and never unlinks the user
+    handle_installation_event(db, "installation", _payload("created", 2500, sender_id=999))
+    db.expire_all()
+    assert db.query(Repository).count() == 2500
+    assert db.get(Installation, inst.id).user_id == user.id
+
+    # STEP 4 — installation_repositories add / remove
+    result = handle_installation_event(db, "installation_repositories", {
+        "action": "removed",
+        "installation": {"id": 5555, "account": {"login": "acme", "type": "Organization"}},
+        "repositories_added": [{"full_name": "acme/new-repo"}],
+        "repositories_removed": [{"full_name": "acme/repo-0"}, {"full_name": "acme/repo-1"}],
+    })
+    assert result["added"] == 1 and result["removed"] == 2
+    assert db.query(Repository).filter(Repository.is_active.is_(False)).count() == 2
+
+    # STEP 5 — installation.deleted removes installation + repos
+    result = handle_installation_event(db, "installation", _payload("deleted", 0))
+    assert result["status"] == "installation_deleted"
+    assert db.query(Installation).count() == 0
+    assert db.query(Repository).count() == 0
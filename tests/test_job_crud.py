@@ -0,0 +1,128 @@
+import threading
+from datetime import datetime, timedelta
+
+from database import SessionLocal
+from crud.job_crud import claim_jobs, complete_job, enqueue_job, fail_job, heartbeat_job, postpone_job
+from models import ReviewJob, ReviewJobStatus
+
+
+def test_job_leasing():
+    db = SessionLocal()
+
+    # STEP 1 — Enqueue (dedupe_key makes redeliveries a no-op)
+    first = enqueue_job(db, {"pr": 1}, dedupe_key="pr:acme/app#1@abc")
+    assert first is not None
+    assert enqueue_job(db, {"pr": 1}, dedupe_key="pr:acme/app#1@abc") is None
+    second = enqueue_job(db, {"pr": 2}, dedupe_key="pr:acme/app#2@def")
+
+    # STEP 2 — Two workers claim disjoint jobs
+    now = datetime.utcnow()
+    a = claim_jobs(db, "worker-a", limit=1, visibility_timeout=30, now=now)
+    b = claim_jobs(db, "worker-b", limit=5, visibility_timeout=30, now=now)
+    assert [j.id for j in a] == [first]
+    assert [j.id for j in b] == [second]
+    assert claim_jobs(db, "worker-c", limit=5, now=now) == []
+
+    # STEP 3 — Heartbeat only works for the lease owner
+    assert heartbeat_job(db, first, "worker-a", visibility_timeout=600)
+    assert not heartbeat_job(db, first, "worker-b")
+
+    # STEP 4 — worker-b "crashes"; its job is reclaimed after the lease expires
+    reclaimed = claim_jobs(db, "worker-c", limit=5, now=now + timedelta(seconds=120))
+    assert [j.id for j in reclaimed] == [second]
+    assert reclaimed[0].attempts == 2
+    assert not complete_job(db, second, "worker-b")  # stale owner can't complete
+
+    # STEP 5 — Failure re-queues with a delay, success marks DONE
+    assert fail_job(db, second, "worker-c", "boom", retry_delay=0)
+    assert complete_job(db, first, "worker-a")
+
+    db.expire_all()
+    assert db.get(ReviewJob, first).status == ReviewJobStatus.DONE
+    # A finished job gives its dedupe key up (e.g. the PR is reopened at the same head)
+    assert enqueue_job(db, {"pr": 1}, dedupe_key="pr:acme/app#1@abc") is not None
+    retried = db.get(ReviewJob, second)
+    assert retried.status == ReviewJobStatus.QUEUED
+    assert retried.last_error == "boom"
+
+    # STEP 6 — Out of attempts → parked as FAILED
+    retried.max_attempts = 3
+    db.commit()
+    job = claim_jobs(db, "worker-c", now=datetime.utcnow() + timedelta(seconds=1))[0]
+    assert job.attempts == 3
+    fail_job(db, job.id, "worker-c", "boom again")
+    db.expire_all()
+    assert db.get(ReviewJob, second).status == ReviewJobStatus.FAILED
+
+
+def test_claim_jobs_is_fair_and_capped():
+    db = SessionLocal()
+    now = datetime.utcnow()
+
+    # STEP 1 — Tenant 1 floods the queue first; tenant 2 adds one small PR later
+    flood = [
+        enqueue_job(db, {"pr": i}, dedupe_key=f"flood-{i}", installation_id=1, priority=1,
+                    sched_key=now - timedelta(seconds=100 - i))
+        for i in range(5)
+    ]
+    small = enqueue_job(db, {"pr": 99}, dedupe_key="small", installation_id=2, priority=0, sched_key=now)
+    now = datetime.utcnow()
+
+    # STEP 2 — Round-robin: each tenant's next job before anyone's second
+    first = claim_jobs(db, "w", limit=2, now=now, per_tenant_cap=2)
+    assert {j.id for j in first} == {flood[0], small}
+
+    # STEP 3 — Cap: tenant 1 already holds one lease, so only one more now
+    second = claim_jobs(db, "w", limit=5, now=now, per_tenant_cap=2)
+    assert [j.id for j in second] == [flood[1]]
+    assert claim_jobs(db, "w", limit=5, now=now, per_tenant_cap=2) == []
+
+
+def test_concurrent_claims_respect_tenant_cap():
+    db = SessionLocal()
+    now = datetime.utcnow()
+
+    # STEP 1 — One tenant with a backlog, cap of 2 leases
+    for i in range(6):
+        enqueue_job(db, {"pr": i}, dedupe_key=f"busy-{i}", installation_id=7, sched_key=now - timedelta(seconds=10 - i))
+    db.close()
+
+    # STEP 2 — Two workers claim at the same moment
+    start = threading.Barrier(2)
+    claimed = {}
+
+    def worker(name):
+        session = SessionLocal()
+        try:
+            start.wait()
+            claimed[name] = [j.id for j in claim_jobs(session, name, limit=5, now=datetime.utcnow(), per_tenant_cap=2)]
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=worker, args=(name,)) for name in ("w1", "w2")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # STEP 3 — Disjoint claims, and together never more than the cap
+    assert not set(claimed["w1"]) & set(claimed["w2"])
+    assert len(claimed["w1"]) + len(claimed["w2"]) == 2
+
+
+def test_postponed_jobs_keep_their_attempts():
+    db = SessionLocal()
+    job_id = enqueue_job(db, {"pr": 1}, dedupe_key="outage")
+    db.get(ReviewJob, job_id).max_attempts = 2
+    db.commit()
+
+    # STEP 1 — A long outage postpones the job over and over...
+    for _ in range(5):
+        job = claim_jobs(db, "w", now=datetime.utcnow() + timedelta(hours=1))[0]
+        assert postpone_job(db, job.id, "w", "circuit open", delay=0)
+
+    # STEP 2 — ...without using up its attempts
+    db.expire_all()
+    row = db.get(ReviewJob, job_id)
+    assert row.status == ReviewJobStatus.QUEUED and row.attempts == 0
+    assert row.last_error == "circuit open"
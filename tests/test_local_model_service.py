@@ -0,0 +1,79 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from services.local_model_service import LocalModelBackend
+
+
+class _StubOllama(BaseHTTPRequestHandler):
+    """Minimal /api/chat stand-in that records concurrency and client ports."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled connections are reused
+    lock = threading.Lock()
+    active = 0
+    max_active = 0
+    ports = set()
+    requests = 0
+
+    def do_POST(self):
+        cls = type(self)
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with cls.lock:
+            cls.active += 1
+            cls.requests += 1
+            cls.max_active = max(cls.max_active, cls.active)
+            cls.ports.add(self.client_address[1])
+        time.sleep(0.05)
+        with cls.lock:
+            cls.active -= 1
+
+        diff = body["messages"][-1]["content"]
+        answer = json.dumps({"summary": diff[-5:], "strengths": [], "issues": [], "recommendations": []})
+        payload = json.dumps({
+            "model": body["model"],
+            "created_at": "2026-01-01T00:00:00Z",
+            "message": {"role": "assistant", "content": answer},
+            "done": True,
+            "prompt_eval_count": 120,
+            "eval_count": 30,
+        }).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_local_backend_caps_parallel_requests_and_pools():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    backend = LocalModelBackend(
+        host=f"http://127.0.0.1:{server.server_address[1]}",
+        model="stub",
+        max_parallel=2,
+    )
+
+    async def scenario():
+        diffs = [f"diff-{i:05d}" for i in range(6)] + ["x" * 200 + "large"]
+        results = await asyncio.gather(*(backend.review(d) for d in diffs))
+        await backend.close()
+        return results
+
+    try:
+        results = asyncio.run(scenario())
+    finally:
+        server.shutdown()
+
+    # Each caller gets its own answer back
+    assert [json.loads(r)["summary"] for r in results] == [f"{i:05d}"[-5:] for i in range(6)] + ["large"]
+    assert _StubOllama.requests == 7
+    # Never more in flight than the server's parallel slots, over a small pool
+    assert _StubOllama.max_active <= 2
+    assert len(_StubOllama.ports) <= 2
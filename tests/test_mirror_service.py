@@ -0,0 +1,80 @@
+import os
+import subprocess
+
+from services.context_service import BlobCache, build_file_context
+from services.mirror_service import MirrorCache
+
+
+def _git(cwd, *args):
+    return subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+        cwd=cwd, check=True, capture_output=True, text=True,
+    ).stdout.strip()
+
+
+def _make_remote(tmp_path):
+    """Work repo with main + a PR head published as refs/pull/7/head."""
+    repo = tmp_path / "remote"
+    repo.mkdir()
+    _git(repo, "init", "-q", "-b", "main")
+    (repo / "app.py").write_text("def load(path):\n    data = read(path)\n    return data\n")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-qm", "base")
+    base_sha = _git(repo, "rev-parse", "HEAD")
+
+    _git(repo, "checkout", "-qb", "feature")
+    (repo / "app.py").write_text("def load(path):\n    data = read(path)\n    return eval(data)\n")
+    _git(repo, "commit", "-qam", "feature")
+    head_sha = _git(repo, "rev-parse", "HEAD")
+    _git(repo, "update-ref", "refs/pull/7/head", head_sha)
+    _git(repo, "checkout", "-q", "main")
+    return repo, base_sha, head_sha
+
+
+def test_mirror_diff_and_context_from_local_remote(tmp_path):
+    remote, base_sha, head_sha = _make_remote(tmp_path)
+    cache = MirrorCache(root=str(tmp_path / "mirrors"), max_bytes=10**9)
+
+    # STEP 1: first prepare creates the bare mirror and fetches only the PR refs
+    pr = cache.prepare_pull_request("acme/app", str(remote), 7, "main", base_sha=base_sha, head_sha=head_sha)
+    assert pr.merge_base == base_sha
+    diff = pr.diff()
+    assert "+    return eval(data)" in diff and "diff --git a/app.py b/app.py" in diff
+
+    # STEP 2: mirror doubles as a blob source for file context
+    status, new_sha, old_path = pr.changed_files()["app.py"]
+    assert status == "modified" and old_path == "app.py"
+    context = build_file_context(pr, diff, cache=BlobCache(directory=str(tmp_path / "blobs")))
+    assert "def load(path):" in context
+
+    # STEP 3: a second prepare is an incremental fetch into the same mirror
+    again = cache.prepare_pull_request("acme/app", str(remote), 7, "main")
+    assert again.git_dir == pr.git_dir and again.diff() == diff
+
+
+def test_mirror_cache_evicts_least_recently_used(tmp_path):
+    remote, _, _ = _make_remote(tmp_path)
+    cache = MirrorCache(root=str(tmp_path / "mirrors"), max_bytes=10**9)
+    first = cache.fetch("acme/one", str(remote), ["+refs/heads/main:refs/heads/main"])
+    os.utime(os.path.join(first, "last_used"), (1, 1))
+    second = cache.fetch("acme/two", str(remote), ["+refs/heads/main:refs/heads/main"])
+
+    cache.max_bytes = 1
+    assert cache.evict(keep=second) == [first]
+    assert not os.path.exists(first) and os.path.exists(second)
+
+
+def test_open_pull_request_keeps_its_mirror_from_eviction(tmp_path):
+    remote, base_sha, head_sha = _make_remote(tmp_path)
+    cache = MirrorCache(root=str(tmp_path / "mirrors"), max_bytes=10**9)
+    pr = cache.prepare_pull_request("acme/app", str(remote), 7, "main", base_sha=base_sha, head_sha=head_sha)
+    other = cache.fetch("acme/two", str(remote), ["+refs/heads/main:refs/heads/main"])
+
+    # STEP 1: over quota, the mirror a review is still reading is skipped
+    cache.max_bytes = 1
+    assert cache.evict(keep=other) == []
+    assert "+    return eval(data)" in pr.diff()
+
+    # STEP 2: once the review closes it, it can go
+    pr.close()
+    assert cache.evict(keep=other) == [pr.git_dir]
@@ -0,0 +1,14 @@
+from services.oauth_service import primary_email
+
+
+def test_primary_email_prefers_primary_verified():
+    emails = [
+        {"email": "old@example.com", "verified": True, "primary": False},
+        {"email": "unverified@example.com", "verified": False, "primary": True},
+        {"email": "main@example.com", "verified": True, "primary": True},
+    ]
+    assert primary_email(emails) == "main@example.com"
+    assert primary_email(emails[:2]) == "old@example.com"
+    # No usable address (or no email scope): fall back to the public profile email
+    assert primary_email(emails[1:2], "profile@example.com") == "profile@example.com"
+    assert primary_email(None) is None
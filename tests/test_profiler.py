@@ -0,0 +1,45 @@
+import asyncio
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from utils import profiler
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_profiling_middleware_writes_collapsed_stacks(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, "PROFILE_DIR", str(tmp_path))
+
+    app = FastAPI()
+    app.add_middleware(profiler.ProfilingMiddleware, sample_rate=0, secret="s3cret")
+
+    @app.get("/slow")
+    async def slow():
+        _busy(0.05)                               # on the event loop
+        await asyncio.to_thread(_busy, 0.05)      # background thread work
+        return {"ok": True}
+
+    with TestClient(app) as client:
+        # STEP 1 — Not sampled and no token → nothing recorded
+        client.get("/slow")
+        assert profiler.list_profiles() == []
+
+        # STEP 2 — A forged token is ignored, a signed one triggers a profile
+        client.get("/slow", headers={"X-Profile-Token": "1.deadbeef"})
+        assert profiler.list_profiles() == []
+        client.get("/slow", headers={"X-Profile-Token": profiler.make_profile_token("s3cret")})
+
+    [entry] = profiler.list_profiles()
+    assert entry["method"] == "GET" and entry["path"] == "slow" and entry["duration_ms"] >= 100
+
+    folded = profiler.read_profile(entry["name"])
+    stacks = [line.rsplit(" ", 1)[0] for line in folded.splitlines()]
+    assert any(s.startswith("loop;") and "_busy (test_profiler.py" in s for s in stacks)
+    assert any(s.startswith("thread:") and "_busy (test_profiler.py" in s for s in stacks)
+    assert profiler.read_profile("../" + entry["name"]) is None
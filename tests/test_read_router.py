@@ -0,0 +1,76 @@
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from database import ReadRouter
+
+
+def _sessions(path):
+    return sessionmaker(bind=create_engine(f"sqlite:///{path}"))
+
+
+def _marker(db):
+    return db.execute(text("SELECT name FROM marker")).scalar()
+
+
+def test_reads_go_to_replica_with_read_your_writes(tmp_path):
+    primary, replica = _sessions(tmp_path / "primary.db"), _sessions(tmp_path / "replica.db")
+    for factory, name in ((primary, "primary"), (replica, "replica")):
+        with factory() as db:
+            db.execute(text("CREATE TABLE marker (name TEXT)"))
+            db.execute(text("INSERT INTO marker VALUES (:name)"), {"name": name})
+            db.commit()
+
+    router = ReadRouter(primary, replica, sticky_seconds=60)
+
+    # STEP 1 — Reads land on the replica
+    db, on_replica = router.session(sticky_key=7)
+    assert on_replica and _marker(db) == "replica"
+    db.close()
+
+    # STEP 2 — After user 7 writes, their reads stick to the primary; others don't
+    router.mark_write(7)
+    db, on_replica = router.session(sticky_key=7)
+    assert not on_replica and _marker(db) == "primary"
+    db.close()
+    db, on_replica = router.session(sticky_key=8)
+    assert on_replica
+    db.close()
+
+
+def test_unhealthy_replica_falls_back_to_primary(tmp_path):
+    primary = _sessions(tmp_path / "primary.db")
+    missing = _sessions(tmp_path / "no-such-dir" / "replica.db")
+    router = ReadRouter(primary, missing, check_seconds=0, retry_seconds=60)
+
+    # STEP 1 — The probe fails: primary, and the replica isn't retried yet
+    db, on_replica = router.session()
+    assert not on_replica
+    db.close()
+    assert not router.replica_healthy()
+
+    # STEP 2 — No replica configured at all: always the primary
+    db, on_replica = ReadRouter(primary).session(sticky_key=1)
+    assert not on_replica
+    db.close()
+
+
+def test_client_write_time_sticks_on_any_process(tmp_path):
+    primary, replica = _sessions(tmp_path / "primary.db"), _sessions(tmp_path / "replica.db")
+    # Two worker processes: only the first saw the write
+    writer, other = ReadRouter(primary, replica, sticky_seconds=60), ReadRouter(primary, replica, sticky_seconds=60)
+    writer.mark_write(7)
+
+    # STEP 1 — Without the client's write time the other worker reads the replica
+    db, on_replica = other.session(sticky_key=7)
+    assert on_replica
+    db.close()
+
+    # STEP 2 — With it (JWT claim / cookie) the primary, until it is too old
+    db, on_replica = other.session(sticky_key=7, wrote_at=time.time())
+    assert not on_replica
+    db.close()
+    db, on_replica = other.session(sticky_key=7, wrote_at=time.time() - 120)
+    assert on_replica
+    db.close()
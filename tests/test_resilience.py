@@ -0,0 +1,94 @@
+import time
+
+import pytest
+
+from utils import metrics
+from utils.resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryBudget,
+    call_with_retry,
+)
+
+
+class Flaky(Exception):
+    retry_after = 0
+
+
+def _failing(times, result="ok"):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= times:
+            raise Flaky()
+        return result
+
+    return fn, calls
+
+
+def test_breaker_opens_fails_fast_and_recovers():
+    breaker = CircuitBreaker("test:breaker", failure_threshold=2, reset_seconds=0.1, probes=1)
+    budget = RetryBudget(ratio=0, min_per_second=0, max_tokens=0)
+
+    # STEP 1: two failed calls (no retry budget) open the breaker
+    for _ in range(2):
+        with pytest.raises(Flaky):
+            call_with_retry(breaker, _failing(1)[0], (Flaky,), budget=budget)
+    assert breaker.state == OPEN
+
+    # STEP 2: while open, calls fail fast without touching the dependency
+    fn, calls = _failing(0)
+    with pytest.raises(CircuitOpenError) as exc:
+        call_with_retry(breaker, fn, (Flaky,), budget=budget)
+    assert not calls and exc.value.name == "test:breaker"
+
+    # STEP 3: after the reset window one probe goes through; the rest still fail fast
+    time.sleep(0.12)
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    # STEP 4: the probe succeeding closes it again
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert call_with_retry(breaker, fn, (Flaky,), budget=budget) == "ok"
+    assert metrics.get_counter("circuit_breaker_transitions_total", dependency="test:breaker", to=OPEN) == 1
+
+
+def test_retries_are_bounded_by_budget():
+    breaker = CircuitBreaker("test:retries", failure_threshold=100)
+
+    # Transient errors are retried until one succeeds
+    fn, calls = _failing(2)
+    assert call_with_retry(breaker, fn, (Flaky,), max_attempts=3, budget=RetryBudget(max_tokens=5)) == "ok"
+    assert len(calls) == 3
+
+    # Non-retryable errors pass straight through
+    def broken():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        call_with_retry(breaker, broken, (Flaky,))
+
+    # Budget of one retry: the second call gets no retry at all
+    budget = RetryBudget(ratio=0, min_per_second=0, max_tokens=1)
+    fn, calls = _failing(1)
+    assert call_with_retry(breaker, fn, (Flaky,), budget=budget) == "ok"
+    fn, calls = _failing(1)
+    with pytest.raises(Flaky):
+        call_with_retry(breaker, fn, (Flaky,), budget=budget)
+    assert len(calls) == 1
+
+
+def test_breaker_state_is_exported():
+    from utils.resilience import get_breaker
+
+    get_breaker("test:exported").record_failure()
+    text = metrics.render_prometheus()
+    assert 'circuit_breaker_state{dependency="test:exported"} 0' in text
+    assert "retry_budget_tokens" in text
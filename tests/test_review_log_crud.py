@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+from database import SessionLocal
+from crud.review_log_crud import create_review_log, list_reviews_for_repo, list_reviews_for_user
+from models import Plan, PRReviewLog, PRReviewStatus, User
+
+
+def test_review_history_keyset_pagination():
+    db = SessionLocal()
+
+    # STEP 1 — Seed plan + user
+    plan = Plan(name="Free", slug="free", monthly_pr_limit=5)
+    db.add(plan)
+    db.commit()
+    user = User(github_user_id=555, github_username="sara", plan_id=plan.id)
+    db.add(user)
+    db.commit()
+
+    # STEP 2 — 25 reviews; several share a timestamp to exercise the id tiebreak
+    base = datetime(2026, 1, 1)
+    for i in range(25):
+        row = create_review_log(
+            db,
+            user_id=user.id,
+            installation_id=None,
+            repo_full_name="sara/app" if i % 2 else "sara/api",
+            pr_number=i,
+            status=PRReviewStatus.ERROR if i % 5 == 0 else PRReviewStatus.SUCCESS,
+        )
+        row.created_at = base + timedelta(minutes=i // 3)
+    db.commit()
+
+    # STEP 3 — Walk all pages
+    seen, cursor = [], None
+    while True:
+        rows, cursor = list_reviews_for_user(db, user.id, limit=10, cursor=cursor)
+        seen.extend(r.pr_number for r in rows)
+        if cursor is None:
+            break
+    assert len(seen) == 25 and len(set(seen)) == 25
+    assert seen[0] == 24  # newest first
+
+    # STEP 4 — Filters
+    errors, _ = list_reviews_for_user(db, user.id, limit=100, status=PRReviewStatus.ERROR)
+    assert {r.pr_number for r in errors} == {0, 5, 10, 15, 20}
+
+    app_rows, _ = list_reviews_for_repo(db, "sara/app", limit=100)
+    assert len(app_rows) == 12
+    one_pr, _ = list_reviews_for_repo(db, "sara/app", pr_number=7)
+    assert [r.pr_number for r in one_pr] == [7]
+    assert db.query(PRReviewLog).count() == 25
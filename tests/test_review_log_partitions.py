@@ -0,0 +1,54 @@
+from datetime import datetime
+
+from database import SessionLocal
+from crud.review_log_crud import create_review_log, list_reviews_for_user
+from crud.review_log_partition_crud import drop_expired_partitions, list_partitions, seal_closed_period
+from crud.rollup_crud import apply_rollup_batch
+from models import PRReviewStatus, User
+from services.retention_service import retention_cutoff
+
+
+def _log(db, user, created_at):
+    row = create_review_log(
+        db, user_id=user.id, installation_id=None, repo_full_name="mira/app", pr_number=1,
+        status=PRReviewStatus.SUCCESS, tokens_used=10,
+    )
+    row.created_at = created_at
+    db.commit()
+    return row.id
+
+
+def test_seal_read_and_drop_monthly_periods():
+    db = SessionLocal()
+    user = User(github_user_id=4242, github_username="mira")
+    db.add(user)
+    db.commit()
+
+    now = datetime(2026, 10, 19)
+    ids = [_log(db, user, datetime(2026, 8, 5)), _log(db, user, datetime(2026, 9, 30, 23)), _log(db, user, now)]
+
+    # STEP 1 — Closed months are sealed; the current month's row stays hot
+    assert seal_closed_period(db, now) == "pr_review_logs_p202609"
+    assert seal_closed_period(db, now) is None
+    assert list_partitions(db) == ["pr_review_logs_p202609"]
+
+    # STEP 2 — Reads span every period, ids keep counting
+    new_id = _log(db, user, now)
+    assert new_id > max(ids)
+    rows, cursor = list_reviews_for_user(db, user.id, limit=3)
+    assert [r.id for r in rows] == [new_id, ids[2], ids[1]]
+    rows, _ = list_reviews_for_user(db, user.id, cursor=cursor)
+    assert [r.id for r in rows] == [ids[0]]
+
+    # STEP 3 — A period isn't dropped before it's rolled up
+    cutoff = retention_cutoff(datetime(2027, 10, 2), months=12)
+    assert cutoff == datetime(2026, 10, 1)
+    assert apply_rollup_batch(db, batch_size=1, now=now) == 1
+    assert drop_expired_partitions(db, cutoff) == []
+    assert apply_rollup_batch(db, now=datetime(2026, 10, 20)) == 3
+
+    # STEP 4 — Then the whole month goes at once
+    assert drop_expired_partitions(db, cutoff) == ["pr_review_logs_p202609"]
+    rows, _ = list_reviews_for_user(db, user.id)
+    assert [r.id for r in rows] == [new_id, ids[2]]
+    db.close()
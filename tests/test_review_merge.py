@@ -0,0 +1,33 @@
+from services.review_merge import merge_reviews, parse_review_json
+
+
+def test_parse_review_json_tolerates_fences_and_prose():
+    assert parse_review_json('```json\n{"summary": "ok"}\n```') == {"summary": "ok"}
+    assert parse_review_json('Here you go: {"issues": []} hope it helps') == {"issues": []}
+    assert parse_review_json("no json here") is None
+    assert parse_review_json(None) is None
+
+
+def test_merge_reviews_dedupes_and_ranks():
+    shared = {"file": "app.py", "code": "eval(x)", "severity": "medium", "issue": "eval on input"}
+    merged = merge_reviews({
+        "correctness": {
+            "summary": "Edge case missing",
+            "strengths": ["clear naming"],
+            "issues": [shared, {"file": "b.py", "code": "x[0]", "severity": "low", "issue": "IndexError"}],
+            "recommendations": ["Add tests"],
+        },
+        "security": {
+            "summary": "Unsafe eval",
+            "strengths": ["Clear naming"],
+            "issues": [{**shared, "severity": "high"}],
+            "recommendations": ["add tests", "Remove eval"],
+        },
+        "performance": None,
+    })
+
+    assert [i["severity"] for i in merged["issues"]] == ["high", "low"]
+    assert merged["strengths"] == ["clear naming"]
+    assert merged["recommendations"] == ["Add tests", "Remove eval"]
+    assert "**Security:** Unsafe eval" in merged["summary"]
+    assert set(merged) == {"summary", "strengths", "issues", "recommendations"}
@@ -0,0 +1,43 @@
+import json
+
+from services.review_router import (
+    TIER_FULL,
+    TIER_RULE,
+    TIER_SMALL,
+    classify_diff,
+    route_review,
+    rule_based_review,
+)
+
+
+def _diff(path, added=1, removed=0):
+    body = ["-old"] * removed + ["+new"] * added
+    return "\n".join([
+        f"diff --git a/{path} b/{path}",
+        f"--- a/{path}",
+        f"+++ b/{path}",
+        f"@@ -1,{removed} +1,{added} @@",
+        *body,
+    ]) + "\n"
+
+
+def test_routing_tiers():
+    # STEP 1: lockfile-only bump → deterministic summary, no model
+    lock = classify_diff(_diff("web/package-lock.json", 120, 80) + _diff("go.sum", 4, 2))
+    decision = route_review(lock)
+    assert decision.tier == TIER_RULE and decision.model is None
+    review = json.loads(rule_based_review(lock))
+    assert "+124/-82" in review["summary"] and review["issues"] == []
+
+    # STEP 2: small code change → small tier with a concrete model
+    routine = classify_diff(_diff("app/views.py", 10, 3) + _diff("package-lock.json", 50))
+    assert route_review(routine).tier == TIER_SMALL and route_review(routine).model
+
+    # STEP 3: touching auth code → full model whatever the size
+    auth = classify_diff(_diff("app/auth/session.py", 1))
+    assert auth.security_files == ["app/auth/session.py"]
+    assert route_review(auth).tier == TIER_FULL
+
+    # STEP 4: large churn → full; large docs-only change still small
+    assert route_review(classify_diff(_diff("app/core.py", 400))).tier == TIER_FULL
+    assert route_review(classify_diff(_diff("docs/guide.md", 400))).tier == TIER_SMALL
@@ -0,0 +1,53 @@
+import asyncio
+
+from services.review_scheduler import FairScheduler, review_priority
+from services.webhook_intake import PullRequestEvent
+
+
+def _event(lines):
+    return PullRequestEvent(
+        action="opened", installation_id=1, repo_full_name="acme/app", pr_number=1,
+        head_ref="f", base_ref="main", head_sha=None, base_sha=None,
+        additions=lines, deletions=0, changed_files=1,
+    )
+
+
+def test_review_priority_uses_size_and_plan_boost():
+    assert review_priority(_event(5)) == 0
+    assert review_priority(_event(300)) == 1
+    assert review_priority(_event(10_000)) == 2
+    assert review_priority(_event(10_000), plan_boost=1) == 1
+
+
+def test_fair_scheduler_serves_small_and_other_tenants_first():
+    order = []
+
+    async def scenario():
+        scheduler = FairScheduler(max_concurrency=2, per_tenant_cap=1)
+        gate = asyncio.Event()
+
+        async def job(name, wait=False):
+            if wait:
+                await gate.wait()
+            order.append(name)
+
+        # STEP 1 — big-org's large review holds its only per-tenant slot
+        running = asyncio.create_task(scheduler.run("big-org", 2, lambda: job("big-1", wait=True)))
+        await asyncio.sleep(0)
+
+        # STEP 2 — big-org queues more work; small-org is not blocked by it
+        tasks = [
+            asyncio.create_task(scheduler.run("big-org", 2, lambda: job("big-2"))),
+            asyncio.create_task(scheduler.run("big-org", 0, lambda: job("big-small"))),
+            asyncio.create_task(scheduler.run("small-org", 0, lambda: job("small-1"))),
+        ]
+        await asyncio.sleep(0.01)
+        assert order == ["small-1"]
+        assert scheduler.queued == 2
+
+        # STEP 3 — once big-1 finishes, big-org's small PR jumps its large one
+        gate.set()
+        await asyncio.gather(running, *tasks)
+
+    asyncio.run(scenario())
+    assert order == ["small-1", "big-1", "big-small", "big-2"]
@@ -0,0 +1,60 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from database import SessionLocal
+from crud.job_crud import claim_jobs, enqueue_job
+from models import ReviewJob, ReviewJobStatus
+from services import review_pipeline, review_worker
+from services.review_scheduler import SCHED_PRIORITY_STEP_SECONDS
+from services.webhook_intake import PullRequestEvent
+
+
+def test_lost_lease_cancels_the_review(monkeypatch):
+    db = SessionLocal()
+    payload = {
+        "action": "opened", "installation_id": 1, "repo_full_name": "acme/app", "pr_number": 5,
+        "head_ref": "feature", "base_ref": "main", "head_sha": "abc",
+    }
+    job_id = enqueue_job(db, payload, dedupe_key="pr:acme/app#5@abc")
+    job = claim_jobs(db, review_worker.WORKER_ID, visibility_timeout=1)[0]
+
+    # STEP 1 — Another worker re-claims the job once our lease has expired
+    claim_jobs(db, "other-worker", now=datetime.utcnow() + timedelta(seconds=5))
+
+    # STEP 2 — Our review is still running when the heartbeat notices
+    reviews = {"started": 0, "finished": 0}
+
+    async def slow_review(pr_event, deadline=None):
+        reviews["started"] += 1
+        await asyncio.sleep(5)
+        reviews["finished"] += 1
+        return {"status": "success"}
+
+    monkeypatch.setattr(review_pipeline, "review_pull_request", slow_review)
+    monkeypatch.setattr(review_worker, "JOB_HEARTBEAT_INTERVAL", 0.01)
+    asyncio.run(asyncio.wait_for(review_worker.process_job(job), 2))
+
+    # STEP 3 — Review abandoned; the new owner keeps the lease
+    assert reviews == {"started": 1, "finished": 0}
+    db.expire_all()
+    row = db.get(ReviewJob, job_id)
+    assert row.status == ReviewJobStatus.LEASED and row.lease_owner == "other-worker"
+    db.close()
+
+
+def test_deferred_jobs_are_scheduled_from_their_due_time():
+    db = SessionLocal()
+    later = datetime.utcnow() + timedelta(hours=3)
+
+    # STEP 1 — A backfill job due in 3h and a live review queued now
+    event = PullRequestEvent("backfill", 1, "acme/app", 7, "feature", "main", head_sha="def")
+    deferred = review_worker.enqueue_pull_request_review(event, priority=3, run_after=later)
+    live = review_worker.enqueue_pull_request_review(
+        PullRequestEvent("opened", 1, "acme/app", 8, "fix", "main", head_sha="fed"), priority=2
+    )
+
+    # STEP 2 — The deferred job's virtual deadline starts at run_after
+    deferred_row, live_row = db.get(ReviewJob, deferred["job_id"]), db.get(ReviewJob, live["job_id"])
+    assert deferred_row.sched_key == later + timedelta(seconds=3 * SCHED_PRIORITY_STEP_SECONDS)
+    assert live_row.sched_key < deferred_row.sched_key
+    db.close()
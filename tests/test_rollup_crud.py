@@ -0,0 +1,101 @@
+import asyncio
+import threading
+from datetime import date, datetime, timedelta
+from http.server import ThreadingHTTPServer
+
+from database import SessionLocal
+from crud.review_log_crud import create_review_log
+from crud.rollup_crud import apply_rollup_batch, get_daily_usage, serialize_rollup
+from models import Installation, Plan, PRReviewStatus, User
+from services import local_model_service, review_pipeline
+from services.local_model_service import LocalModelBackend
+from services.webhook_intake import PullRequestEvent
+from tests.test_local_model_service import _StubOllama
+
+
+def _log(db, user, repo, status, day, tokens=None, duration_ms=None):
+    row = create_review_log(
+        db, user_id=user.id, installation_id=None, repo_full_name=repo, pr_number=1,
+        status=status, tokens_used=tokens, duration_ms=duration_ms,
+    )
+    row.created_at = day
+    db.commit()
+
+
+def test_incremental_daily_rollups():
+    db = SessionLocal()
+
+    # STEP 1 — Seed plan + user + a few logs across two days
+    plan = Plan(name="Pro", slug="pro", monthly_pr_limit=100)
+    db.add(plan)
+    db.commit()
+    user = User(github_user_id=666, github_username="lena", plan_id=plan.id)
+    db.add(user)
+    db.commit()
+
+    d1, d2 = datetime(2026, 3, 1, 10), datetime(2026, 3, 2, 10)
+    _log(db, user, "lena/app", PRReviewStatus.SUCCESS, d1, tokens=100, duration_ms=2000)
+    _log(db, user, "lena/app", PRReviewStatus.ERROR, d1, duration_ms=4000)
+    _log(db, user, "lena/api", PRReviewStatus.SUCCESS, d2, tokens=50)
+
+    now = datetime(2026, 3, 3)
+
+    # STEP 2 — Small batches, resumed via the watermark
+    assert apply_rollup_batch(db, batch_size=2, now=now) == 2
+    assert apply_rollup_batch(db, batch_size=2, now=now) == 1
+    assert apply_rollup_batch(db, batch_size=2, now=now) == 0
+
+    day1 = serialize_rollup(get_daily_usage(db, "user", str(user.id), start=date(2026, 3, 1), end=date(2026, 3, 1))[0])
+    assert day1["reviews"] == 2 and day1["success"] == 1 and day1["error"] == 1
+    assert day1["tokens_used"] == 100
+    assert day1["avg_duration_ms"] == 3000
+
+    plan_rows = get_daily_usage(db, "plan", "pro")
+    assert [r.review_count for r in plan_rows] == [2, 1]
+    assert {r.scope_key for r in get_daily_usage(db, "repo")} == {"lena/app", "lena/api"}
+
+    # STEP 3 — New logs are added incrementally; unsettled ones wait
+    _log(db, user, "lena/app", PRReviewStatus.SUCCESS, d1, tokens=10)
+    _log(db, user, "lena/app", PRReviewStatus.SUCCESS, now)
+    assert apply_rollup_batch(db, now=now, settle_seconds=60) == 1
+    assert apply_rollup_batch(db, now=now + timedelta(minutes=5), settle_seconds=60) == 1
+
+    db.expire_all()
+    assert get_daily_usage(db, "repo", "lena/app", start=date(2026, 3, 1), end=date(2026, 3, 1))[0].review_count == 3
+
+
+def test_review_token_spend_reaches_rollups(monkeypatch):
+    class _Stub(_StubOllama):
+        ports = set()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # STEP 1 — A self-hosted plan, a linked installation, GitHub calls stubbed out
+    db = SessionLocal()
+    plan = Plan(name="Local", slug="local", monthly_pr_limit=10, model_backend="local")
+    db.add(plan)
+    db.commit()
+    user = User(github_user_id=4242, github_username="tok", plan_id=plan.id)
+    db.add(user)
+    db.commit()
+    db.add(Installation(installation_id=99, account_login="tok", user_id=user.id))
+    db.commit()
+
+    backend = LocalModelBackend(host=f"http://127.0.0.1:{server.server_address[1]}", model="stub")
+    monkeypatch.setattr(local_model_service, "_backend", backend)
+    monkeypatch.setattr(review_pipeline, "create_installation_token", lambda *a, **k: "t")
+    monkeypatch.setattr(review_pipeline, "get_diff_via_api", lambda *a, **k: "diff --git a/x b/x\n+print(1)\n")
+    monkeypatch.setattr(review_pipeline, "post_github_comment", lambda *a, **k: None)
+
+    # STEP 2 — The review's model tokens are logged and rolled up per plan
+    event = PullRequestEvent("opened", 99, "tok/app", 3, "feature", "main", head_sha="abc")
+    try:
+        assert asyncio.run(review_pipeline.review_pull_request(event))["status"] == "success"
+    finally:
+        server.shutdown()
+
+    apply_rollup_batch(db, now=datetime.utcnow() + timedelta(hours=1))
+    [row] = get_daily_usage(db, "plan", "local")
+    assert row.tokens_used == 150
+    db.close()
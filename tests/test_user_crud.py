@@ -1,6 +1,17 @@
+from datetime import datetime, timedelta
+
 from database import SessionLocal
-from crud.user_crud import get_user_by_github_id, create_user
-from models import Plan
+from crud.user_crud import (
+    BILLING_PERIOD_DAYS,
+    get_user_by_github_id,
+    create_user,
+    get_installations_version,
+    get_user_with_installations,
+    rollover_expired_periods,
+    rollover_user_period_if_expired,
+)
+from crud.installation_crud import link_installation_to_user
+from models import Plan, User
 
 
 def test_user_crud():
@@ -29,3 +40,100 @@ def test_user_crud():
 
     assert fetched is not None
     assert fetched.github_username == "abdul"
+
+
+def test_rollover_expired_periods():
+    db = SessionLocal()
+
+    plan = Plan(name="Free", slug="free", monthly_pr_limit=5)
+    db.add(plan)
+    db.commit()
+
+    now = datetime(2026, 10, 1)
+    expired = User(github_user_id=1, github_username="old", plan_id=plan.id,
+                   pr_used_this_period=5, period_start=now - timedelta(days=40),
+                   period_end=now - timedelta(days=10))
+    current = User(github_user_id=2, github_username="new", plan_id=plan.id,
+                   pr_used_this_period=3, period_start=now - timedelta(days=5),
+                   period_end=now + timedelta(days=25))
+    never = User(github_user_id=3, github_username="fresh", plan_id=plan.id)
+    db.add_all([expired, current, never])
+    db.commit()
+
+    # Batches of 1 → resumable, each call is one UPDATE
+    assert rollover_expired_periods(db, now=now, batch_size=1) == 1
+    assert rollover_expired_periods(db, now=now, batch_size=1) == 1
+    assert rollover_expired_periods(db, now=now, batch_size=1) == 0
+
+    db.expire_all()
+    assert expired.pr_used_this_period == 0
+    # The next period follows on from the old one, not from the rollover time
+    assert expired.period_start == now - timedelta(days=10)
+    assert expired.period_end == now - timedelta(days=10) + timedelta(days=BILLING_PERIOD_DAYS)
+    assert current.pr_used_this_period == 3
+    assert never.period_start == now
+
+    # Lazy path: only rolls once the period has actually ended
+    assert rollover_user_period_if_expired(db, current, now=now) is False
+    later = now + timedelta(days=26)
+    assert rollover_user_period_if_expired(db, current, now=later) is True
+    assert current.pr_used_this_period == 0
+    assert current.period_start == now + timedelta(days=25)
+
+    # Idle for several periods: whole periods are skipped, the anchor is kept
+    much_later = now + timedelta(days=25 + 3 * BILLING_PERIOD_DAYS + 2)
+    assert rollover_user_period_if_expired(db, current, now=much_later) is True
+    assert current.period_start == now + timedelta(days=25 + 3 * BILLING_PERIOD_DAYS)
+    assert current.period_end == now + timedelta(days=25 + 4 * BILLING_PERIOD_DAYS)
+
+
+def test_installations_version_changes_with_data():
+    db = SessionLocal()
+
+    plan = Plan(name="Free", slug="free", monthly_pr_limit=5)
+    db.add(plan)
+    db.commit()
+    user = User(github_user_id=77, github_username="etag", plan_id=plan.id)
+    db.add(user)
+    db.commit()
+
+    v1 = get_installations_version(db, 77)
+    assert v1[3] == 0
+    assert get_installations_version(db, 78) is None
+
+    link_installation_to_user(db, 123, user.id, "etag", "User")
+    v2 = get_installations_version(db, 77)
+    assert v2[3] == 1 and v2 != v1
+
+    loaded = get_user_with_installations(db, 77)
+    assert [i.installation_id for i in loaded.installations] == [123]
+    assert loaded.plan.slug == "free"
+
+
+def test_upsert_github_user_keeps_plan_and_email():
+    from crud import plan_crud
+    from crud.user_crud import upsert_github_user
+
+    db = SessionLocal()
+    plan_crud._default_plan_id = None  # plans are wiped between tests
+
+    # STEP 1: first login creates the free plan and the user on it
+    free_id = plan_crud.get_default_plan_id(db)
+    row = upsert_github_user(db, 4242, "octo", "octo@example.com", "https://a/1", free_id)
+    assert row[1:] == (4242, "octo", "free")
+
+    # STEP 2: user upgraded; next login refreshes the profile but keeps plan and email
+    pro = Plan(name="Pro", slug="pro", monthly_pr_limit=500)
+    db.add(pro)
+    db.flush()
+    db.query(User).filter(User.id == row[0]).update({"plan_id": pro.id})
+    db.commit()
+
+    again = upsert_github_user(db, 4242, "octo-renamed", None, "https://a/2", plan_crud.get_default_plan_id(db))
+    assert again == (row[0], 4242, "octo-renamed", "pro")
+    user = get_user_by_github_id(db, 4242)
+    assert user.email == "octo@example.com" and user.avatar_url == "https://a/2"
+    assert db.query(User).count() == 1
+
+    plan_crud._default_plan_id = None
+    db.close()
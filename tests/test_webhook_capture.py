@@ -0,0 +1,28 @@
+import glob
+import os
+
+from services.webhook_capture import CaptureWriter, read_capture
+
+
+def test_capture_roundtrip_and_rotation(tmp_path):
+    writer = CaptureWriter(str(tmp_path), max_bytes=300, keep_files=2)
+    bodies = [os.urandom(200) for _ in range(6)]  # incompressible, forces rotation
+
+    # STEP 1 — Headers are filtered, raw bytes kept exactly (signatures stay valid)
+    for i, body in enumerate(bodies):
+        writer.write(
+            {"x-github-event": "pull_request", "x-hub-signature-256": f"sha256={i}", "cookie": "secret"},
+            body,
+            ts=1000 + i,
+        )
+    writer.close()
+
+    # STEP 2 — Rotated by size and pruned to the newest archives
+    archives = glob.glob(str(tmp_path / "webhooks-*.jsonl.gz"))
+    assert len(archives) == 2
+
+    replayed = list(read_capture(archives))
+    assert replayed
+    ts, headers, body = replayed[-1]
+    assert ts == 1005 and body == bodies[-1]
+    assert headers == {"x-github-event": "pull_request", "x-hub-signature-256": "sha256=5"}
@@ -0,0 +1,53 @@
+import hashlib
+import hmac
+import json
+
+from services.webhook_intake import PullRequestEvent, WebhookDelivery, verify_signature
+
+
+def _sign(secret, body):
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def test_verify_signature():
+    body = b'{"action":"opened"}'
+
+    assert verify_signature(body, _sign("s3cret", body), "s3cret")
+    assert not verify_signature(body, _sign("wrong", body), "s3cret")
+    assert not verify_signature(body, None, "s3cret")
+    # No secret configured → rejected unless unsigned deliveries are explicitly allowed
+    assert not verify_signature(body, None, None)
+    assert not verify_signature(body, _sign("s3cret", body), "")
+    assert verify_signature(body, None, None, allow_unsigned=True)
+
+
+def test_delivery_routing_and_lazy_parse():
+    payload = {
+        "action": "labeled",
+        "installation": {"id": 1},
+        "repository": {"full_name": "acme/app"},
+        "pull_request": {
+            "number": 7,
+            "head": {"ref": "feat", "sha": "abc"},
+            "base": {"ref": "main", "sha": "def"},
+            "additions": 3,
+        },
+    }
+    body = json.dumps(payload).encode()
+
+    ignored = WebhookDelivery("star", body)
+    assert not ignored.is_relevant
+
+    delivery = WebhookDelivery("pull_request", body)
+    assert delivery.is_relevant
+    assert delivery.peek_action() == "labeled"
+    assert "payload" not in delivery.__dict__  # not parsed yet
+
+    event = PullRequestEvent.from_payload(delivery.payload)
+    assert event.pr_number == 7
+    assert event.head_sha == "abc"
+    assert event.additions == 3
+    assert event.deletions == 0
+
+    # "action" not first → peek gives up, full parse still works
+    assert WebhookDelivery("pull_request", b'{"zen": 1, "action": "opened"}').peek_action() is None
@@ -0,0 +1,62 @@
+# utils/deadline.py
+# Per-review time budget, created at intake and handed to every stage.
+
+import asyncio
+import os
+import time
+
+# Whole-review budget, from intake to posted comment
+REVIEW_DEADLINE_SECONDS = float(os.getenv("REVIEW_DEADLINE_SECONDS", "600"))
+# Budget held back from the LLM stage so the comment can still be posted
+REVIEW_COMMENT_RESERVE_SECONDS = float(os.getenv("REVIEW_COMMENT_RESERVE_SECONDS", "20"))
+# Default timeout for outbound HTTP calls made without a deadline
+HTTP_DEFAULT_TIMEOUT = float(os.getenv("HTTP_DEFAULT_TIMEOUT", "30"))
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, stage: str):
+        super().__init__(f"deadline exceeded during {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    """Absolute point in (monotonic) time by which a review must be done."""
+
+    def __init__(self, expires_at: float):
+        self.expires_at = expires_at
+
+    @classmethod
+    def after(cls, seconds: float = REVIEW_DEADLINE_SECONDS) -> "Deadline":
+        return cls(time.monotonic() + seconds)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def timeout(self, stage: str, cap: float | None = None, reserve: float = 0.0) -> float:
+        """Seconds this stage may take: the remaining budget minus `reserve`, capped at `cap`."""
+        left = self.remaining() - reserve
+        if left <= 0:
+            raise DeadlineExceeded(stage)
+        return min(left, cap) if cap else left
+
+    async def run(self, stage: str, awaitable, cap: float | None = None, reserve: float = 0.0):
+        """
+        Await within the stage's budget. On expiry the awaitable is cancelled
+        (a thread behind asyncio.to_thread keeps going until its own timeout,
+        but the coroutine is freed at once).
+        """
+        try:
+            timeout = self.timeout(stage, cap, reserve)
+        except DeadlineExceeded:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(stage) from None
+
+    async def to_thread(self, stage: str, fn, *args, **kwargs):
+        """Run a blocking call in a thread within the budget; `timeout=` is passed through."""
+        timeout = self.timeout(stage)
+        return await self.run(stage, asyncio.to_thread(fn, *args, timeout=timeout, **kwargs))
@@ -0,0 +1,92 @@
+# utils/metrics.py
+# In-process metrics registry (per worker), exposed on GET /metrics.
+
+import threading
+from collections import defaultdict, deque
+
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_gauges = {}
+_samples = defaultdict(lambda: deque(maxlen=2048))  # recent observations for quantiles
+_collectors = []
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+
+def inc(name: str, value: float = 1, **labels):
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+
+def set_gauge(name: str, value: float, **labels):
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def observe(name: str, value: float, **labels):
+    """Record one sample (latency, wait time, ...); reported as p50/p95/p99."""
+    with _lock:
+        _samples[_key(name, labels)].append(value)
+
+
+def register_collector(fn):
+    """`fn()` returns [(name, labels_dict, value), ...] gauges computed at scrape time."""
+    _collectors.append(fn)
+    return fn
+
+
+def get_counter(name: str, **labels) -> float:
+    with _lock:
+        return _counters.get(_key(name, labels), 0)
+
+
+def _quantile(values, q: float):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def quantiles(name: str, **labels) -> dict | None:
+    with _lock:
+        values = list(_samples.get(_key(name, labels), ()))
+    if not values:
+        return None
+    return {"p50": _quantile(values, 0.5), "p95": _quantile(values, 0.95), "p99": _quantile(values, 0.99), "count": len(values)}
+
+
+def _collected_gauges() -> dict:
+    gauges = {}
+    for fn in _collectors:
+        for name, labels, value in fn():
+            gauges[_key(name, labels)] = value
+    return gauges
+
+
+def _format_labels(labels: tuple, extra: dict | None = None) -> str:
+    items = list(labels) + list((extra or {}).items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+def render_prometheus() -> str:
+    """Prometheus text exposition of every counter, gauge and sample summary."""
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        samples = {k: list(v) for k, v in _samples.items()}
+    gauges.update(_collected_gauges())
+
+    lines = []
+    for (name, labels), value in sorted(counters.items()):
+        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+    for (name, labels), value in sorted(gauges.items()):
+        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+    for (name, labels), values in sorted(samples.items()):
+        if not values:
+            continue
+        for q in (0.5, 0.95, 0.99):
+            lines.append(f"{name}{_format_labels(labels, {'quantile': q})} {_quantile(values, q):g}")
+        lines.append(f"{name}_count{_format_labels(labels)} {len(values)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,230 @@
+# utils/profiler.py
+# Opt-in sampling profiler for HTTP requests. Profiles are written as
+# collapsed stacks ("frame;frame;frame count"), the input format of
+# flamegraph.pl / speedscope / inferno.
+#
+# Only installed as middleware when enabled, so it costs nothing when off.
+
+import asyncio
+import hashlib
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from utils.logger import log
+
+# Fraction of requests profiled (0 = only requests with a valid X-Profile-Token)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Shared secret for X-Profile-Token: "<unix ts>.<hex HMAC-SHA256(secret, ts)>"
+PROFILE_TRIGGER_SECRET = os.getenv("PROFILE_TRIGGER_SECRET")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/code-review-profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+
+PROFILING_ENABLED = PROFILE_SAMPLE_RATE > 0 or bool(PROFILE_TRIGGER_SECRET)
+
+TOKEN_MAX_AGE_SECONDS = 300
+_NAME = re.compile(r"^(\d{8}T\d{6})-(\d+)ms-([A-Z]+)-(\w+)-(\d+)\.folded$")
+
+
+def make_profile_token(secret: str, ts: int | None = None) -> str:
+    ts = int(ts if ts is not None else time.time())
+    return f"{ts}.{hmac.new(secret.encode(), str(ts).encode(), hashlib.sha256).hexdigest()}"
+
+
+def valid_profile_token(token: str | None, secret: str | None = PROFILE_TRIGGER_SECRET) -> bool:
+    if not token or not secret or "." not in token:
+        return False
+    ts, _ = token.split(".", 1)
+    if not ts.isdigit() or abs(time.time() - int(ts)) > TOKEN_MAX_AGE_SECONDS:
+        return False
+    return hmac.compare_digest(token, make_profile_token(secret, int(ts)))
+
+
+# ---------------------------------------------------------------------
+# Sampler
+# ---------------------------------------------------------------------
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+# asyncio.to_thread executors and the pool FastAPI runs sync endpoints in
+_WORKER_PREFIXES = ("asyncio", "AnyIO worker")
+
+
+def _is_idle(frame) -> bool:
+    """Executor thread parked waiting for work."""
+    name = os.path.basename(frame.f_code.co_filename)
+    return name in ("threading.py", "queue.py", "thread.py") and frame.f_code.co_name in ("wait", "get", "_worker")
+
+
+class _Profile:
+    def __init__(self, task, loop_thread: int, method: str, path: str):
+        self.task = task
+        self.loop_thread = loop_thread
+        self.method = method
+        self.path = path
+        self.stacks = Counter()
+        self.samples = 0
+
+
+class Sampler:
+    """
+    One background thread polling sys._current_frames() while any profile
+    is active. Event-loop samples count only while the profiled request's
+    task is running. Busy executor threads (asyncio.to_thread work, sync
+    endpoints) are included under "thread:<name>" and may contain
+    concurrent requests' work.
+    """
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self._active = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, profile: _Profile):
+        with self._lock:
+            self._active.add(profile)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+
+    def stop(self, profile: _Profile):
+        with self._lock:
+            self._active.discard(profile)
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                active = list(self._active)
+                if not active:
+                    self._thread = None
+                    return
+
+            frames = sys._current_frames()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for profile in active:
+                profile.samples += 1
+                loop_frame = frames.get(profile.loop_thread)
+                if loop_frame is not None and asyncio.current_task(profile.task.get_loop()) is profile.task:
+                    profile.stacks["loop;" + _collapse(loop_frame)] += 1
+
+                for ident, frame in frames.items():
+                    name = names.get(ident, "")
+                    if ident in (me, profile.loop_thread) or not name.startswith(_WORKER_PREFIXES) or _is_idle(frame):
+                        continue
+                    profile.stacks[f"thread:{name};" + _collapse(frame)] += 1
+            time.sleep(self.interval)
+
+
+_sampler = Sampler()
+
+
+# ---------------------------------------------------------------------
+# Storage
+# ---------------------------------------------------------------------
+def _write_profile(profile: _Profile, duration_ms: int) -> str | None:
+    if not profile.stacks:
+        return None
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", profile.path).strip("_")[:60] or "root"
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{duration_ms}ms-{profile.method}-{slug}-{os.getpid()}.folded"
+    path = os.path.join(PROFILE_DIR, name)
+    with open(path, "w") as f:
+        for stack, count in profile.stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+    # Bounded directory: drop the oldest profiles
+    files = sorted((e for e in os.scandir(PROFILE_DIR) if e.name.endswith(".folded")), key=lambda e: e.stat().st_mtime)
+    for entry in files[:-PROFILE_MAX_FILES]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+    return path
+
+
+def list_profiles(limit: int = 20) -> list:
+    """Recent profiles on disk, slowest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for entry in os.scandir(PROFILE_DIR):
+        match = _NAME.match(entry.name)
+        if not match:
+            continue
+        created, duration, method, slug, pid = match.groups()
+        profiles.append({
+            "name": entry.name,
+            "created_at": created,
+            "duration_ms": int(duration),
+            "method": method,
+            "path": slug,
+            "pid": int(pid),
+            "bytes": entry.stat().st_size,
+        })
+    profiles.sort(key=lambda p: p["duration_ms"], reverse=True)
+    return profiles[:limit]
+
+
+def read_profile(name: str) -> str | None:
+    if not _NAME.match(name):
+        return None
+    try:
+        with open(os.path.join(PROFILE_DIR, name)) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+# ---------------------------------------------------------------------
+# ASGI middleware (same task as the endpoint, unlike BaseHTTPMiddleware)
+# ---------------------------------------------------------------------
+class ProfilingMiddleware:
+    def __init__(self, app, sample_rate: float = PROFILE_SAMPLE_RATE, secret: str | None = PROFILE_TRIGGER_SECRET):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.secret = secret
+
+    def _wanted(self, scope) -> bool:
+        if self.secret:
+            for key, value in scope.get("headers", ()):
+                if key == b"x-profile-token":
+                    return valid_profile_token(value.decode("latin-1"), self.secret)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith("/admin/profiles") or not self._wanted(scope):
+            return await self.app(scope, receive, send)
+
+        profile = _Profile(asyncio.current_task(), threading.get_ident(), scope["method"], scope["path"])
+        started = time.monotonic()
+        _sampler.start(profile)
+        try:
+            return await self.app(scope, receive, send)
+        finally:
+            _sampler.stop(profile)
+            duration_ms = int((time.monotonic() - started) * 1000)
+            try:
+                path = await asyncio.to_thread(_write_profile, profile, duration_ms)
+                if path:
+                    log(f"🔥 Profile {scope['method']} {scope['path']} ({duration_ms} ms) → {path}")
+            except OSError as e:
+                log(f"⚠️ Could not write profile: {e}")
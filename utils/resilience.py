@@ -0,0 +1,277 @@
+# utils/resilience.py
+# Circuit breakers and a retry budget for outbound dependencies (GitHub API
+# endpoint classes, review models). State is per process and shared by every
+# coroutine and thread in it, so one worker stops hammering a dependency as
+# soon as it is seen failing.
+
+import asyncio
+import os
+import random
+import threading
+import time
+
+from utils import metrics
+from utils.logger import log
+
+# Consecutive failures that open a breaker
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+# How long an open breaker fails fast before letting a probe through
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "15"))
+# Concurrent probe calls allowed while half-open
+CIRCUIT_HALF_OPEN_PROBES = int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", "1"))
+
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "8"))
+# Retries may add at most this fraction on top of first attempts...
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+# ...plus a trickle so a quiet worker can still retry
+RETRY_BUDGET_MIN_PER_SECOND = float(os.getenv("RETRY_BUDGET_MIN_PER_SECOND", "1"))
+RETRY_BUDGET_MAX_TOKENS = float(os.getenv("RETRY_BUDGET_MAX_TOKENS", "20"))
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose breaker is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"circuit {name} is open (retry in {retry_after:.0f}s)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    closed → (threshold consecutive failures) → open → (reset_seconds) →
+    half_open: `probes` calls go through; a success closes, a failure re-opens.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_seconds: float = CIRCUIT_RESET_SECONDS,
+        probes: int = CIRCUIT_HALF_OPEN_PROBES,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.probes = probes
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = 0
+        self._lock = threading.Lock()
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        log(f"🔌 Circuit {self.name}: {self.state} → {state}")
+        metrics.inc("circuit_breaker_transitions_total", dependency=self.name, to=state)
+        self.state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        if state != HALF_OPEN:
+            self._probing = 0
+
+    def retry_after(self) -> float:
+        return max(0.0, self._opened_at + self.reset_seconds - time.monotonic())
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError."""
+        with self._lock:
+            if self.state == OPEN and self.retry_after() <= 0:
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                return
+            if self.state == HALF_OPEN and self._probing < self.probes:
+                self._probing += 1
+                return
+            retry_after = self.retry_after() if self.state == OPEN else self.reset_seconds
+        metrics.inc("circuit_breaker_rejected_total", dependency=self.name)
+        raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._transition(OPEN)
+
+    def release(self):
+        """The call ended without telling us anything (cancelled, caller error)."""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probing:
+                self._probing -= 1
+
+
+class RetryBudget:
+    """
+    Token bucket shared by all dependencies: every call deposits `ratio`
+    tokens, every retry spends one. During an outage first attempts keep
+    flowing but retries are capped at ~ratio of traffic instead of
+    multiplying it.
+    """
+
+    def __init__(
+        self,
+        ratio: float = RETRY_BUDGET_RATIO,
+        min_per_second: float = RETRY_BUDGET_MIN_PER_SECOND,
+        max_tokens: float = RETRY_BUDGET_MAX_TOKENS,
+    ):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, extra: float = 0.0):
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self._updated) * self.min_per_second + extra)
+        self._updated = now
+
+    def deposit(self):
+        with self._lock:
+            self._refill(self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+_budget = RetryBudget()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(name, CircuitBreaker(name))
+    return breaker
+
+
+def get_retry_budget() -> RetryBudget:
+    return _budget
+
+
+def breaker_states() -> dict:
+    return {name: b.state for name, b in sorted(_breakers.items())}
+
+
+@metrics.register_collector
+def _breaker_gauges() -> list:
+    """circuit_breaker_state: 0 = closed, 1 = half-open, 2 = open."""
+    gauges = [("retry_budget_tokens", {}, round(_budget.tokens, 2))]
+    for name, breaker in list(_breakers.items()):
+        gauges.append(("circuit_breaker_state", {"dependency": name}, _STATE_VALUE[breaker.state]))
+        gauges.append(("circuit_breaker_consecutive_failures", {"dependency": name}, breaker.failures))
+    return gauges
+
+
+# ---------------------------------------------------------------------
+# Retrying calls
+# ---------------------------------------------------------------------
+def backoff_delay(attempt: int, base: float = RETRY_BASE_DELAY, cap: float = RETRY_MAX_DELAY) -> float:
+    """Full jitter: uniform in [0, min(cap, base * 2^(attempt-1))]."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+def _is_retryable(exc: BaseException, retryable) -> bool:
+    if isinstance(retryable, tuple):
+        return isinstance(exc, retryable)
+    return isinstance(exc, Exception) and retryable(exc)
+
+
+def _retry_delay(breaker, budget, exc, attempt: int, max_attempts: int, give_up_at: float | None) -> float | None:
+    """Seconds to wait before the next attempt, or None to give up with `exc`."""
+    if attempt >= max_attempts or breaker.state == OPEN:
+        return None
+    # Honour a server's Retry-After (429/503) if it is longer than our backoff
+    delay = max(backoff_delay(attempt), getattr(exc, "retry_after", None) or 0)
+    if give_up_at is not None and time.monotonic() + delay >= give_up_at:
+        return None
+    if not budget.try_spend():
+        metrics.inc("retry_budget_exhausted_total", dependency=breaker.name)
+        return None
+    metrics.inc("dependency_retries_total", dependency=breaker.name)
+    return delay
+
+
+def call_with_retry(
+    breaker: CircuitBreaker,
+    fn,
+    retryable,
+    give_up_at: float | None = None,
+    max_attempts: int = RETRY_MAX_ATTEMPTS,
+    budget: RetryBudget | None = None,
+):
+    """
+    Call blocking `fn()` through `breaker`, retrying errors matching `retryable`
+    (exception tuple or predicate) with jittered backoff while the retry budget
+    and `give_up_at` (monotonic) allow. Other errors pass through untouched.
+    """
+    budget = budget or _budget
+    budget.deposit()
+    attempt = 0
+    while True:
+        attempt += 1
+        breaker.before_call()
+        try:
+            result = fn()
+        except BaseException as e:
+            if not _is_retryable(e, retryable):
+                breaker.release()
+                raise
+            breaker.record_failure()
+            delay = _retry_delay(breaker, budget, e, attempt, max_attempts, give_up_at)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            continue
+        breaker.record_success()
+        return result
+
+
+async def acall_with_retry(
+    breaker: CircuitBreaker,
+    factory,
+    retryable,
+    give_up_at: float | None = None,
+    max_attempts: int = RETRY_MAX_ATTEMPTS,
+    budget: RetryBudget | None = None,
+):
+    """Async call_with_retry: `factory()` returns a fresh awaitable per attempt."""
+    budget = budget or _budget
+    budget.deposit()
+    attempt = 0
+    while True:
+        attempt += 1
+        breaker.before_call()
+        try:
+            result = await factory()
+        except BaseException as e:
+            if not _is_retryable(e, retryable):
+                breaker.release()
+                raise
+            breaker.record_failure()
+            delay = _retry_delay(breaker, budget, e, attempt, max_attempts, give_up_at)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        breaker.record_success()
+        return result
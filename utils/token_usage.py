@@ -0,0 +1,43 @@
+# utils/token_usage.py
+# Model tokens spent on one review, created by the pipeline and handed to
+# every model call it makes (agent turns, direct completions, local server).
+
+import threading
+
+
+class TokenUsage:
+    """Running total of prompt + completion tokens; safe to share across tasks and threads."""
+
+    def __init__(self):
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def add(self, tokens) -> None:
+        if not tokens:
+            return
+        with self._lock:
+            self.total += int(tokens)
+
+
+def add_usage(usage: TokenUsage | None, tokens) -> None:
+    if usage is not None:
+        usage.add(tokens)
+
+
+def litellm_tokens(response) -> int:
+    """total_tokens of a litellm / OpenAI-style response (0 when the provider sent none)."""
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None) or 0
+
+
+def ollama_tokens(response) -> int:
+    """Prompt + generated tokens of an Ollama chat response."""
+    return (getattr(response, "prompt_eval_count", None) or 0) + (getattr(response, "eval_count", None) or 0)
+
+
+def adk_event_tokens(event) -> int:
+    """Tokens of one final ADK model event (partial stream chunks are skipped)."""
+    if getattr(event, "partial", False):
+        return 0
+    metadata = getattr(event, "usage_metadata", None)
+    return getattr(metadata, "total_token_count", None) or 0